@@ -0,0 +1,85 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/__main__.py
+
+This file runs the benchmarks: python -m benchmarks [--suite ...] [--sizes ...]
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import argparse
+from . import bench_import, bench_metadata, bench_rendering
+import json
+from .measure import report
+
+SUITES = {
+    "import": bench_import,
+    "metadata": bench_metadata,
+    "rendering": bench_rendering,
+}
+
+
+def main(args=None):
+    """
+    Runs the selected benchmark suites, and prints the measurements.
+    :param args: The command-line arguments.
+    :type args: List[str]
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks for pythoneda-shared-nix-flake/shared",
+    )
+    parser.add_argument(
+        "-s",
+        "--suite",
+        action="append",
+        choices=sorted(SUITES.keys()),
+        help="The suite(s) to run (default: all)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(aux) for aux in value.split(",")],
+        help="Comma-separated sizes, overriding each suite's defaults",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="Timed runs per operation"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the measurements as JSON"
+    )
+    options = parser.parse_args(args)
+
+    measurements = []
+    for name in options.suite or SUITES.keys():
+        measurements.extend(SUITES[name].run(options.sizes, options.repeat))
+
+    if options.json:
+        print(json.dumps(measurements, indent=2))
+    else:
+        print(report(measurements))
+
+
+if __name__ == "__main__":
+    main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
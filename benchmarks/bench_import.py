@@ -0,0 +1,104 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/bench_import.py
+
+This file measures the time it takes to import pythoneda.shared.nix.flake.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+import subprocess
+import sys
+from typing import Dict, List
+
+DEFAULT_SIZES = [1]
+
+# Each scenario runs in a fresh interpreter, since imports are cached.
+_PROBE = """
+import json, time, tracemalloc
+if {traced}:
+    tracemalloc.start()
+start = time.perf_counter()
+import pythoneda.shared.nix.flake as package
+names = {names}
+for name in (package.__all__ if names is None else names):
+    getattr(package, name)
+seconds = time.perf_counter() - start
+_, peak = tracemalloc.get_traced_memory()
+print(json.dumps({{"seconds": seconds, "peak_bytes": peak}}))
+"""
+
+SCENARIOS = {
+    "import NixFlakeInput": ["NixFlakeInput"],
+    "import NixFlakeMetadata": ["NixFlakeMetadata"],
+    "import NixFlake": ["NixFlake"],
+    "import all names": None,
+}
+
+
+def _probe(names: List[str], traced: bool) -> Dict:
+    """
+    Imports given names in a fresh interpreter.
+    :param names: The names to import, or None for all of them.
+    :type names: List[str]
+    :param traced: Whether to trace memory allocations, which slows imports down.
+    :type traced: bool
+    :return: The time and peak memory spent importing.
+    :rtype: Dict
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(names=repr(names), traced=traced)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(sizes: List[int] = None, repeat: int = 3) -> List[Dict]:
+    """
+    Runs the import benchmarks.
+    :param sizes: Ignored; imports have no size.
+    :type sizes: List[int]
+    :param repeat: The number of fresh interpreters per scenario.
+    :type repeat: int
+    :return: The measurements.
+    :rtype: List[Dict]
+    """
+    import pythoneda.shared.nix.flake as package
+
+    result = []
+    for operation, names in SCENARIOS.items():
+        probes = [_probe(names, False) for _ in range(max(1, repeat))]
+        result.append(
+            {
+                "operation": operation,
+                "size": len(names if names is not None else package.__all__),
+                "seconds": min(aux["seconds"] for aux in probes),
+                "peak_bytes": _probe(names, True)["peak_bytes"],
+            }
+        )
+    return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,169 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/bench_metadata.py
+
+This file benchmarks the NixFlakeMetadata queries.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+from .measure import measure
+import os
+from pythoneda.shared.nix.flake import NixFlakeLockGraph, NixFlakeMetadata
+from .synthetic import synthetic_lock
+import tempfile
+from typing import Dict, List
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+
+
+def _fresh(lock: Dict) -> NixFlakeMetadata:
+    """
+    Builds metadata whose inputs are already resolved, so that queries are measured alone.
+    :param lock: The synthetic metadata.
+    :type lock: Dict
+    :return: The metadata instance.
+    :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+    result = NixFlakeMetadata(lock, "path:/tmp/synthetic")
+    result.all_inputs()
+    return result
+
+
+def run(sizes: List[int] = None, repeat: int = 3) -> List[Dict]:
+    """
+    Runs the metadata benchmarks.
+    :param sizes: The numbers of nodes of the synthetic lock graphs.
+    :type sizes: List[int]
+    :param repeat: The number of timed runs of each operation.
+    :type repeat: int
+    :return: The measurements.
+    :rtype: List[Dict]
+    """
+    result = []
+    with tempfile.TemporaryDirectory() as lock_folder:
+        for size in sizes or DEFAULT_SIZES:
+            result.extend(_run_size(size, lock_folder, repeat))
+    return result
+
+
+def _run_size(size: int, lockFolder: str, repeat: int) -> List[Dict]:
+    """
+    Runs the metadata benchmarks on a synthetic lock graph of given size.
+    :param size: The number of nodes of the synthetic lock graph.
+    :type size: int
+    :param lockFolder: The folder where to write the flake.lock file.
+    :type lockFolder: str
+    :param repeat: The number of timed runs of each operation.
+    :type repeat: int
+    :return: The measurements.
+    :rtype: List[Dict]
+    """
+    result = []
+    lock = synthetic_lock(size)
+    with open(os.path.join(lockFolder, "flake.lock"), "w") as file:
+        json.dump(lock["locks"], file)
+    result.append(
+        measure(
+            "NixFlakeMetadata.from_lock_file",
+            size,
+            lambda: lockFolder,
+            lambda folder: NixFlakeMetadata.from_lock_file(folder),
+            repeat,
+        )
+    )
+    result.append(
+        measure(
+            "NixFlakeMetadata.all_inputs",
+            size,
+            lambda: NixFlakeMetadata(lock, "path:/tmp/synthetic"),
+            lambda metadata: metadata.all_inputs(),
+            repeat,
+        )
+    )
+    result.append(
+        measure(
+            "NixFlakeMetadata.input_table",
+            size,
+            lambda: NixFlakeMetadata(lock, "path:/tmp/synthetic"),
+            lambda metadata: metadata.input_table(),
+            repeat,
+        )
+    )
+    result.append(
+        measure(
+            "NixFlakeMetadata.lock_graph",
+            size,
+            lambda: NixFlakeMetadata(lock, "path:/tmp/synthetic"),
+            lambda metadata: metadata.lock_graph(),
+            repeat,
+        )
+    )
+    for query in ["topological_order", "depths"]:
+        result.append(
+            measure(
+                f"NixFlakeLockGraph.{query}",
+                size,
+                lambda: NixFlakeLockGraph.from_lock(lock["locks"]),
+                lambda graph, query=query: getattr(graph, query)(),
+                repeat,
+            )
+        )
+    result.append(
+        measure(
+            "NixFlakeMetadata.lock_closure",
+            size,
+            lambda: NixFlakeMetadata(lock, "path:/tmp/synthetic"),
+            lambda metadata: metadata.lock_closure(),
+            repeat,
+        )
+    )
+    result.append(
+        measure(
+            "NixFlakeMetadata.optimize_follows",
+            size,
+            lambda: NixFlakeMetadata(lock, "path:/tmp/synthetic"),
+            lambda metadata: metadata.optimize_follows(),
+            repeat,
+        )
+    )
+    for query in [
+        "duplicated_inputs",
+        "inputs_with_duplicates_with_different_versions",
+        "indirect_inputs_with_duplicates_with_different_versions",
+        "all_relationships",
+        "relationships_for_duplicated_nodes",
+    ]:
+        result.append(
+            measure(
+                f"NixFlakeMetadata.{query}",
+                size,
+                lambda: _fresh(lock),
+                lambda metadata, query=query: getattr(metadata, query)(),
+                repeat,
+            )
+        )
+    return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
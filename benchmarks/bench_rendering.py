@@ -0,0 +1,202 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/bench_rendering.py
+
+This file benchmarks rendering and (de)serializing flakes.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from .measure import measure
+import os
+from pythoneda.shared.nix.flake import (
+    FlakeNixEditor,
+    NixFlake,
+    NixFlakeRenderer,
+    PythonedaNixFlake,
+)
+from .synthetic import synthetic_flake
+import tempfile
+from typing import Dict, List
+
+DEFAULT_SIZES = [10, 50, 100]
+
+BATCH = 16
+
+
+def run(sizes: List[int] = None, repeat: int = 3) -> List[Dict]:
+    """
+    Runs the rendering benchmarks.
+    :param sizes: The numbers of inputs of the synthetic flakes.
+    :type sizes: List[int]
+    :param repeat: The number of timed runs of each operation.
+    :type repeat: int
+    :return: The measurements.
+    :rtype: List[Dict]
+    """
+    result = []
+    with tempfile.TemporaryDirectory() as output_folder:
+        for size in sizes or DEFAULT_SIZES:
+            flake = synthetic_flake(size)
+            result.append(
+                measure(
+                    "NixFlake.generate_files",
+                    size,
+                    lambda: flake,
+                    lambda aux: asyncio.run(aux.generate_files(output_folder)),
+                    repeat,
+                )
+            )
+            result.append(
+                measure(
+                    "NixFlake.process_template (FlakeNix)",
+                    size,
+                    lambda: flake,
+                    lambda aux: asyncio.run(
+                        aux.process_template(
+                            output_folder,
+                            "FlakeNix",
+                            f"{aux.templates_folder}/{aux.template_subfolder}",
+                            "root",
+                            "flake.nix",
+                        )
+                    ),
+                    repeat,
+                )
+            )
+            flake_nix = os.path.join(output_folder, "flake.nix")
+            result.append(
+                measure(
+                    "FlakeNixEditor (version of every input)",
+                    size,
+                    lambda: flake_nix,
+                    _bump_input_versions,
+                    repeat,
+                )
+            )
+            result.append(
+                measure(
+                    "NixFlake.to_dict",
+                    size,
+                    lambda: flake,
+                    lambda aux: aux.to_dict(),
+                    repeat,
+                )
+            )
+            serialized = flake.to_dict()
+            result.append(
+                measure(
+                    "NixFlake.from_dict",
+                    size,
+                    lambda: serialized,
+                    lambda aux: PythonedaNixFlake.from_dict(aux),
+                    repeat,
+                )
+            )
+            result.append(
+                measure(
+                    "NixFlake.to_dag_dict",
+                    size,
+                    lambda: flake,
+                    lambda aux: aux.to_dag_dict(),
+                    repeat,
+                )
+            )
+            dag = flake.to_dag_dict()
+            result.append(
+                measure(
+                    "NixFlake.from_dag_dict",
+                    size,
+                    lambda: dag,
+                    lambda aux: PythonedaNixFlake.from_dag_dict(aux),
+                    repeat,
+                )
+            )
+        result.extend(_run_batches(sizes or DEFAULT_SIZES, output_folder, repeat))
+    return result
+
+
+def _bump_input_versions(path: str):
+    """
+    Changes the version of every input of a flake.nix file, writing it once.
+    :param path: The flake.nix file.
+    :type path: str
+    """
+    editor = FlakeNixEditor(path)
+    for name in editor.input_names:
+        if editor.version(name) is not None:
+            editor.set_version(name, f"{editor.version(name)}.1")
+    editor.save()
+
+
+def _run_batches(sizes: List[int], outputFolder: str, repeat: int) -> List[Dict]:
+    """
+    Compares rendering a batch of flakes in this process, and in a pool of processes.
+    :param sizes: The numbers of inputs of the synthetic flakes.
+    :type sizes: List[int]
+    :param outputFolder: The folder where to write the files.
+    :type outputFolder: str
+    :param repeat: The number of timed runs of each operation.
+    :type repeat: int
+    :return: The measurements.
+    :rtype: List[Dict]
+    """
+    result = []
+    folders = [os.path.join(outputFolder, f"flake-{index}") for index in range(BATCH)]
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+
+    async def serially(flakes: List):
+        for flake, folder in zip(flakes, folders):
+            await flake.generate_files(folder)
+
+    renderer = NixFlakeRenderer()
+    try:
+        for size in sizes:
+            flakes = [synthetic_flake(size) for _ in range(BATCH)]
+            result.append(
+                measure(
+                    f"NixFlake.generate_files x{BATCH}",
+                    size,
+                    lambda: flakes,
+                    lambda aux: asyncio.run(serially(aux)),
+                    repeat,
+                )
+            )
+            result.append(
+                measure(
+                    f"NixFlake.generate_files_many x{BATCH} ({renderer.max_workers} processes)",
+                    size,
+                    lambda: flakes,
+                    lambda aux: asyncio.run(
+                        NixFlake.generate_files_many(aux, folders, renderer)
+                    ),
+                    repeat,
+                )
+            )
+    finally:
+        renderer.close()
+    return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
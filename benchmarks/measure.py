@@ -0,0 +1,95 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/measure.py
+
+This file provides the timing and memory measurements of the benchmarks.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import gc
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+
+def measure(
+    operation: str, size: int, setup: Callable, run: Callable, repeat: int = 3
+) -> Dict:
+    """
+    Measures given operation: the best wall-clock time, and the peak memory allocated while running it.
+    :param operation: The name of the operation.
+    :type operation: str
+    :param size: The size of the input (nodes, inputs, etc.).
+    :type size: int
+    :param setup: Builds a fresh argument for each run; not measured.
+    :type setup: Callable
+    :param run: The operation, receiving the argument built by setup.
+    :type run: Callable
+    :param repeat: The number of timed runs.
+    :type repeat: int
+    :return: The measurement.
+    :rtype: Dict
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        argument = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(argument)
+        timings.append(time.perf_counter() - start)
+
+    argument = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "operation": operation,
+        "size": size,
+        "seconds": min(timings),
+        "peak_bytes": peak,
+    }
+
+
+def report(measurements: List[Dict]) -> str:
+    """
+    Formats given measurements as a table.
+    :param measurements: The measurements.
+    :type measurements: List[Dict]
+    :return: The table.
+    :rtype: str
+    """
+    lines = [f"{'operation':<64} {'size':>8} {'seconds':>12} {'peak KiB':>12}"]
+    for item in measurements:
+        lines.append(
+            f"{item['operation']:<64} {item['size']:>8} "
+            f"{item['seconds']:>12.6f} {item['peak_bytes'] / 1024:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
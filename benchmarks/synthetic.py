@@ -0,0 +1,171 @@
+# vim: set fileencoding=utf-8
+"""
+benchmarks/synthetic.py
+
+This file builds synthetic lock graphs and flakes for the benchmarks.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import math
+import random
+from typing import Dict, List
+
+
+def synthetic_lock(
+    nodes: int, fanOut: int = 3, maxDepth: int = 40, seed: int = 0
+) -> Dict:
+    """
+    Builds the output of `nix flake metadata --json` for a synthetic, diamond-heavy lock graph.
+    Nodes are arranged in layers; each node depends on nodes of deeper layers, which are
+    shared by many parents. Node names follow nix's "<name>_<n>" convention for duplicates.
+    :param nodes: The number of nodes, besides the root.
+    :type nodes: int
+    :param fanOut: The number of inputs of each node.
+    :type fanOut: int
+    :param maxDepth: The maximum number of layers.
+    :type maxDepth: int
+    :param seed: The seed of the random generator.
+    :type seed: int
+    :return: The metadata.
+    :rtype: Dict
+    """
+    rng = random.Random(seed)
+    packages = max(5, nodes // 20)
+    depth = max(2, min(maxDepth, nodes // 10))
+    width = math.ceil(nodes / depth)
+    occurrences = {}
+    names = []
+    for index in range(nodes):
+        package = f"package-{index % packages}"
+        count = occurrences.get(package, 0) + 1
+        occurrences[package] = count
+        names.append(package if count == 1 else f"{package}_{count}")
+
+    lock_nodes = {}
+    for index, name in enumerate(names):
+        layer = index // width
+        first_child = (layer + 1) * width
+        inputs = {}
+        if first_child < nodes:
+            candidates = range(first_child, min(nodes, first_child + 2 * width))
+            for child in rng.sample(candidates, min(fanOut, len(candidates))):
+                child_name = names[child]
+                key = child_name.split("_")[0]
+                if key in inputs:
+                    key = child_name
+                inputs[key] = child_name
+        package = name.split("_")[0]
+        lock_nodes[name] = {
+            "inputs": inputs,
+            "locked": {
+                "lastModified": 1700000000 + index,
+                "owner": "pythoneda",
+                "repo": package,
+                "rev": f"{rng.getrandbits(160):040x}",
+                "type": "github",
+            },
+            "original": {
+                "owner": "pythoneda",
+                "ref": f"0.0.{rng.randint(1, 3)}",
+                "repo": package,
+                "type": "github",
+            },
+        }
+    lock_nodes["root"] = {
+        "inputs": {name.split("_")[0]: name for name in names[: min(width, nodes)]}
+    }
+
+    return {
+        "description": "synthetic",
+        "lastModified": 1700000000,
+        "locked": {"type": "path", "path": "/tmp/synthetic"},
+        "locks": {"nodes": lock_nodes, "root": "root", "version": 7},
+        "original": {"type": "path", "path": "/tmp/synthetic"},
+        "path": "/tmp/synthetic",
+        "url": "path:/tmp/synthetic",
+    }
+
+
+def synthetic_inputs(count: int, subInputs: int = 3, seed: int = 0) -> List:
+    """
+    Builds flakes to be used as inputs, each one sharing some of its own inputs with the others.
+    :param count: The number of inputs.
+    :type count: int
+    :param subInputs: The number of inputs of each input.
+    :type subInputs: int
+    :param seed: The seed of the random generator.
+    :type seed: int
+    :return: The flakes.
+    :rtype: List[pythoneda.shared.nix.flake.NixFlake]
+    """
+    from pythoneda.shared.nix.flake import FlakeUtilsNixFlake, NixFlake, NixpkgsNixFlake
+
+    rng = random.Random(seed)
+    shared = [FlakeUtilsNixFlake.default(), NixpkgsNixFlake.default()]
+    result = list(shared)
+    for index in range(count):
+        result.append(
+            NixFlake(
+                f"pythoneda-synthetic-{index}",
+                f"0.0.{index}",
+                f"github:pythoneda-synthetic/input-{index}-artifact/{{version}}?dir=input",
+                shared + rng.sample(result, min(subInputs, len(result))),
+                None,
+                f"Synthetic input {index}",
+                f"https://github.com/pythoneda-synthetic/input-{index}",
+                "gpl3",
+                [],
+                2023,
+                "rydnr",
+            )
+        )
+    return result
+
+
+def synthetic_flake(inputs: int, templatesFolder: str = None):
+    """
+    Builds a PythonEDA flake with many inputs.
+    :param inputs: The number of inputs.
+    :type inputs: int
+    :param templatesFolder: The folder with the templates.
+    :type templatesFolder: str
+    :return: The flake.
+    :rtype: pythoneda.shared.nix.flake.PythonedaNixFlake
+    """
+    from pythoneda.shared.nix.flake import PythonedaNixFlake
+
+    return PythonedaNixFlake(
+        "pythoneda-synthetic",
+        "0.0.1",
+        "github:pythoneda-synthetic/synthetic-artifact/{version}?dir=synthetic",
+        synthetic_inputs(inputs),
+        "Synthetic flake",
+        "https://github.com/pythoneda-synthetic/synthetic",
+        "B",
+        "D",
+        "D",
+        templatesFolder,
+    )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
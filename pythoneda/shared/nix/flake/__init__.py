@@ -21,30 +21,84 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 __path__ = __import__("pkgutil").extend_path(__path__, __name__)
 
+import importlib
 import sys
 
-from .github_url_template import GithubUrlTemplate
-from .license import License
-from .fetch_sha256_failed import FetchSha256Failed
-from .flake_lock_update_failed import FlakeLockUpdateFailed
-from .nix_flake_input import NixFlakeInput
-from .nix_flake import NixFlake
-from .pythoneda_nix_flake import PythonedaNixFlake
-from .pythoneda_shared_pythonlang_banner_nix_flake import (
-    PythonedaSharedPythonlangBannerNixFlake,
-)
-from .pythoneda_shared_pythonlang_domain_nix_flake import (
-    PythonedaSharedPythonlangDomainNixFlake,
-)
-from .pythoneda_shared_pythonlang_infrastructure_nix_flake import (
-    PythonedaSharedPythonlangInfrastructureNixFlake,
-)
-from .flake_utils_nix_flake import FlakeUtilsNixFlake
-from .nix_flake_metadata import NixFlakeMetadata
-from .nix_flake_input_relationship import NixFlakeInputRelationship
-from .nix_flake_spec import NixFlakeSpec
-from .nixpkgs_nix_flake import NixpkgsNixFlake
-from .nix_flake_spec_for_execution import NixFlakeSpecForExecution
+# Names are resolved on first access, so that importing a lightweight class
+# (e.g. NixFlakeInput) doesn't pull in stringtemplate3, git or shell helpers.
+_LAZY_IMPORTS = {
+    "GithubUrlTemplate": ".github_url_template",
+    "License": ".license",
+    "FetchSha256Cache": ".fetch_sha256_cache",
+    "FetchSha256Failed": ".fetch_sha256_failed",
+    "FlakeLockUpdateFailed": ".flake_lock_update_failed",
+    "FlakeLockUpdateResult": ".flake_lock_update_result",
+    "FlakeNixEditFailed": ".flake_nix_edit_failed",
+    "FlakeNixEditor": ".flake_nix_editor",
+    "NixFlakeInput": ".nix_flake_input",
+    "NixFlakeInputTable": ".nix_flake_input_table",
+    "NixFlakeLockClosure": ".nix_flake_lock_closure",
+    "NixFlakeLockGraph": ".nix_flake_lock_graph",
+    "NixFlakeBatchResult": ".nix_flake_batch_result",
+    "NixFlakeCommandExecutor": ".nix_flake_command_executor",
+    "NixFlakeCommandFailed": ".nix_flake_command_failed",
+    "NixFlakeFollowsDeclaration": ".nix_flake_follows_declaration",
+    "NixFlakeFollowsOptimization": ".nix_flake_follows_optimization",
+    "NixFlakeFollowsOptimizer": ".nix_flake_follows_optimizer",
+    "NixFlakeGitAdd": ".nix_flake_git_add",
+    "NixFlakeRecordingCommandExecutor": ".nix_flake_recording_command_executor",
+    "NixFlakeReplayCommandExecutor": ".nix_flake_replay_command_executor",
+    "NixFlake": ".nix_flake",
+    "PythonedaNixFlake": ".pythoneda_nix_flake",
+    "PythonedaSharedPythonlangBannerNixFlake": ".pythoneda_shared_pythonlang_banner_nix_flake",
+    "PythonedaSharedPythonlangDomainNixFlake": ".pythoneda_shared_pythonlang_domain_nix_flake",
+    "PythonedaSharedPythonlangInfrastructureNixFlake": ".pythoneda_shared_pythonlang_infrastructure_nix_flake",
+    "FlakeUtilsNixFlake": ".flake_utils_nix_flake",
+    "NixFlakeMetadataCache": ".nix_flake_metadata_cache",
+    "NixFlakeMetadataDiff": ".nix_flake_metadata_diff",
+    "NixFlakeMetadataFailed": ".nix_flake_metadata_failed",
+    "NixFlakeMetadata": ".nix_flake_metadata",
+    "NixFlakeInputRelationship": ".nix_flake_input_relationship",
+    "NixFlakeSpec": ".nix_flake_spec",
+    "NixpkgsNixFlake": ".nixpkgs_nix_flake",
+    "NixFlakeSpecForExecution": ".nix_flake_spec_for_execution",
+    "NixFlakeResultCache": ".nix_flake_result_cache",
+    "NixFlakeWorkspacePool": ".nix_flake_workspace_pool",
+    "NixFlakeOutputStream": ".nix_flake_output_stream",
+    "NixFlakeRenderer": ".nix_flake_renderer",
+    "NixFlakeSnapshot": ".nix_flake_snapshot",
+    "NixFlakeTimingHistogram": ".nix_flake_timing_histogram",
+    "NixFlakeTimings": ".nix_flake_timings",
+    "StringTemplateGroupCache": ".string_template_group_cache",
+}
+
+__all__ = list(_LAZY_IMPORTS.keys())
+
+
+def __getattr__(name: str):
+    """
+    Imports the module defining given name, the first time it's accessed.
+    :param name: The name.
+    :type name: str
+    :return: The class.
+    :rtype: type
+    """
+    module = _LAZY_IMPORTS.get(name, None)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    result = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = result
+    return result
+
+
+def __dir__():
+    """
+    Lists the names of this package, including the ones not imported yet.
+    :return: Such names.
+    :rtype: List[str]
+    """
+    return sorted(set(globals().keys()) | set(__all__))
+
 
 # vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
 # Local Variables:
@@ -0,0 +1,243 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/fetch_sha256_cache.py
+
+This file defines the FetchSha256Cache class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from collections import OrderedDict
+from .nix_flake_result_cache import NixFlakeResultCache
+import os
+from pathlib import Path
+from pythoneda.shared import BaseObject
+import sqlite3
+import threading
+
+
+class FetchSha256Cache(BaseObject):
+    """
+    Durable cache of the sha256 checksums computed by nix-prefetch-git.
+
+    Class name: FetchSha256Cache
+
+    Responsibilities:
+        - Persist (url, rev) -> sha256 mappings in a sqlite database.
+        - Serve the most recently used mappings from memory.
+        - Keep working from memory alone when the database is busy or broken.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+    """
+
+    _singleton = None
+
+    def __init__(
+        self, database: str = None, maxMemoryEntries: int = 4096, timeout: float = 5.0
+    ):
+        """
+        Creates a new FetchSha256Cache instance.
+        :param database: The sqlite database file, or None to keep the checksums in memory only.
+        :type database: str
+        :param maxMemoryEntries: The maximum number of checksums kept in memory.
+        :type maxMemoryEntries: int
+        :param timeout: The seconds to wait for other processes to release the database.
+        :type timeout: float
+        """
+        super().__init__()
+        self._database = database
+        self._max_memory_entries = maxMemoryEntries
+        self._timeout = timeout
+        self._memory: OrderedDict = OrderedDict()
+        self._connection = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.FetchSha256Cache
+        """
+        if cls._singleton is None:
+            cls._singleton = cls(
+                str(Path(NixFlakeResultCache.default_folder()) / "sha256.sqlite")
+            )
+        return cls._singleton
+
+    @property
+    def database(self) -> str:
+        """
+        Retrieves the sqlite database file.
+        :return: Such file, or None if the checksums are kept in memory only.
+        :rtype: str
+        """
+        return self._database
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Retrieves the connection to the database, opening it if needed.
+        :return: The connection, or None if there's no database or it cannot be opened.
+        :rtype: sqlite3.Connection
+        """
+        if self._connection is None and self.database is not None:
+            try:
+                os.makedirs(os.path.dirname(self.database) or ".", exist_ok=True)
+                self._connection = sqlite3.connect(
+                    self.database, timeout=self._timeout, check_same_thread=False
+                )
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS sha256 "
+                    "(url TEXT NOT NULL, rev TEXT NOT NULL, sha256 TEXT NOT NULL, "
+                    "PRIMARY KEY (url, rev))"
+                )
+                self._connection.commit()
+            except sqlite3.Error as error:
+                FetchSha256Cache.logger().warning(
+                    f"Falling back to an in-memory sha256 cache: {error}"
+                )
+                self._database = None
+                self._connection = None
+        return self._connection
+
+    def _execute(self, statement: str, parameters: tuple = (), commit: bool = False):
+        """
+        Runs given statement on the database, if any.
+        Errors, e.g. the database being locked by other processes for too long, are logged
+        and leave the caller working with the checksums in memory.
+        :param statement: The SQL statement.
+        :type statement: str
+        :param parameters: The statement parameters.
+        :type parameters: tuple
+        :param commit: Whether to commit afterwards.
+        :type commit: bool
+        :return: The first row, or None if there's none or the statement failed.
+        :rtype: tuple
+        """
+        result = None
+        db = self._db()
+        if db is not None:
+            try:
+                result = db.execute(statement, parameters).fetchone()
+                if commit:
+                    db.commit()
+            except sqlite3.Error as error:
+                FetchSha256Cache.logger().warning(
+                    f"Using the in-memory sha256 cache only: {error}"
+                )
+                try:
+                    db.rollback()
+                except sqlite3.Error:
+                    pass
+                result = None
+        return result
+
+    def _remember(self, url: str, rev: str, sha256: str):
+        """
+        Keeps given checksum in memory, evicting the least recently used if needed.
+        :param url: The repository url.
+        :type url: str
+        :param rev: The revision.
+        :type rev: str
+        :param sha256: The checksum.
+        :type sha256: str
+        """
+        self._memory[(url, rev)] = sha256
+        self._memory.move_to_end((url, rev))
+        while len(self._memory) > self._max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, url: str, rev: str) -> str:
+        """
+        Retrieves the cached checksum of given revision.
+        :param url: The repository url.
+        :type url: str
+        :param rev: The revision.
+        :type rev: str
+        :return: The sha256 value, or None if not cached.
+        :rtype: str
+        """
+        with self._lock:
+            result = self._memory.get((url, rev), None)
+            if result is not None:
+                self._memory.move_to_end((url, rev))
+            else:
+                row = self._execute(
+                    "SELECT sha256 FROM sha256 WHERE url = ? AND rev = ?", (url, rev)
+                )
+                if row is not None:
+                    result = row[0]
+                    self._remember(url, rev, result)
+        return result
+
+    def put(self, url: str, rev: str, sha256: str):
+        """
+        Stores the checksum of given revision.
+        :param url: The repository url.
+        :type url: str
+        :param rev: The revision.
+        :type rev: str
+        :param sha256: The checksum.
+        :type sha256: str
+        """
+        with self._lock:
+            self._remember(url, rev, sha256)
+            self._execute(
+                "INSERT OR REPLACE INTO sha256 (url, rev, sha256) VALUES (?, ?, ?)",
+                (url, rev, sha256),
+                commit=True,
+            )
+
+    def invalidate(self, url: str, rev: str):
+        """
+        Removes the checksum of given revision, if cached.
+        :param url: The repository url.
+        :type url: str
+        :param rev: The revision.
+        :type rev: str
+        """
+        with self._lock:
+            self._memory.pop((url, rev), None)
+            self._execute(
+                "DELETE FROM sha256 WHERE url = ? AND rev = ?", (url, rev), commit=True
+            )
+
+    def clear(self):
+        """
+        Removes all checksums.
+        """
+        with self._lock:
+            self._memory.clear()
+            self._execute("DELETE FROM sha256", commit=True)
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
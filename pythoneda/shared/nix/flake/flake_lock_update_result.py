@@ -0,0 +1,149 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/flake_lock_update_result.py
+
+This file defines the FlakeLockUpdateResult class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared import attribute, primary_key_attribute, ValueObject
+from typing import List
+
+
+class FlakeLockUpdateResult(ValueObject):
+    """
+    The outcome of updating the flake.lock file of one flake of a batch.
+
+    Class name: FlakeLockUpdateResult
+
+    Responsibilities:
+        - Tell whether the flake.lock file changed, and which of its nodes.
+        - Keep the error the update raised, if any.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+    """
+
+    def __init__(
+        self,
+        repositoryFolder: str,
+        flakeSubfolder: str = None,
+        inputs: List[str] = None,
+        changed: bool = False,
+        changedNodes: List[str] = None,
+        error: Exception = None,
+    ):
+        """
+        Creates a new FlakeLockUpdateResult instance.
+        :param repositoryFolder: The repository folder.
+        :type repositoryFolder: str
+        :param flakeSubfolder: The subfolder of the flake.nix file.
+        :type flakeSubfolder: str
+        :param inputs: The inputs requested to be updated, or None for all of them.
+        :type inputs: List[str]
+        :param changed: Whether the flake.lock file changed.
+        :type changed: bool
+        :param changedNodes: The lock nodes that were added, removed or re-locked.
+        :type changedNodes: List[str]
+        :param error: The error, if the update failed.
+        :type error: Exception
+        """
+        super().__init__()
+        self._repository_folder = repositoryFolder
+        self._flake_subfolder = flakeSubfolder
+        self._inputs = inputs
+        self._changed = changed
+        self._changed_nodes = changedNodes or []
+        self._error = error
+
+    @property
+    @primary_key_attribute
+    def repository_folder(self) -> str:
+        """
+        Retrieves the repository folder.
+        :return: Such folder.
+        :rtype: str
+        """
+        return self._repository_folder
+
+    @property
+    @primary_key_attribute
+    def flake_subfolder(self) -> str:
+        """
+        Retrieves the subfolder of the flake.nix file.
+        :return: Such subfolder, or None if it's the repository folder.
+        :rtype: str
+        """
+        return self._flake_subfolder
+
+    @property
+    @attribute
+    def inputs(self) -> List[str]:
+        """
+        Retrieves the inputs requested to be updated.
+        :return: Such inputs, or None if all of them were.
+        :rtype: List[str]
+        """
+        return self._inputs
+
+    @property
+    @attribute
+    def changed(self) -> bool:
+        """
+        Checks whether the flake.lock file changed.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._changed
+
+    @property
+    @attribute
+    def changed_nodes(self) -> List[str]:
+        """
+        Retrieves the lock nodes that were added, removed or re-locked.
+        :return: Such nodes.
+        :rtype: List[str]
+        """
+        return self._changed_nodes
+
+    @property
+    @attribute
+    def error(self) -> Exception:
+        """
+        Retrieves the error raised by the update.
+        :return: Such error, or None if it succeeded.
+        :rtype: Exception
+        """
+        return self._error
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        Checks whether the update succeeded.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._error is None
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,56 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/flake_nix_edit_failed.py
+
+This file defines the FlakeNixEditFailed class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared import BaseObject
+
+
+class FlakeNixEditFailed(Exception, BaseObject):
+    """
+    An edit could not be applied to a flake.nix file.
+
+    Class name: FlakeNixEditFailed
+
+    Responsibilities:
+        - Represent the error when an edited attribute is missing or cannot be changed.
+
+    Collaborators:
+        - None
+    """
+
+    def __init__(self, path: str, message: str):
+        """
+        Creates a new instance.
+        :param path: The flake.nix file.
+        :type path: str
+        :param message: The error message.
+        :type message: str
+        """
+        super().__init__(f"Cannot edit {path}: {message}")
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
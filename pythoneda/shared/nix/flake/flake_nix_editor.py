@@ -0,0 +1,679 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/flake_nix_editor.py
+
+This file defines the FlakeNixEditor class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .flake_nix_edit_failed import FlakeNixEditFailed
+import os
+from pythoneda.shared import BaseObject
+import re
+import shutil
+import tempfile
+from typing import Dict, List, Tuple
+
+
+class FlakeNixEditor(BaseObject):
+    """
+    Edits the versions, urls and sha256 checksums of a flake.nix file in place.
+
+    Class name: FlakeNixEditor
+
+    Responsibilities:
+        - Tokenize a flake.nix file once, locating its string-valued attributes.
+        - Queue edits of the url, version or sha256 of given inputs, or of the flake itself.
+        - Apply all queued edits in a single, atomic write, leaving the rest of the file untouched.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.FlakeNixEditFailed
+    """
+
+    _identifier = re.compile(r"[A-Za-z_][A-Za-z0-9_'\-]*")
+
+    _whitespace = re.compile(r"\s+")
+
+    _two_char_operators = ("${", "==", "!=", "<=", ">=", "&&", "||", "->", "//", "++")
+
+    _ref_parameter = re.compile(r"(^|&)ref=([^&]*)")
+
+    _escapes = {"n": "\n", "r": "\r", "t": "\t"}
+
+    _string_escape = re.compile(r"\\(.)", re.DOTALL)
+
+    _indented_string_escape = re.compile(r"''(?:\\(.)|(')|(\$))", re.DOTALL)
+
+    def __init__(self, path: str):
+        """
+        Creates a new FlakeNixEditor instance.
+        :param path: The flake.nix file.
+        :type path: str
+        """
+        super().__init__()
+        self._path = path
+        with open(path, "r", encoding="utf-8") as file:
+            self._text = file.read()
+        self._edits: Dict[int, Tuple[int, str, str]] = {}
+        self._parse()
+
+    @classmethod
+    def from_folder(cls, repositoryFolder: str, flakeSubfolder: str = None):
+        """
+        Creates a new instance for the flake.nix file of given folder.
+        :param repositoryFolder: The repository folder.
+        :type repositoryFolder: str
+        :param flakeSubfolder: The subfolder of the flake.nix file.
+        :type flakeSubfolder: str
+        :return: The editor.
+        :rtype: pythoneda.shared.nix.flake.FlakeNixEditor
+        """
+        folder = repositoryFolder
+        if flakeSubfolder is not None:
+            folder = os.path.join(folder, flakeSubfolder)
+        return cls(os.path.join(folder, "flake.nix"))
+
+    @property
+    def path(self) -> str:
+        """
+        Retrieves the flake.nix file.
+        :return: Such file.
+        :rtype: str
+        """
+        return self._path
+
+    @property
+    def text(self) -> str:
+        """
+        Retrieves the contents of the file, as last read or written.
+        :return: Such contents.
+        :rtype: str
+        """
+        return self._text
+
+    @property
+    def input_names(self) -> List[str]:
+        """
+        Retrieves the names of the inputs declared in the file.
+        :return: Such names, in order of appearance.
+        :rtype: List[str]
+        """
+        return list(
+            dict.fromkeys(
+                path[1]
+                for path in self._strings.keys()
+                if len(path) > 2 and path[0] == "inputs"
+            )
+        )
+
+    @property
+    def pending_edits(self) -> int:
+        """
+        Retrieves the number of edits not written yet.
+        :return: Such number.
+        :rtype: int
+        """
+        return len(self._edits)
+
+    @classmethod
+    def _string_end(cls, text: str, index: int) -> int:
+        """
+        Finds the end of a double-quoted string.
+        :param text: The text.
+        :type text: str
+        :param index: The position right after the opening quote.
+        :type index: int
+        :return: The position right after the closing quote.
+        :rtype: int
+        """
+        length = len(text)
+        while index < length:
+            char = text[index]
+            if char == "\\":
+                index += 2
+            elif char == '"':
+                return index + 1
+            elif text.startswith("${", index):
+                index = cls._interpolation_end(text, index + 2)
+            else:
+                index += 1
+        return length
+
+    @classmethod
+    def _indented_string_end(cls, text: str, index: int) -> int:
+        """
+        Finds the end of an indented ('') string.
+        :param text: The text.
+        :type text: str
+        :param index: The position right after the opening quotes.
+        :type index: int
+        :return: The position right after the closing quotes.
+        :rtype: int
+        """
+        length = len(text)
+        while index < length:
+            if text.startswith("''", index):
+                if text.startswith("'''", index) or text.startswith("''$", index):
+                    index += 3
+                elif text.startswith("''\\", index):
+                    index += 4
+                else:
+                    return index + 2
+            elif text.startswith("${", index):
+                index = cls._interpolation_end(text, index + 2)
+            else:
+                index += 1
+        return length
+
+    @classmethod
+    def _interpolation_end(cls, text: str, index: int) -> int:
+        """
+        Finds the end of an interpolation inside a string.
+        :param text: The text.
+        :type text: str
+        :param index: The position right after "${".
+        :type index: int
+        :return: The position right after the closing brace.
+        :rtype: int
+        """
+        length = len(text)
+        depth = 1
+        while index < length:
+            char = text[index]
+            if char == '"':
+                index = cls._string_end(text, index + 1)
+            elif text.startswith("''", index):
+                index = cls._indented_string_end(text, index + 2)
+            elif char == "{":
+                depth += 1
+                index += 1
+            elif char == "}":
+                depth -= 1
+                index += 1
+                if depth == 0:
+                    return index
+            else:
+                index += 1
+        return length
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Splits Nix code into identifiers, strings and operators, skipping whitespace and comments.
+        :param text: The code.
+        :type text: str
+        :return: The (kind, start, end) of each token.
+        :rtype: List[Tuple[str, int, int]]
+        """
+        result = []
+        length = len(text)
+        index = 0
+        while index < length:
+            char = text[index]
+            if char.isspace():
+                index = cls._whitespace.match(text, index).end()
+            elif char == "#":
+                end = text.find("\n", index)
+                index = length if end < 0 else end
+            elif text.startswith("/*", index):
+                end = text.find("*/", index + 2)
+                index = length if end < 0 else end + 2
+            elif char == '"':
+                end = cls._string_end(text, index + 1)
+                result.append(("string", index, end))
+                index = end
+            elif text.startswith("''", index):
+                end = cls._indented_string_end(text, index + 2)
+                result.append(("string", index, end))
+                index = end
+            else:
+                match = cls._identifier.match(text, index)
+                if match:
+                    end = match.end()
+                    result.append(("ident", index, end))
+                elif text.startswith(cls._two_char_operators, index):
+                    end = index + 2
+                    result.append(("op", index, end))
+                else:
+                    end = index + 1
+                    result.append(("op", index, end))
+                index = end
+        return result
+
+    def _content_span(self, start: int, end: int) -> Tuple[int, int, str]:
+        """
+        Retrieves the span of the contents of a string token.
+        :param start: The start of the token.
+        :type start: int
+        :param end: The end of the token.
+        :type end: int
+        :return: The start and end of the contents, and the opening quote.
+        :rtype: Tuple[int, int, str]
+        """
+        if self._text.startswith("''", start):
+            return start + 2, end - 2, "''"
+        return start + 1, end - 1, '"'
+
+    def _parse(self):
+        """
+        Locates the string-valued attributes, by attribute path.
+        Attributes nested in values (e.g. in let blocks or function calls) are
+        filed under the path of the enclosing attribute.
+        """
+        self._strings: Dict[Tuple[str, ...], List[Tuple[int, int, str]]] = {}
+        text = self._text
+        tokens = self.__class__.tokenize(text)
+        # each frame: [kind, path, expecting a binding, binding path, value start, pending ";"]
+        stack = [["expr", (), False, None, 0, 0]]
+        index = 0
+        count = len(tokens)
+        while index < count:
+            kind, start, end = tokens[index]
+            value = text[start:end]
+            frame = stack[-1]
+            if frame[0] in ("attrs", "let") and frame[2]:
+                if value == "}" and kind == "op":
+                    if len(stack) > 1:
+                        stack.pop()
+                    index += 1
+                    continue
+                if value == "in" and kind == "ident" and frame[0] == "let":
+                    stack.pop()
+                    index += 1
+                    continue
+                if value == "inherit" and kind == "ident":
+                    while (
+                        index < count
+                        and text[tokens[index][1] : tokens[index][2]] != ";"
+                    ):
+                        index += 1
+                    index += 1
+                    continue
+                names, after = self._attribute_path(tokens, index)
+                if (
+                    names
+                    and after < count
+                    and text[tokens[after][1] : tokens[after][2]] == "="
+                ):
+                    frame[2] = False
+                    frame[3] = frame[1] + tuple(names)
+                    frame[4] = after + 1
+                    frame[5] = 0
+                    index = after + 1
+                    continue
+                # a function's argument pattern, not an attribute set
+                frame[0] = "expr"
+                continue
+
+            path = frame[3] if frame[0] in ("attrs", "let") else frame[1]
+            if kind == "op" and value in ("{", "${"):
+                stack.append(
+                    ["attrs" if value == "{" else "expr", path, True, None, 0, 0]
+                )
+            elif kind == "op" and value in ("(", "["):
+                stack.append(["expr", path, False, None, 0, 0])
+            elif kind == "op" and value in ("}", ")", "]"):
+                if len(stack) > 1:
+                    stack.pop()
+            elif kind == "ident" and value == "let":
+                stack.append(["let", path, True, None, 0, 0])
+            elif kind == "ident" and value in ("with", "assert"):
+                frame[5] += 1
+            elif kind == "op" and value == ";":
+                if frame[5] > 0:
+                    frame[5] -= 1
+                elif frame[0] in ("attrs", "let"):
+                    if index == frame[4] + 1 and tokens[frame[4]][0] == "string":
+                        self._strings.setdefault(frame[3], []).append(
+                            self._content_span(tokens[frame[4]][1], tokens[frame[4]][2])
+                        )
+                    frame[2] = True
+            index += 1
+
+    def _attribute_path(
+        self, tokens: List[Tuple[str, int, int]], index: int
+    ) -> Tuple[List[str], int]:
+        """
+        Reads an attribute path, such as inputs.nixos.url.
+        :param tokens: The tokens.
+        :type tokens: List[Tuple[str, int, int]]
+        :param index: The position of its first token.
+        :type index: int
+        :return: The names, and the position of the token after the path.
+        :rtype: Tuple[List[str], int]
+        """
+        names = []
+        text = self._text
+        count = len(tokens)
+        while index < count:
+            kind, start, end = tokens[index]
+            if kind == "ident":
+                names.append(text[start:end])
+            elif kind == "string":
+                content_start, content_end, _ = self._content_span(start, end)
+                names.append(text[content_start:content_end])
+            else:
+                break
+            index += 1
+            if index < count and text[tokens[index][1] : tokens[index][2]] == ".":
+                index += 1
+            else:
+                break
+        return names, index
+
+    def _unescape(self, start: int, end: int, quote: str) -> str:
+        """
+        Retrieves the value of a string, undoing its escapes as nix does: \\n, \\r
+        and \\t (''\\n, ''\\r and ''\\t in indented strings) are control characters,
+        and any other escaped character stands for itself.
+        :param start: The start of its contents.
+        :type start: int
+        :param end: The end of its contents.
+        :type end: int
+        :param quote: The opening quote.
+        :type quote: str
+        :return: The value.
+        :rtype: str
+        """
+        pending = self._edits.get(start, None)
+        if pending is not None:
+            return pending[2]
+        contents = self._text[start:end]
+        if quote == '"':
+            return self.__class__._string_escape.sub(
+                self.__class__._unescaped, contents
+            )
+        return self.__class__._indented_string_escape.sub(
+            self.__class__._unescaped, contents
+        )
+
+    @classmethod
+    def _unescaped(cls, match: re.Match) -> str:
+        """
+        Retrieves the text an escape sequence stands for.
+        :param match: The escape sequence, as matched by _string_escape or _indented_string_escape.
+        :type match: re.Match
+        :return: Such text.
+        :rtype: str
+        """
+        result = "$"
+        if match.group(1) is not None:
+            result = cls._escapes.get(match.group(1), match.group(1))
+        elif match.group(2) is not None:
+            result = "''"
+        return result
+
+    @classmethod
+    def _escape(cls, value: str, quote: str) -> str:
+        """
+        Escapes given value to be placed inside a string.
+        :param value: The value.
+        :type value: str
+        :param quote: The opening quote of the string.
+        :type quote: str
+        :return: The escaped value.
+        :rtype: str
+        """
+        if quote == '"':
+            return (
+                value.replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("${", "\\${")
+                .replace("\n", "\\n")
+                .replace("\r", "\\r")
+                .replace("\t", "\\t")
+            )
+        return value.replace("''", "'''").replace("${", "''${")
+
+    def _spans(self, inputName: str, attribute: str) -> List[Tuple[int, int, str]]:
+        """
+        Retrieves the strings assigned to given attribute of an input, or of the flake itself.
+        An input's attributes are the ones under `inputs.<name>`, whichever way the
+        attribute sets are nested; the flake's are all those outside `inputs`.
+        :param inputName: The name of the input, or None for the flake itself.
+        :type inputName: str
+        :param attribute: The attribute, e.g. "url" or "sha256".
+        :type attribute: str
+        :return: The start and end of the contents, and the opening quote, of each string.
+        :rtype: List[Tuple[int, int, str]]
+        """
+        result = []
+        for path, spans in self._strings.items():
+            if path[-1] != attribute:
+                continue
+            if inputName is None:
+                if path[0] != "inputs":
+                    result.extend(spans)
+            elif path[:2] == ("inputs", inputName) and len(path) == 3:
+                result.extend(spans)
+        return result
+
+    def _get(self, inputName: str, attribute: str) -> str:
+        """
+        Retrieves the value of given attribute, taking pending edits into account.
+        :param inputName: The name of the input, or None for the flake itself.
+        :type inputName: str
+        :param attribute: The attribute.
+        :type attribute: str
+        :return: The value, or None if the attribute is missing.
+        :rtype: str
+        """
+        result = None
+        spans = self._spans(inputName, attribute)
+        if spans:
+            result = self._unescape(*spans[0])
+        return result
+
+    def _set(self, inputName: str, attribute: str, value: str):
+        """
+        Queues the replacement of given attribute.
+        :param inputName: The name of the input, or None for the flake itself.
+        :type inputName: str
+        :param attribute: The attribute.
+        :type attribute: str
+        :param value: The new value.
+        :type value: str
+        """
+        spans = self._spans(inputName, attribute)
+        if not spans:
+            target = "the flake" if inputName is None else f"input {inputName}"
+            raise FlakeNixEditFailed(self._path, f"{target} has no {attribute}")
+        for start, end, quote in spans:
+            self._edits[start] = (end, quote, value)
+
+    def url(self, inputName: str) -> str:
+        """
+        Retrieves the url of given input.
+        :param inputName: The name of the input.
+        :type inputName: str
+        :return: The url, or None if the input is missing.
+        :rtype: str
+        """
+        return self._get(inputName, "url")
+
+    def version(self, inputName: str = None) -> str:
+        """
+        Retrieves the version of given input, as found in its url, or the version of the flake itself.
+        :param inputName: The name of the input, or None for the flake itself.
+        :type inputName: str
+        :return: The version, or None if it cannot be found.
+        :rtype: str
+        """
+        result = None
+        if inputName is None:
+            result = self._get(None, "version")
+        else:
+            url = self.url(inputName)
+            if url is not None:
+                result = self.__class__._version_in_url(url)
+        return result
+
+    def sha256(self, inputName: str = None) -> str:
+        """
+        Retrieves the sha256 checksum of given input, or of the flake itself.
+        :param inputName: The name of the input, or None for the flake itself.
+        :type inputName: str
+        :return: The checksum, or None if it cannot be found.
+        :rtype: str
+        """
+        return self._get(inputName, "sha256")
+
+    @classmethod
+    def _version_in_url(cls, url: str) -> str:
+        """
+        Extracts the version (the git ref) of a flake url.
+        :param url: The url, e.g. github:owner/repo/0.0.1?dir=x.
+        :type url: str
+        :return: The version, or None if the url has none.
+        :rtype: str
+        """
+        result = None
+        base, _, query = url.partition("?")
+        scheme, colon, rest = base.partition(":")
+        if colon and scheme in ("github", "gitlab", "sourcehut"):
+            segments = rest.split("/")
+            if len(segments) > 2:
+                result = "/".join(segments[2:])
+        if result is None:
+            match = cls._ref_parameter.search(query)
+            if match:
+                result = match.group(2)
+        return result
+
+    @classmethod
+    def _url_with_version(cls, url: str, version: str) -> str:
+        """
+        Points a flake url to another version (git ref).
+        :param url: The url, e.g. github:owner/repo/0.0.1?dir=x.
+        :type url: str
+        :param version: The new version.
+        :type version: str
+        :return: The new url, or None if the url doesn't support versions.
+        :rtype: str
+        """
+        result = None
+        base, separator, query = url.partition("?")
+        scheme, colon, rest = base.partition(":")
+        if colon and scheme in ("github", "gitlab", "sourcehut"):
+            segments = rest.split("/")
+            if len(segments) >= 2:
+                result = (
+                    f"{scheme}:{'/'.join(segments[:2] + [version])}{separator}{query}"
+                )
+        elif cls._ref_parameter.search(query):
+            result = (
+                base
+                + separator
+                + cls._ref_parameter.sub(
+                    lambda match: f"{match.group(1)}ref={version}", query, count=1
+                )
+            )
+        return result
+
+    def set_url(self, inputName: str, url: str):
+        """
+        Queues a change of the url of given input.
+        :param inputName: The name of the input.
+        :type inputName: str
+        :param url: The new url.
+        :type url: str
+        """
+        self._set(inputName, "url", url)
+
+    def set_version(self, inputName: str, version: str):
+        """
+        Queues a change of the version of given input, in its url, or of the flake itself.
+        :param inputName: The name of the input, or None for the flake itself.
+        :type inputName: str
+        :param version: The new version.
+        :type version: str
+        """
+        if inputName is None:
+            self._set(None, "version", version)
+        else:
+            url = self.url(inputName)
+            if url is None:
+                raise FlakeNixEditFailed(self._path, f"input {inputName} has no url")
+            new_url = self.__class__._url_with_version(url, version)
+            if new_url is None:
+                raise FlakeNixEditFailed(
+                    self._path, f"the url of input {inputName} has no version: {url}"
+                )
+            self._set(inputName, "url", new_url)
+
+    def set_sha256(self, sha256: str, inputName: str = None):
+        """
+        Queues a change of the sha256 checksum of given input, or of the flake itself.
+        :param sha256: The new checksum.
+        :type sha256: str
+        :param inputName: The name of the input, or None for the flake itself.
+        :type inputName: str
+        """
+        self._set(inputName, "sha256", sha256)
+
+    def render(self) -> str:
+        """
+        Retrieves the contents of the file, with all pending edits applied.
+        :return: Such contents.
+        :rtype: str
+        """
+        parts = []
+        position = 0
+        for start in sorted(self._edits.keys()):
+            end, quote, value = self._edits[start]
+            parts.append(self._text[position:start])
+            parts.append(self.__class__._escape(value, quote))
+            position = end
+        parts.append(self._text[position:])
+        return "".join(parts)
+
+    def save(self) -> bool:
+        """
+        Writes all pending edits to the file, atomically.
+        :return: True if the contents changed.
+        :rtype: bool
+        """
+        result = False
+        if self._edits:
+            contents = self.render()
+            self._edits = {}
+            if contents != self._text:
+                folder = os.path.dirname(os.path.abspath(self._path))
+                fd, tmp_file = tempfile.mkstemp(dir=folder, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as file:
+                        file.write(contents)
+                    shutil.copymode(self._path, tmp_file)
+                    os.replace(tmp_file, self._path)
+                except BaseException:
+                    if os.path.exists(tmp_file):
+                        os.unlink(tmp_file)
+                    raise
+                self._text = contents
+                self._parse()
+                result = True
+        return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -19,21 +19,32 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import asyncio
+import copy
+from .fetch_sha256_cache import FetchSha256Cache
 from .fetch_sha256_failed import FetchSha256Failed
 from .flake_lock_update_failed import FlakeLockUpdateFailed
+from .flake_lock_update_result import FlakeLockUpdateResult
+from .flake_nix_editor import FlakeNixEditor
 import json
 import os
 from .license import License
+from .nix_flake_batch_result import NixFlakeBatchResult
+from .nix_flake_command_executor import NixFlakeCommandExecutor
+from .nix_flake_command_failed import NixFlakeCommandFailed
+from .nix_flake_follows_optimization import NixFlakeFollowsOptimization
+from .nix_flake_git_add import NixFlakeGitAdd
 from .nix_flake_input import NixFlakeInput
+from .nix_flake_output_stream import NixFlakeOutputStream
+from .nix_flake_renderer import NixFlakeRenderer
+from .nix_flake_result_cache import NixFlakeResultCache
+from .nix_flake_snapshot import NixFlakeSnapshot
+from .nix_flake_timings import NixFlakeTimings
+from .nix_flake_workspace_pool import NixFlakeWorkspacePool
 from pathlib import Path
 from pythoneda.shared import attribute, primary_key_attribute, Entity, EventReference
-from pythoneda.shared.git import GitAdd, GitInit
-from pythoneda.shared.shell import AsyncShell
-import re
-from stringtemplate3 import PathGroupLoader, StringTemplateGroup
 import subprocess
-import tempfile
-from typing import List
+from typing import AsyncIterator, Callable, Dict, List, Tuple
 
 
 class NixFlake(Entity):
@@ -50,6 +61,10 @@ class NixFlake(Entity):
         - pythoneda.shared.nix.flake.NixFlakeInput
     """
 
+    _fetch_sha256_in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    _dag_serialization = False
+
     def __init__(
         self,
         name: str,
@@ -98,7 +113,12 @@ class NixFlake(Entity):
         self._name = name
         self._version = version
         self._url_template = urlTemplate
-        self._inputs = list({obj.name: obj.to_input() for obj in inputs}.values())
+        self._inputs = {obj.name: obj.to_input() for obj in inputs}
+        self._inputs_tuple = None
+        self._dependents = {}
+        self._follows_overrides = {}
+        self._executor = None
+        self._changed_files = {}
         self._template_subfolder = templateSubfolder
         self._description = description
         self._homepage = homepage
@@ -113,8 +133,7 @@ class NixFlake(Entity):
         else:
             self._templates_folder = self.default_templates_folder()
 
-        for bindable_input in self._inputs:
-            bindable_input.bind(self)
+        self._bind_inputs()
         super().__init__(eventHistory=eventHistory)
 
     @classmethod
@@ -161,10 +180,95 @@ class NixFlake(Entity):
     def inputs(self) -> List:
         """
         Retrieves the inputs of the flake.
+        It's read-only: use add_input, update_input or remove_input to change them.
         :return: Such collection.
-        :rtype: List
+        :rtype: Tuple
+        """
+        if self._inputs_tuple is None:
+            self._inputs_tuple = tuple(self._inputs.values())
+        return self._inputs_tuple
+
+    def get_input(self, name: str) -> NixFlakeInput:
+        """
+        Retrieves the input with given name.
+        :param name: The name of the input.
+        :type name: str
+        :return: The input, or None if the flake has no such input.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        return self._inputs.get(name, None)
+
+    def _index_input(self, target: NixFlakeInput):
         """
-        return self._inputs
+        Registers given input as a dependent of each of its own inputs.
+        :param target: The input.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        for aux in target.inputs:
+            self._dependents.setdefault(aux.name, set()).add(target.name)
+
+    def _unindex_input(self, target: NixFlakeInput):
+        """
+        Unregisters given input as a dependent of its own inputs.
+        :param target: The input.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        for aux in target.inputs:
+            dependents = self._dependents.get(aux.name, None)
+            if dependents is not None:
+                dependents.discard(target.name)
+                if not dependents:
+                    del self._dependents[aux.name]
+
+    def _bind_inputs(self):
+        """
+        Rebuilds the dependents index, and binds all inputs to this flake.
+        """
+        self._inputs_tuple = None
+        self._dependents = {}
+        for aux in self._inputs.values():
+            self._index_input(aux)
+        for aux in self._inputs.values():
+            aux.bind(self)
+
+    def _rebind_dependents(self, name: str):
+        """
+        Refreshes the follows of the inputs which have given one among their own inputs.
+        :param name: The name of the input that changed.
+        :type name: str
+        """
+        for dependent in self._dependents.get(name, ()):
+            aux = self._inputs.get(dependent, None)
+            if aux is not None:
+                aux.bind(self)
+
+    def follows_overrides_of(self, name: str) -> List:
+        """
+        Retrieves the follows declared for given input besides the ones of its own inputs named as the flake's.
+        :param name: The name of the input.
+        :type name: str
+        :return: The declarations.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeFollowsDeclaration]
+        """
+        return self._follows_overrides.get(name, [])
+
+    def apply_follows(self, optimization: NixFlakeFollowsOptimization):
+        """
+        Declares the follows computed by NixFlakeFollowsOptimizer, so that the flake.nix file includes them.
+        :param optimization: The follows to declare, or None to drop the ones declared.
+        :type optimization: pythoneda.shared.nix.flake.NixFlakeFollowsOptimization
+        """
+        if optimization is None:
+            self._follows_overrides = {}
+        else:
+            self._follows_overrides = optimization.declarations_by_input()
+            NixFlake.logger().debug(
+                f"{self.name}: {len(optimization.declarations)} follows would stop fetching "
+                f"{optimization.fetched_before - optimization.fetched_after} of "
+                f"{optimization.fetched_before} inputs"
+            )
+        for aux in self._inputs.values():
+            aux.bind(self)
 
     def update_input(self, target: NixFlakeInput) -> bool:
         """
@@ -175,11 +279,15 @@ class NixFlake(Entity):
         :rtype: bool
         """
         result = False
-        for i, item in enumerate(self.inputs):
-            if item.url == target.url:
-                self.inputs[i] = target
-                result = True
-                break
+        previous = self._inputs.get(target.name, None)
+        if previous is not None:
+            self._unindex_input(previous)
+            self._inputs[target.name] = target
+            self._inputs_tuple = None
+            self._index_input(target)
+            target.bind(self)
+            self._rebind_dependents(target.name)
+            result = True
         return result
 
     def remove_input(self, target: NixFlakeInput) -> bool:
@@ -191,8 +299,11 @@ class NixFlake(Entity):
         :rtype: bool
         """
         result = False
-        if target in self.inputs:
-            self.inputs.remove(target)
+        previous = self._inputs.pop(target.name, None)
+        if previous is not None:
+            self._unindex_input(previous)
+            self._inputs_tuple = None
+            self._rebind_dependents(target.name)
             result = True
         return result
 
@@ -205,8 +316,12 @@ class NixFlake(Entity):
         :rtype: bool
         """
         result = False
-        if target not in self.inputs:
-            self.inputs.append(target)
+        if target.name not in self._inputs:
+            self._inputs[target.name] = target
+            self._inputs_tuple = None
+            self._index_input(target)
+            target.bind(self)
+            self._rebind_dependents(target.name)
             result = True
         return result
 
@@ -346,9 +461,10 @@ class NixFlake(Entity):
         :type varValue: int, bool, str, type
         """
         if varName == "inputs":
-            self._inputs = [NixFlakeInput.from_dict(value) for value in varValue]
-            for input in self._inputs:
-                input.bind(self)
+            self._inputs = {
+                aux.name: aux for aux in NixFlakeInput.inputs_from_json(varValue)
+            }
+            self._bind_inputs()
         elif varName == "license":
             if varValue is not None:
                 self._license = License.from_dict(varValue)
@@ -365,7 +481,10 @@ class NixFlake(Entity):
         """
         result = None
         if varName == "inputs":
-            result = [aux.to_dict() for aux in self._inputs]
+            if self._dag_serialization:
+                result = NixFlakeInput.inputs_to_dag(self.inputs)
+            else:
+                result = [aux.to_dict() for aux in self.inputs]
 
         elif varName == "license":
             if self._license is None:
@@ -376,6 +495,39 @@ class NixFlake(Entity):
             result = super()._get_attribute_to_json(varName)
         return result
 
+    def to_dag_dict(self) -> Dict:
+        """
+        Serializes this flake, emitting each distinct input in its graph only once.
+        :return: The dictionary, with its inputs as a DAG (see NixFlakeInput.inputs_to_dag).
+        :rtype: Dict
+        """
+        return self._serializer(True).to_dict()
+
+    def _serializer(self, dag: bool):
+        """
+        Retrieves a shallow copy of this instance serializing its inputs in given format.
+        The mode travels with the copy, so concurrent calls to to_dict() on this
+        instance are not affected.
+        :param dag: Whether to serialize the inputs as a DAG.
+        :type dag: bool
+        :return: The copy.
+        :rtype: pythoneda.shared.nix.flake.NixFlake
+        """
+        result = copy.copy(self)
+        result._dag_serialization = dag
+        return result
+
+    @classmethod
+    def from_dag_dict(cls, data: Dict):
+        """
+        Deserializes a flake serialized with to_dag_dict, restoring shared inputs as shared instances.
+        :param data: The dictionary.
+        :type data: Dict
+        :return: The flake.
+        :rtype: pythoneda.shared.nix.flake.NixFlake
+        """
+        return cls.from_dict(data)
+
     async def generate_files(self, flakeFolder: str):
         """
         Generates the files.
@@ -384,6 +536,25 @@ class NixFlake(Entity):
         """
         await self.generate_flake(flakeFolder)
 
+    async def regenerate_files(self, flakeFolder: str) -> List[str]:
+        """
+        Generates the files, and tells which ones changed.
+        Files whose content didn't change are not rewritten.
+        :param flakeFolder: The flake folder.
+        :type flakeFolder: str
+        :return: The names of the files written.
+        :rtype: List[str]
+        """
+        key = str(flakeFolder)
+        self._changed_files[key] = []
+        try:
+            await self.generate_files(flakeFolder)
+            result = self._changed_files[key]
+        finally:
+            del self._changed_files[key]
+
+        return result
+
     def parent_folder(self, path: str) -> str:
         """
         Retrieves the parent folder of given path.
@@ -459,27 +630,73 @@ class NixFlake(Entity):
         :type rootTemplate: str
         :param outputFileName: The name of the generated file.
         :type outputFileName: str
+        :return: True if the file was written; False if it already had the rendered content.
+        :rtype: bool
+        """
+        with self.span(f"render {outputFileName}"):
+            content = NixFlakeRenderer.render_template(
+                self, groupName, templateFolder, rootTemplate
+            )
+
+        _, result = NixFlakeRenderer.write_if_changed(
+            str(Path(outputFolder) / outputFileName), content
+        )
+        if result:
+            changed_files = self._changed_files.get(str(outputFolder), None)
+            if changed_files is not None:
+                changed_files.append(outputFileName)
+        else:
+            NixFlake.logger().debug(f"{outputFileName} is up to date")
+
+        return result
+
+    def template_jobs(self) -> List[Tuple[str, str, str, str]]:
+        """
+        Retrieves the templates generate_files processes, so they can be rendered elsewhere.
+        :return: The (group name, template folder, root template, output file name) of each file.
+        :rtype: List[Tuple[str, str, str, str]]
         """
-        # Manually read the .stg file
-        with open(
-            Path(templateFolder) / f"{groupName}.stg", "r", encoding="utf-8"
-        ) as f:
-            # Create a group from the string content
-            group = StringTemplateGroup(
-                name=groupName, file=f, rootDir=str(templateFolder)
+        return [
+            (
+                "FlakeNix",
+                str(Path(self.templates_folder) / self.template_subfolder),
+                "root",
+                "flake.nix",
             )
+        ]
 
-            root_template = group.getInstanceOf("root")
-            root_template["flake"] = self
+    def snapshot(self) -> NixFlakeSnapshot:
+        """
+        Captures what the templates can see of this flake, in a picklable form.
+        :return: The snapshot.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeSnapshot
+        """
+        return NixFlakeSnapshot.of(self)
 
-        with open(Path(outputFolder) / outputFileName, "w") as output_file:
-            output_file.write(str(root_template))
+    @classmethod
+    async def generate_files_many(
+        cls, flakes: List, outputFolders: List[str], renderer=None
+    ) -> List[Dict[str, str]]:
+        """
+        Generates the files of many flakes, rendering them in a pool of processes.
+        :param flakes: The flakes.
+        :type flakes: List[pythoneda.shared.nix.flake.NixFlake]
+        :param outputFolders: The folder of each flake.
+        :type outputFolders: List[str]
+        :param renderer: The renderer, or None to use the shared one.
+        :type renderer: pythoneda.shared.nix.flake.NixFlakeRenderer
+        :return: The sha256 of each generated file, by name, for each flake.
+        :rtype: List[Dict[str, str]]
+        """
+        return await (renderer or NixFlakeRenderer.instance()).render_many(
+            flakes, outputFolders
+        )
 
     async def git_add_files(self, gitAdd):
         """
         Adds the generated files to git.
         :param gitAdd: The GitAdd instance.
-        :type gitAdd: pythoneda.shared.git.GitAdd
+        :type gitAdd: pythoneda.shared.nix.flake.NixFlakeGitAdd
         """
         await self.git_add_flake(gitAdd)
 
@@ -487,147 +704,661 @@ class NixFlake(Entity):
         """
         Adds the generated flake.nix file to git.
         :param gitAdd: The GitAdd instance.
-        :type gitAdd: pythoneda.shared.git.GitAdd
+        :type gitAdd: pythoneda.shared.nix.flake.NixFlakeGitAdd
         """
         await gitAdd.add("flake.nix")
 
-    async def run(self) -> str:
+    @property
+    def executor(self) -> NixFlakeCommandExecutor:
+        """
+        Retrieves the executor running nix and git for this flake.
+        :return: Such executor; the process-wide one unless another one was set.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        """
+        return self._executor or NixFlakeCommandExecutor.instance()
+
+    @executor.setter
+    def executor(self, value: NixFlakeCommandExecutor):
+        """
+        Specifies the executor running nix and git for this flake.
+        :param value: The executor, or None to use the process-wide one.
+        :type value: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        """
+        self._executor = value
+
+    def span(self, phase: str):
+        """
+        Times a phase of an operation on this flake. See NixFlakeTimings.
+        :param phase: The phase.
+        :type phase: str
+        :return: A context manager timing the enclosed code.
+        :rtype: contextlib.AbstractContextManager
+        """
+        return NixFlakeTimings.instance().span(self.name, phase)
+
+    def workspace(self, usePool: bool = True):
+        """
+        Provides a git-initialised folder where to generate and evaluate this flake.
+        :param usePool: Whether to reuse this flake's workspace from the pool.
+        :type usePool: bool
+        :return: An asynchronous context manager yielding the folder.
+        :rtype: contextlib.AbstractAsyncContextManager
+        """
+        if usePool:
+            return NixFlakeWorkspacePool.instance().workspace(self)
+        return NixFlakeWorkspacePool.temporary_workspace(self)
+
+    async def run(self, useCache: bool = True, usePool: bool = True) -> str:
         """
         Runs this flake, and returns the path to the derivation.
+        Raises NixFlakeCommandFailed if nix exits with an error.
+        :param useCache: Whether to reuse the derivation path of an identical flake.
+        :type useCache: bool
+        :param usePool: Whether to reuse this flake's workspace from the pool.
+        :type usePool: bool
         :return: Such path.
         :rtype: str
         """
         result = None
-        with tempfile.TemporaryDirectory() as tmp_folder:
-            await self.generate_files(tmp_folder)
-            await GitInit(tmp_folder).init()
-            await self.git_add_files(GitAdd(tmp_folder))
+        with self.span("run"):
+            async with self.workspace(usePool) as flake_folder:
+                with self.span("generate_files"):
+                    await self.generate_files(flake_folder)
+                content_hash = None
+                if useCache:
+                    with self.span("content_hash"):
+                        content_hash = NixFlakeResultCache.content_hash(flake_folder)
+                with self.span("git_add_files"):
+                    await self.git_add_files(
+                        NixFlakeGitAdd(flake_folder, self.executor)
+                    )
 
-            NixFlake.logger().debug(f'Launching "nix run" on {tmp_folder}')
-            process, _, _ = await AsyncShell(
-                ["command", "nix", "run", "."], tmp_folder
-            ).run()
+                NixFlake.logger().debug(f'Launching "nix run" on {flake_folder}')
+                with self.span("nix run"):
+                    returncode, _, stderr = await self.executor.execute(
+                        ["command", "nix", "run", "."], flake_folder
+                    )
+                if returncode != 0:
+                    raise NixFlakeCommandFailed(
+                        self.name, "nix run", returncode, stderr
+                    )
 
-            result = await self.eval(tmp_folder)
+                if content_hash is not None:
+                    result = NixFlakeResultCache.instance().get("run", content_hash)
+                if result is None:
+                    result = await self.eval(flake_folder)
+                    if content_hash is not None and result:
+                        NixFlakeResultCache.instance().put("run", content_hash, result)
 
         NixFlake.logger().debug(f'"nix run" finished: {result}')
 
         return result
 
-    async def build(self) -> str:
+    async def build(self, useCache: bool = True, usePool: bool = True) -> str:
         """
         Builds this flake, and returns the path to the derivation.
-        :return: Such path.
+        Raises NixFlakeCommandFailed if nix exits with an error.
+        :param useCache: Whether to reuse the result of building an identical flake.
+        :type useCache: bool
+        :param usePool: Whether to reuse this flake's workspace from the pool.
+        :type usePool: bool
+        :return: Such path, or None if nix produced no result link.
         :rtype: str
         """
         result = None
-        with tempfile.TemporaryDirectory() as tmp_folder:
-            await self.generate_files(tmp_folder)
-            await GitInit(tmp_folder).init()
-            await self.git_add_files(GitAdd(tmp_folder))
+        with self.span("build"):
+            async with self.workspace(usePool) as flake_folder:
+                with self.span("generate_files"):
+                    await self.generate_files(flake_folder)
+                content_hash = None
+                if useCache:
+                    with self.span("content_hash"):
+                        content_hash = NixFlakeResultCache.content_hash(flake_folder)
+                    result = NixFlakeResultCache.instance().get("build", content_hash)
+
+                if result is None:
+                    with self.span("git_add_files"):
+                        await self.git_add_files(
+                            NixFlakeGitAdd(flake_folder, self.executor)
+                        )
 
-            NixFlake.logger().debug(f'Launching "nix build" on {tmp_folder}')
-            process, _, _ = await AsyncShell(
-                ["command", "nix", "build", "."], tmp_folder
-            ).run()
+                    result_link = os.path.join(flake_folder, "result")
+                    if os.path.lexists(result_link):
+                        # a failed build must not return the previous one
+                        os.unlink(result_link)
 
-            result = os.path.realpath(os.path.join(tmp_folder, "result"))
+                    NixFlake.logger().debug(f'Launching "nix build" on {flake_folder}')
+                    with self.span("nix build"):
+                        returncode, _, stderr = await self.executor.execute(
+                            ["command", "nix", "build", "."], flake_folder
+                        )
+
+                    if returncode != 0:
+                        raise NixFlakeCommandFailed(
+                            self.name, "nix build", returncode, stderr
+                        )
+                    if os.path.lexists(result_link):
+                        result = os.path.realpath(result_link)
+                        if content_hash is not None and os.path.exists(result):
+                            NixFlakeResultCache.instance().put(
+                                "build", content_hash, result
+                            )
+                else:
+                    NixFlake.logger().debug(f"Reusing {result} for {self.name}")
 
         NixFlake.logger().debug(f'"nix build" finished: {result}')
 
         return result
 
-    async def develop(self, cmd: List[str]) -> str:
+    async def develop(self, cmd: List[str], usePool: bool = True) -> str:
         """
         Runs given command inside the flake's development environment.
+        Raises NixFlakeCommandFailed if the command exits with an error.
         :param cmd: The command to run.
         :type cmd: List[str]
+        :param usePool: Whether to reuse this flake's workspace from the pool.
+        :type usePool: bool
         :return: The command output.
         :rtype: str
         """
         result = None
-        with tempfile.TemporaryDirectory() as tmp_folder:
-            await self.generate_files(tmp_folder)
-            await GitInit(tmp_folder).init()
-            await self.git_add_files(GitAdd(tmp_folder))
+        with self.span("develop"):
+            async with self.workspace(usePool) as flake_folder:
+                with self.span("generate_files"):
+                    await self.generate_files(flake_folder)
+                with self.span("git_add_files"):
+                    await self.git_add_files(
+                        NixFlakeGitAdd(flake_folder, self.executor)
+                    )
 
-            NixFlake.logger().debug(f'Launching "nix develop -c {cmd}" on {tmp_folder}')
-            args = ["command", "nix", "develop", "--impure", "-c"] + cmd
-            env = {}
-            env["PYTHONEDA_NO_BANNER"] = "1"
-            _, result, _ = await AsyncShell(args=args, cwd=tmp_folder, env=env).run()
+                NixFlake.logger().debug(
+                    f'Launching "nix develop -c {cmd}" on {flake_folder}'
+                )
+                args = ["command", "nix", "develop", "--impure", "-c"] + cmd
+                env = {}
+                env["PYTHONEDA_NO_BANNER"] = "1"
+                with self.span("nix develop"):
+                    returncode, result, stderr = await self.executor.execute(
+                        args, flake_folder, env
+                    )
+                if returncode != 0:
+                    raise NixFlakeCommandFailed(
+                        self.name, "nix develop", returncode, stderr
+                    )
 
         NixFlake.logger().debug(f'"nix develop -c {cmd}" finished: {result}')
 
         return result
 
+    def run_stream(
+        self,
+        usePool: bool = True,
+        maxQueuedLines: int = 1024,
+        maxRetainedLines: int = 1000,
+    ) -> NixFlakeOutputStream:
+        """
+        Runs this flake, streaming its output as it's produced.
+        :param usePool: Whether to reuse this flake's workspace from the pool.
+        :type usePool: bool
+        :param maxQueuedLines: The number of lines read ahead of the consumer before pausing the command.
+        :type maxQueuedLines: int
+        :param maxRetainedLines: The number of most recent lines to keep, or None to keep them all.
+        :type maxRetainedLines: int
+        :return: An asynchronous iterable of (stream, line) tuples.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeOutputStream
+        """
+        return NixFlakeOutputStream(
+            self,
+            ["command", "nix", "run", "."],
+            None,
+            usePool,
+            maxQueuedLines,
+            maxRetainedLines,
+        )
+
+    def develop_stream(
+        self,
+        cmd: List[str],
+        usePool: bool = True,
+        maxQueuedLines: int = 1024,
+        maxRetainedLines: int = 1000,
+    ) -> NixFlakeOutputStream:
+        """
+        Runs given command inside the flake's development environment, streaming its output as it's produced.
+        :param cmd: The command to run.
+        :type cmd: List[str]
+        :param usePool: Whether to reuse this flake's workspace from the pool.
+        :type usePool: bool
+        :param maxQueuedLines: The number of lines read ahead of the consumer before pausing the command.
+        :type maxQueuedLines: int
+        :param maxRetainedLines: The number of most recent lines to keep, or None to keep them all.
+        :type maxRetainedLines: int
+        :return: An asynchronous iterable of (stream, line) tuples.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeOutputStream
+        """
+        return NixFlakeOutputStream(
+            self,
+            ["command", "nix", "develop", "--impure", "-c"] + cmd,
+            {"PYTHONEDA_NO_BANNER": "1"},
+            usePool,
+            maxQueuedLines,
+            maxRetainedLines,
+        )
+
+    @classmethod
+    async def _for_many(
+        cls, flakes: List, operation: Callable, maxConcurrency: int
+    ) -> AsyncIterator[NixFlakeBatchResult]:
+        """
+        Runs given operation on each flake, with bounded parallelism.
+        :param flakes: The flakes.
+        :type flakes: List[pythoneda.shared.nix.flake.NixFlake]
+        :param operation: The coroutine function to run on each flake.
+        :type operation: Callable
+        :param maxConcurrency: The maximum number of simultaneous operations.
+        :type maxConcurrency: int
+        :return: The results, as they complete.
+        :rtype: AsyncIterator[pythoneda.shared.nix.flake.NixFlakeBatchResult]
+        """
+        semaphore = asyncio.Semaphore(max(1, maxConcurrency))
+
+        async def guarded(flake) -> NixFlakeBatchResult:
+            async with semaphore:
+                try:
+                    return NixFlakeBatchResult(flake, await operation(flake))
+                except Exception as error:
+                    NixFlake.logger().error(f"{flake.name} failed: {error}")
+                    return NixFlakeBatchResult(flake, None, error)
+
+        tasks = [asyncio.ensure_future(guarded(flake)) for flake in flakes]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                yield await next_completed
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @classmethod
+    async def build_many(
+        cls,
+        flakes: List,
+        maxConcurrency: int = 4,
+        useCache: bool = True,
+        usePool: bool = True,
+    ) -> AsyncIterator[NixFlakeBatchResult]:
+        """
+        Builds given flakes concurrently. A failure doesn't abort the batch.
+        :param flakes: The flakes to build.
+        :type flakes: List[pythoneda.shared.nix.flake.NixFlake]
+        :param maxConcurrency: The maximum number of simultaneous builds.
+        :type maxConcurrency: int
+        :param useCache: Whether to reuse the result of building identical flakes.
+        :type useCache: bool
+        :param usePool: Whether to reuse the flakes' workspaces from the pool.
+        :type usePool: bool
+        :return: The results, as they complete.
+        :rtype: AsyncIterator[pythoneda.shared.nix.flake.NixFlakeBatchResult]
+        """
+        async for result in cls._for_many(
+            flakes,
+            lambda flake: flake.build(useCache=useCache, usePool=usePool),
+            maxConcurrency,
+        ):
+            yield result
+
+    @classmethod
+    async def run_many(
+        cls,
+        flakes: List,
+        maxConcurrency: int = 4,
+        useCache: bool = True,
+        usePool: bool = True,
+    ) -> AsyncIterator[NixFlakeBatchResult]:
+        """
+        Runs given flakes concurrently. A failure doesn't abort the batch.
+        :param flakes: The flakes to run.
+        :type flakes: List[pythoneda.shared.nix.flake.NixFlake]
+        :param maxConcurrency: The maximum number of simultaneous runs.
+        :type maxConcurrency: int
+        :param useCache: Whether to reuse the derivation paths of identical flakes.
+        :type useCache: bool
+        :param usePool: Whether to reuse the flakes' workspaces from the pool.
+        :type usePool: bool
+        :return: The results, as they complete.
+        :rtype: AsyncIterator[pythoneda.shared.nix.flake.NixFlakeBatchResult]
+        """
+        async for result in cls._for_many(
+            flakes,
+            lambda flake: flake.run(useCache=useCache, usePool=usePool),
+            maxConcurrency,
+        ):
+            yield result
+
+    @classmethod
+    async def develop_many(
+        cls,
+        flakes: List,
+        cmd: List[str],
+        maxConcurrency: int = 4,
+        usePool: bool = True,
+    ) -> AsyncIterator[NixFlakeBatchResult]:
+        """
+        Runs given command inside each flake's development environment, concurrently.
+        A failure doesn't abort the batch.
+        :param flakes: The flakes.
+        :type flakes: List[pythoneda.shared.nix.flake.NixFlake]
+        :param cmd: The command to run.
+        :type cmd: List[str]
+        :param maxConcurrency: The maximum number of simultaneous commands.
+        :type maxConcurrency: int
+        :param usePool: Whether to reuse the flakes' workspaces from the pool.
+        :type usePool: bool
+        :return: The results, as they complete.
+        :rtype: AsyncIterator[pythoneda.shared.nix.flake.NixFlakeBatchResult]
+        """
+        async for result in cls._for_many(
+            flakes,
+            lambda flake: flake.develop(cmd, usePool=usePool),
+            maxConcurrency,
+        ):
+            yield result
+
     async def eval(self, path: str) -> str:
         """
         Runs "nix eval ." in given folder,
         :return: The path of the derivation.
         :rtype: str
         """
-        process, _, _ = await AsyncShell(["command", "nix", "eval", "."], path)
+        with self.span("eval"):
+            _, stdout, _ = await self.executor.execute(
+                ["command", "nix", "eval", "."], path
+            )
 
-        return process.stdout
+        return stdout
 
     @classmethod
-    async def update_flake_lock(cls, repositoryFolder: str, flakeSubfolder: str = None):
+    async def update_flake_lock(
+        cls, repositoryFolder: str, flakeSubfolder: str = None, inputs: List[str] = None
+    ):
         """
-        Updates the flake.lock file.
+        Updates the flake.lock file, raising FlakeLockUpdateFailed if nix exits with an error.
         :param repositoryFolder: The repository folder.
         :type repositoryFolder: str
         :param flakeSubfolder: The subfolder of the flake.nix file.
         :type flakeSubfolder: str
+        :param inputs: The inputs to update, or None to update all of them.
+        :type inputs: List[str]
         """
         subfolder = "."
         if flakeSubfolder is not None:
             subfolder = f"{flakeSubfolder}/"
 
-        process, stdout, stderr = await AsyncShell(
-            ["command", "nix", "flake", "update", subfolder], repositoryFolder
-        ).run()
+        if inputs is not None:
+            # an empty list only locks inputs missing from flake.lock
+            args = ["command", "nix", "flake", "lock"]
+            for name in inputs:
+                args.extend(["--update-input", name])
+            args.append(subfolder)
+        else:
+            args = ["command", "nix", "flake", "update", subfolder]
+
+        executor = NixFlakeCommandExecutor.instance()
+        with NixFlakeTimings.instance().span(
+            flakeSubfolder or repositoryFolder, "update_flake_lock"
+        ):
+            returncode, stdout, stderr = await executor.execute(args, repositoryFolder)
 
-        if process.returncode != 0:
+        if returncode != 0:
             if stdout != "":
                 NixFlake.logger().debug(stdout)
             if stderr != "":
                 NixFlake.logger().error(stderr)
-                raise FlakeLockUpdateFailed(repositoryFolder, subfolder, stderr)
+            raise FlakeLockUpdateFailed(
+                repositoryFolder, subfolder, f"exit code {returncode}: {stderr}"
+            )
 
         return True
 
     @classmethod
-    async def fetch_sha256(cls, url: str, rev: str) -> str:
+    def _read_flake_lock(cls, repositoryFolder: str, flakeSubfolder: str = None) -> str:
+        """
+        Reads the flake.lock file.
+        :param repositoryFolder: The repository folder.
+        :type repositoryFolder: str
+        :param flakeSubfolder: The subfolder of the flake.nix file.
+        :type flakeSubfolder: str
+        :return: Its contents, or None if it doesn't exist.
+        :rtype: str
+        """
+        result = None
+        folder = repositoryFolder
+        if flakeSubfolder is not None:
+            folder = os.path.join(folder, flakeSubfolder)
+        try:
+            with open(
+                os.path.join(folder, "flake.lock"), "r", encoding="utf-8"
+            ) as file:
+                result = file.read()
+        except FileNotFoundError:
+            pass
+        return result
+
+    @classmethod
+    def _changed_lock_nodes(cls, before: str, after: str) -> List[str]:
+        """
+        Compares two versions of a flake.lock file.
+        :param before: The contents before the update, if any.
+        :type before: str
+        :param after: The contents after the update, if any.
+        :type after: str
+        :return: The names of the nodes added, removed or modified.
+        :rtype: List[str]
+        """
+        result = []
+        if before != after:
+            old_nodes = {}
+            new_nodes = {}
+            try:
+                if before is not None:
+                    old_nodes = json.loads(before).get("nodes", {})
+                if after is not None:
+                    new_nodes = json.loads(after).get("nodes", {})
+            except ValueError as error:
+                NixFlake.logger().warning(f"Cannot compare flake.lock files: {error}")
+            result = sorted(
+                name
+                for name in old_nodes.keys() | new_nodes.keys()
+                if old_nodes.get(name, None) != new_nodes.get(name, None)
+            )
+        return result
+
+    @classmethod
+    async def update_flake_lock_many(
+        cls,
+        targets: List[Tuple[str, str, List[str]]],
+        maxConcurrency: int = 4,
+    ) -> AsyncIterator[FlakeLockUpdateResult]:
+        """
+        Updates the flake.lock files of many flakes concurrently, and tells which ones changed.
+        A failure doesn't abort the batch. Targets for the same flake are merged.
+        :param targets: The (repository folder, flake subfolder, inputs) of each flake; inputs being None means all of them.
+        :type targets: List[Tuple[str, str, List[str]]]
+        :param maxConcurrency: The maximum number of simultaneous updates.
+        :type maxConcurrency: int
+        :return: The results, as they complete.
+        :rtype: AsyncIterator[pythoneda.shared.nix.flake.FlakeLockUpdateResult]
+        """
+        merged = {}
+        for repository_folder, flake_subfolder, inputs in targets:
+            key = (repository_folder, flake_subfolder)
+            if key not in merged:
+                merged[key] = None if inputs is None else list(inputs)
+            elif merged[key] is not None:
+                if inputs is None:
+                    merged[key] = None
+                else:
+                    merged[key].extend(aux for aux in inputs if aux not in merged[key])
+
+        semaphore = asyncio.Semaphore(max(1, maxConcurrency))
+
+        async def guarded(
+            repositoryFolder: str, flakeSubfolder: str, inputs: List[str]
+        ) -> FlakeLockUpdateResult:
+            async with semaphore:
+                before = cls._read_flake_lock(repositoryFolder, flakeSubfolder)
+                try:
+                    await cls.update_flake_lock(
+                        repositoryFolder, flakeSubfolder, inputs
+                    )
+                except Exception as error:
+                    NixFlake.logger().error(
+                        f"Updating the flake.lock in {repositoryFolder} failed: {error}"
+                    )
+                    return FlakeLockUpdateResult(
+                        repositoryFolder, flakeSubfolder, inputs, error=error
+                    )
+                after = cls._read_flake_lock(repositoryFolder, flakeSubfolder)
+                return FlakeLockUpdateResult(
+                    repositoryFolder,
+                    flakeSubfolder,
+                    inputs,
+                    before != after,
+                    cls._changed_lock_nodes(before, after),
+                )
+
+        tasks = [
+            asyncio.ensure_future(guarded(repository_folder, flake_subfolder, inputs))
+            for (repository_folder, flake_subfolder), inputs in merged.items()
+        ]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                yield await next_completed
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @classmethod
+    async def fetch_sha256(cls, url: str, rev: str, useCache: bool = True) -> str:
         """
         Retrieves the sha256 checksum for given url.
+        Concurrent requests for the same revision share a single nix-prefetch-git process.
+        :param url: The repository url.
+        :type url: str
+        :param rev: The revision.
+        :type rev: str
+        :param useCache: Whether to reuse checksums computed previously for the same revision.
+        :type useCache: bool
+        :return: The sha256 value.
+        :rtype: str
+        """
+        result = None
+
+        with NixFlakeTimings.instance().span(url, "fetch_sha256"):
+            if useCache:
+                result = FetchSha256Cache.instance().get(url, rev)
+
+            if result is None:
+                key = (url, rev)
+                loop = asyncio.get_running_loop()
+                in_flight = NixFlake._fetch_sha256_in_flight.get(key, None)
+                if in_flight is None or in_flight.get_loop() is not loop:
+                    in_flight = loop.create_task(
+                        cls._prefetch_sha256(url, rev, useCache)
+                    )
+                    NixFlake._fetch_sha256_in_flight[key] = in_flight
+
+                    def forget(task: asyncio.Task):
+                        if NixFlake._fetch_sha256_in_flight.get(key, None) is task:
+                            del NixFlake._fetch_sha256_in_flight[key]
+
+                    in_flight.add_done_callback(forget)
+                else:
+                    NixFlake.logger().debug(
+                        f"Joining in-flight prefetch of {url}@{rev}"
+                    )
+                result = await asyncio.shield(in_flight)
+
+        return result
+
+    @classmethod
+    async def _prefetch_sha256(cls, url: str, rev: str, useCache: bool) -> str:
+        """
+        Runs nix-prefetch-git to retrieve the sha256 checksum for given url.
         :param url: The repository url.
         :type url: str
         :param rev: The revision.
         :type rev: str
+        :param useCache: Whether to store the checksum in the cache.
+        :type useCache: bool
         :return: The sha256 value.
         :rtype: str
         """
         result = None
 
-        process, stdout, stderr = await AsyncShell(
-            ["nix-prefetch-git", "--quiet", url, "--rev", rev]
-        ).run_in_a_temporary_folder()
+        with NixFlakeTimings.instance().span(url, "nix-prefetch-git"):
+            executor = NixFlakeCommandExecutor.instance()
+            returncode, stdout, stderr = await executor.execute_in_a_temporary_folder(
+                ["nix-prefetch-git", "--quiet", url, "--rev", rev]
+            )
 
-        if process.returncode == 0:
+        if returncode == 0:
             result = json.loads(stdout).get("sha256", None)
 
         if result is None:
             raise FetchSha256Failed(url, rev, stderr)
 
+        if useCache:
+            FetchSha256Cache.instance().put(url, rev, result)
+
         return result
 
+    @classmethod
+    async def fetch_sha256_many(
+        cls,
+        revisions: List[Tuple[str, str]],
+        maxConcurrency: int = 8,
+        useCache: bool = True,
+    ) -> Tuple[Dict[Tuple[str, str], str], Dict[Tuple[str, str], FetchSha256Failed]]:
+        """
+        Retrieves the sha256 checksums of given revisions, concurrently.
+        Duplicated revisions are fetched once.
+        :param revisions: The (url, rev) pairs.
+        :type revisions: List[Tuple[str, str]]
+        :param maxConcurrency: The maximum number of simultaneous prefetches.
+        :type maxConcurrency: int
+        :param useCache: Whether to reuse checksums computed previously for the same revisions.
+        :type useCache: bool
+        :return: The checksums of the successful revisions, and the errors of the failed ones.
+        :rtype: Tuple[Dict[Tuple[str, str], str], Dict[Tuple[str, str], pythoneda.shared.nix.flake.FetchSha256Failed]]
+        """
+        results = {}
+        errors = {}
+        semaphore = asyncio.Semaphore(max(1, maxConcurrency))
+
+        async def fetch(url: str, rev: str):
+            async with semaphore:
+                try:
+                    results[(url, rev)] = await cls.fetch_sha256(url, rev, useCache)
+                except FetchSha256Failed as error:
+                    errors[(url, rev)] = error
+                except Exception as error:
+                    errors[(url, rev)] = FetchSha256Failed(url, rev, str(error))
+
+        await asyncio.gather(
+            *[fetch(url, rev) for url, rev in dict.fromkeys(revisions).keys()]
+        )
+
+        return results, errors
+
     @classmethod
     async def update_sha256(
         cls, sha256: str, repositoryFolder: str, flakeSubfolder: str = None
     ):
         """
-        Updates the sha256 checksum in the flake.nix file.
+        Updates the sha256 checksum of the flake itself in the flake.nix file.
+        Use FlakeNixEditor directly to update several attributes in one go.
         :param sha256: The sha256 checksum.
         :type sha256: str
         :param repositoryFolder: The repository folder.
@@ -635,27 +1366,9 @@ class NixFlake(Entity):
         :param flakeSubfolder: The subfolder of the flake.nix file.
         :type flakeSubfolder: str
         """
-        folder = repositoryFolder
-
-        if flakeSubfolder is not None:
-            folder = os.path.join(folder, flakeSubfolder)
-
-        # Regular expression pattern to match the sha256 line
-        sha256_pattern = r'(sha256\s*=\s*")[^"]*(";)'
-
-        flake_nix = os.path.join(folder, "flake.nix")
-        # Read the file contents
-        with open(flake_nix, "r") as file:
-            file_contents = file.read()
-
-            # Replace the sha256 value using regular expression
-            updated_contents = re.sub(
-                sha256_pattern, r"\g<1>" + sha256 + r"\2", file_contents
-            )
-
-        # Write the updated contents back to the file
-        with open(flake_nix, "w") as file:
-            file.write(updated_contents)
+        editor = FlakeNixEditor.from_folder(repositoryFolder, flakeSubfolder)
+        editor.set_sha256(sha256)
+        editor.save()
 
 
 # vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
@@ -0,0 +1,100 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_batch_result.py
+
+This file declares the NixFlakeBatchResult class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared import attribute, primary_key_attribute, ValueObject
+
+
+class NixFlakeBatchResult(ValueObject):
+    """
+    The outcome of running a nix operation on one flake of a batch.
+
+    Class name: NixFlakeBatchResult
+
+    Responsibilities:
+        - Associate a flake with the result of the operation, or the error it raised.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+    """
+
+    def __init__(self, flake, result: str = None, error: Exception = None):
+        """
+        Creates a new NixFlakeBatchResult instance.
+        :param flake: The flake.
+        :type flake: pythoneda.shared.nix.flake.NixFlake
+        :param result: The result of the operation, if it succeeded.
+        :type result: str
+        :param error: The error, if the operation failed.
+        :type error: Exception
+        """
+        super().__init__()
+        self._flake = flake
+        self._result = result
+        self._error = error
+
+    @property
+    @primary_key_attribute
+    def flake(self):
+        """
+        Retrieves the flake.
+        :return: Such flake.
+        :rtype: pythoneda.shared.nix.flake.NixFlake
+        """
+        return self._flake
+
+    @property
+    @attribute
+    def result(self) -> str:
+        """
+        Retrieves the result of the operation.
+        :return: Such result, or None if it failed.
+        :rtype: str
+        """
+        return self._result
+
+    @property
+    @attribute
+    def error(self) -> Exception:
+        """
+        Retrieves the error raised by the operation.
+        :return: Such error, or None if it succeeded.
+        :rtype: Exception
+        """
+        return self._error
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        Checks whether the operation succeeded.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._error is None
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
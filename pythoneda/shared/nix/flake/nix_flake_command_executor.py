@@ -0,0 +1,264 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_command_executor.py
+
+This file defines the NixFlakeCommandExecutor class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import os
+from pythoneda.shared import BaseObject
+from pythoneda.shared.git import GitAdd, GitInit
+from pythoneda.shared.shell import AsyncShell
+import shlex
+import signal
+import subprocess
+from typing import AsyncIterator, Dict, List, Tuple
+
+
+class NixFlakeCommandExecutor(BaseObject):
+    """
+    Runs the nix and git commands on behalf of flakes.
+
+    Class name: NixFlakeCommandExecutor
+
+    Responsibilities:
+        - Run commands, asynchronously or not, and return their exit code and output.
+        - Run commands streaming their output, line by line, as it's produced.
+        - Initialise git repositories, and add files to them.
+        - Be replaceable, so flakes can be exercised without nix or git.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeMetadata
+        - pythoneda.shared.nix.flake.NixFlakeWorkspacePool
+        - pythoneda.shared.shell.AsyncShell
+        - pythoneda.shared.git.GitInit
+        - pythoneda.shared.git.GitAdd
+    """
+
+    STDOUT = "stdout"
+
+    STDERR = "stderr"
+
+    EXIT = "exit"
+
+    _singleton = None
+
+    _end_of_stream = object()
+
+    def __init__(self):
+        """
+        Creates a new NixFlakeCommandExecutor instance.
+        """
+        super().__init__()
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance, used unless another one is given.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        """
+        if NixFlakeCommandExecutor._singleton is None:
+            NixFlakeCommandExecutor._singleton = NixFlakeCommandExecutor()
+        return NixFlakeCommandExecutor._singleton
+
+    @classmethod
+    def set_instance(cls, executor):
+        """
+        Replaces the process-wide instance.
+        :param executor: The new instance, or None to go back to running commands.
+        :type executor: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        """
+        NixFlakeCommandExecutor._singleton = executor
+
+    async def execute(
+        self, args: List[str], cwd: str = None, env: Dict[str, str] = None
+    ) -> Tuple[int, str, str]:
+        """
+        Runs given command.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: The folder where to run it.
+        :type cwd: str
+        :param env: Additional environment variables.
+        :type env: Dict[str, str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        process, stdout, stderr = await AsyncShell(args, cwd, env).run()
+        return process.returncode, stdout, stderr
+
+    async def execute_in_a_temporary_folder(
+        self, args: List[str]
+    ) -> Tuple[int, str, str]:
+        """
+        Runs given command in a throwaway folder.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        process, stdout, stderr = await AsyncShell(args).run_in_a_temporary_folder()
+        return process.returncode, stdout, stderr
+
+    def execute_sync(
+        self, args: List[str], cwd: str = None, env: Dict[str, str] = None
+    ) -> Tuple[int, str, str]:
+        """
+        Runs given command, blocking until it finishes.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: The folder where to run it.
+        :type cwd: str
+        :param env: Additional environment variables.
+        :type env: Dict[str, str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        execution = subprocess.run(
+            args,
+            cwd=cwd,
+            env=None if env is None else {**os.environ, **env},
+            capture_output=True,
+            text=True,
+        )
+        return execution.returncode, execution.stdout, execution.stderr
+
+    @classmethod
+    async def _pump(cls, reader: asyncio.StreamReader, source: str, queue):
+        """
+        Forwards the lines of given stream to the queue.
+        Lines longer than the stream's limit are forwarded in chunks, so that the
+        pipe keeps being drained and the command doesn't block writing to it.
+        :param reader: The stream.
+        :type reader: asyncio.StreamReader
+        :param source: The name of the stream.
+        :type source: str
+        :param queue: The queue.
+        :type queue: asyncio.Queue
+        """
+        overrun = False
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as error:
+                    line = error.partial
+                except asyncio.LimitOverrunError as error:
+                    line = await reader.read(error.consumed)
+                    overrun = True
+                else:
+                    if overrun and line == b"\n":
+                        # the end of a line already forwarded in chunks
+                        overrun = False
+                        continue
+                    overrun = False
+                if not line:
+                    break
+                await queue.put(
+                    (source, line.decode("utf-8", errors="replace").rstrip("\n"))
+                )
+        except OSError as error:
+            NixFlakeCommandExecutor.logger().error(f"Error reading {source}: {error}")
+        await queue.put(cls._end_of_stream)
+
+    async def stream(
+        self,
+        args: List[str],
+        cwd: str = None,
+        env: Dict[str, str] = None,
+        maxQueuedLines: int = 1024,
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Runs given command, yielding its output as it's produced.
+        Reading pauses while maxQueuedLines lines wait for the consumer, so the command
+        blocks writing instead of its output piling up. Closing the iterator before
+        the end kills the command, and the processes it started.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: The folder where to run it.
+        :type cwd: str
+        :param env: Additional environment variables.
+        :type env: Dict[str, str]
+        :param maxQueuedLines: The number of lines read ahead of the consumer.
+        :type maxQueuedLines: int
+        :return: (STDOUT or STDERR, line) tuples, and lastly (EXIT, the exit code).
+        :rtype: AsyncIterator[Tuple[str, object]]
+        """
+        process = await asyncio.create_subprocess_shell(
+            shlex.join(args),
+            cwd=cwd,
+            env={**os.environ, **(env or {})},
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=2**20,
+            start_new_session=True,
+        )
+        queue = asyncio.Queue(maxsize=max(1, maxQueuedLines))
+        pumps = [
+            asyncio.ensure_future(self._pump(process.stdout, self.STDOUT, queue)),
+            asyncio.ensure_future(self._pump(process.stderr, self.STDERR, queue)),
+        ]
+        try:
+            pending = len(pumps)
+            while pending > 0:
+                item = await queue.get()
+                if item is self._end_of_stream:
+                    pending -= 1
+                else:
+                    yield item
+            yield self.EXIT, await process.wait()
+        finally:
+            for pump in pumps:
+                pump.cancel()
+            if process.returncode is None:
+                # the command's own children keep the pipes open
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+
+    async def git_init(self, folder: str):
+        """
+        Initialises a git repository.
+        :param folder: The folder.
+        :type folder: str
+        """
+        await GitInit(folder).init()
+
+    async def git_add(self, folder: str, file: str):
+        """
+        Adds a file to a git repository.
+        :param folder: The repository folder.
+        :type folder: str
+        :param file: The file, relative to the folder.
+        :type file: str
+        """
+        await GitAdd(folder).add(file)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
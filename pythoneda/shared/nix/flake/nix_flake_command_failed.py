@@ -0,0 +1,103 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_command_failed.py
+
+This file defines the NixFlakeCommandFailed class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared import BaseObject
+
+
+class NixFlakeCommandFailed(Exception, BaseObject):
+    """
+    A nix command run on a flake exited with an error.
+
+    Class name: NixFlakeCommandFailed
+
+    Responsibilities:
+        - Represent the error when nix run, build or develop exits with a non-zero code.
+        - Keep the exit code and the standard error.
+
+    Collaborators:
+        - None
+    """
+
+    def __init__(self, flakeName: str, command: str, returncode: int, stderr: str):
+        """
+        Creates a new instance.
+        :param flakeName: The name of the flake.
+        :type flakeName: str
+        :param command: The nix command, e.g. "nix build".
+        :type command: str
+        :param returncode: The exit code.
+        :type returncode: int
+        :param stderr: The standard error.
+        :type stderr: str
+        """
+        super().__init__(
+            f'"{command}" failed for {flakeName} with exit code {returncode}: {stderr}'
+        )
+        self._flake_name = flakeName
+        self._command = command
+        self._returncode = returncode
+        self._stderr = stderr
+
+    @property
+    def flake_name(self) -> str:
+        """
+        Retrieves the name of the flake.
+        :return: Such name.
+        :rtype: str
+        """
+        return self._flake_name
+
+    @property
+    def command(self) -> str:
+        """
+        Retrieves the nix command.
+        :return: Such command.
+        :rtype: str
+        """
+        return self._command
+
+    @property
+    def returncode(self) -> int:
+        """
+        Retrieves the exit code.
+        :return: Such code.
+        :rtype: int
+        """
+        return self._returncode
+
+    @property
+    def stderr(self) -> str:
+        """
+        Retrieves the standard error.
+        :return: Such output.
+        :rtype: str
+        """
+        return self._stderr
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
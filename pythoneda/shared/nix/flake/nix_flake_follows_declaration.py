@@ -0,0 +1,110 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_follows_declaration.py
+
+This file defines the NixFlakeFollowsDeclaration class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared import attribute, primary_key_attribute, ValueObject
+import re
+from typing import List
+
+
+class NixFlakeFollowsDeclaration(ValueObject):
+    """
+    A `follows` declaration within the attribute set of an input in a flake.nix file.
+
+    Class name: NixFlakeFollowsDeclaration
+
+    Responsibilities:
+        - Tell which nested input of an input is replaced, and by which other input.
+        - Render the attribute path templates use, e.g. `foo.inputs.nixpkgs`.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeFollowsOptimizer
+        - pythoneda.shared.nix.flake.NixFlakeInput
+    """
+
+    _identifier = re.compile(r"^[A-Za-z_][A-Za-z0-9_'-]*$")
+
+    def __init__(self, inputName: str, path: List[str], follows: str):
+        """
+        Creates a new NixFlakeFollowsDeclaration instance.
+        :param inputName: The name of the input of the flake the declaration belongs to.
+        :type inputName: str
+        :param path: The names of the nested inputs leading to the replaced one, from the input.
+        :type path: List[str]
+        :param follows: The input replacing it, as a path of input names separated by slashes.
+        :type follows: str
+        """
+        super().__init__()
+        self._input_name = inputName
+        self._path = path
+        self._follows = follows
+
+    @property
+    @primary_key_attribute
+    def input_name(self) -> str:
+        """
+        Retrieves the name of the input of the flake the declaration belongs to.
+        :return: Such name.
+        :rtype: str
+        """
+        return self._input_name
+
+    @property
+    @attribute
+    def path(self) -> List[str]:
+        """
+        Retrieves the names of the nested inputs leading to the replaced one.
+        :return: Such names, from the input.
+        :rtype: List[str]
+        """
+        return self._path
+
+    @property
+    @attribute
+    def follows(self) -> str:
+        """
+        Retrieves the input replacing the nested one.
+        :return: Such input, e.g. "nixpkgs" or "flake-utils/nixpkgs".
+        :rtype: str
+        """
+        return self._follows
+
+    @property
+    @primary_key_attribute
+    def attribute_path(self) -> str:
+        """
+        Retrieves the attribute path of the replaced input, below `inputs.` in the input's attribute set.
+        :return: Such path, e.g. "foo.inputs.nixpkgs".
+        :rtype: str
+        """
+        return ".inputs.".join(
+            name if self.__class__._identifier.match(name) else f'"{name}"'
+            for name in self._path
+        )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,149 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_follows_optimization.py
+
+This file defines the NixFlakeFollowsOptimization class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .nix_flake_follows_declaration import NixFlakeFollowsDeclaration
+from pythoneda.shared import attribute, ValueObject
+from typing import Dict, List
+
+
+class NixFlakeFollowsOptimization(ValueObject):
+    """
+    The `follows` declarations collapsing the duplicated inputs of a lock, and their expected effect.
+
+    Class name: NixFlakeFollowsOptimization
+
+    Responsibilities:
+        - Keep the declarations, grouped by the input of the flake they belong to.
+        - Tell how many lock nodes are fetched before and after applying them.
+        - Estimate the evaluation time saved.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeFollowsDeclaration
+        - pythoneda.shared.nix.flake.NixFlakeFollowsOptimizer
+    """
+
+    def __init__(
+        self,
+        declarations: List[NixFlakeFollowsDeclaration],
+        fetchedBefore: int,
+        fetchedAfter: int,
+        removedNodes: List[str],
+    ):
+        """
+        Creates a new NixFlakeFollowsOptimization instance.
+        :param declarations: The declarations.
+        :type declarations: List[pythoneda.shared.nix.flake.NixFlakeFollowsDeclaration]
+        :param fetchedBefore: The number of lock nodes the flake fetches now.
+        :type fetchedBefore: int
+        :param fetchedAfter: The number of lock nodes the flake would fetch with the declarations.
+        :type fetchedAfter: int
+        :param removedNodes: The lock nodes that would no longer be fetched.
+        :type removedNodes: List[str]
+        """
+        super().__init__()
+        self._declarations = declarations
+        self._fetched_before = fetchedBefore
+        self._fetched_after = fetchedAfter
+        self._removed_nodes = removedNodes
+
+    @property
+    @attribute
+    def declarations(self) -> List[NixFlakeFollowsDeclaration]:
+        """
+        Retrieves the declarations.
+        :return: Such declarations.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeFollowsDeclaration]
+        """
+        return self._declarations
+
+    @property
+    @attribute
+    def fetched_before(self) -> int:
+        """
+        Retrieves the number of lock nodes the flake fetches now.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._fetched_before
+
+    @property
+    @attribute
+    def fetched_after(self) -> int:
+        """
+        Retrieves the number of lock nodes the flake would fetch with the declarations.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._fetched_after
+
+    @property
+    @attribute
+    def removed_nodes(self) -> List[str]:
+        """
+        Retrieves the lock nodes that would no longer be fetched.
+        :return: Such nodes.
+        :rtype: List[str]
+        """
+        return self._removed_nodes
+
+    @property
+    def fetch_reduction(self) -> float:
+        """
+        Retrieves the fraction of lock nodes that would no longer be fetched.
+        :return: Such fraction, between 0 and 1.
+        :rtype: float
+        """
+        result = 0.0
+        if self._fetched_before > 0:
+            result = 1 - self._fetched_after / self._fetched_before
+        return result
+
+    def estimated_seconds_saved(self, evaluationSeconds: float) -> float:
+        """
+        Estimates the evaluation time saved, assuming it grows with the number of inputs fetched.
+        :param evaluationSeconds: The seconds the flake takes to evaluate now, e.g. the mean of its "build" timings.
+        :type evaluationSeconds: float
+        :return: The seconds saved.
+        :rtype: float
+        """
+        return evaluationSeconds * self.fetch_reduction
+
+    def declarations_by_input(self) -> Dict[str, List[NixFlakeFollowsDeclaration]]:
+        """
+        Groups the declarations by the input of the flake they belong to.
+        :return: The declarations, by input name.
+        :rtype: Dict[str, List[pythoneda.shared.nix.flake.NixFlakeFollowsDeclaration]]
+        """
+        result = {}
+        for declaration in self._declarations:
+            result.setdefault(declaration.input_name, []).append(declaration)
+        return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,233 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_follows_optimizer.py
+
+This file defines the NixFlakeFollowsOptimizer class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .nix_flake_follows_declaration import NixFlakeFollowsDeclaration
+from .nix_flake_follows_optimization import NixFlakeFollowsOptimization
+from .nix_flake_lock_closure import NixFlakeLockClosure
+from pythoneda.shared import BaseObject
+from typing import Dict, List, Tuple
+
+
+class NixFlakeFollowsOptimizer(BaseObject):
+    """
+    Computes the `follows` declarations collapsing the duplicated inputs of a lock.
+
+    Class name: NixFlakeFollowsOptimizer
+
+    Responsibilities:
+        - Group the lock nodes of the same repository (and, optionally, version).
+        - Pick, for each group, the copy every other one should follow.
+        - Declare a `follows` only where a duplicate is actually pulled in.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeFollowsOptimization
+        - pythoneda.shared.nix.flake.NixFlakeLockClosure
+        - pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+
+    def __init__(self, metadata, maxDepth: int = 2, sameVersionOnly: bool = False):
+        """
+        Creates a new NixFlakeFollowsOptimizer instance.
+        :param metadata: The metadata of the flake.
+        :type metadata: pythoneda.shared.nix.flake.NixFlakeMetadata
+        :param maxDepth: The maximum number of nested inputs in a declaration, e.g. 2 for `inputs.foo.inputs.nixpkgs`.
+        :type maxDepth: int
+        :param sameVersionOnly: Whether to collapse only copies locked to the same version.
+        :type sameVersionOnly: bool
+        """
+        super().__init__()
+        self._metadata = metadata
+        self._max_depth = maxDepth
+        self._same_version_only = sameVersionOnly
+
+    @property
+    def metadata(self):
+        """
+        Retrieves the metadata.
+        :return: Such metadata.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
+        """
+        return self._metadata
+
+    @property
+    def max_depth(self) -> int:
+        """
+        Retrieves the maximum number of nested inputs in a declaration.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._max_depth
+
+    @property
+    def same_version_only(self) -> bool:
+        """
+        Checks whether only copies locked to the same version are collapsed.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._same_version_only
+
+    def _groups(self) -> List[Tuple[str, str]]:
+        """
+        Assigns each lock node the group of copies it belongs to.
+        :return: The group of each node, by id, or None for nodes that are not GitHub inputs.
+        :rtype: List[Tuple[str, str]]
+        """
+        graph = self._metadata.lock_graph()
+        table = self._metadata.input_table()
+        result = [None] * len(graph)
+        for index in range(len(graph)):
+            position = table.index_of(graph.name(index))
+            if position is not None:
+                result[index] = (
+                    table.url_template(position),
+                    table.version(position) if self._same_version_only else None,
+                )
+        return result
+
+    def _canonical_nodes(
+        self, groups: List[Tuple[str, str]]
+    ) -> Tuple[Dict[Tuple[str, str], int], Dict[int, List[str]]]:
+        """
+        Picks the copy of each group the others should follow: a direct input of the
+        flake if any, or else the one closest to it.
+        The graph is traversed as if duplicates were already followed, so that the
+        path to each copy picked goes through copies picked as well. Inputs already
+        following another one are not traversed.
+        :param groups: The group of each node, by id.
+        :type groups: List[Tuple[str, str]]
+        :return: The copy picked for each group, and the input names leading to each node kept.
+        :rtype: Tuple[Dict[Tuple[str, str], int], Dict[int, List[str]]]
+        """
+        graph = self._metadata.lock_graph()
+        root = graph.root
+        canonical = {}
+        paths = {root: []}
+        pending = [root]
+        position = 0
+        while position < len(pending):
+            current = pending[position]
+            position += 1
+            for key, target, follows in zip(
+                graph.successor_keys(current),
+                graph.successors(current),
+                graph.successor_follows(current),
+            ):
+                if follows:
+                    continue
+                group = groups[target]
+                if (
+                    group is not None
+                    and canonical.setdefault(group, target) != target
+                    and current != root
+                ):
+                    continue
+                if target not in paths:
+                    paths[target] = paths[current] + [key]
+                    pending.append(target)
+        return canonical, paths
+
+    def optimize(self) -> NixFlakeFollowsOptimization:
+        """
+        Computes the declarations.
+        Overrides in nix apply to the path they're declared for, so each path to a
+        duplicate, up to the maximum depth, gets its own declaration. Inputs the lock
+        already declares as following another one get none, nor do their own inputs.
+        :return: The declarations, and the lock nodes they'd stop fetching.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeFollowsOptimization
+        """
+        graph = self._metadata.lock_graph()
+        closure = self._metadata.lock_closure()
+        root = graph.root
+        if root < 0:
+            return NixFlakeFollowsOptimization([], 0, 0, [])
+
+        groups = self._groups()
+        canonical, paths = self._canonical_nodes(groups)
+        direct = set(graph.successors(root))
+        duplicates = 0
+        for index, group in enumerate(groups):
+            if (
+                group is not None
+                and index not in direct
+                and canonical.get(group, index) != index
+            ):
+                duplicates |= 1 << index
+
+        declarations = []
+        fetched = 0
+        pending = []
+        for key, target, follows in zip(
+            graph.successor_keys(root),
+            graph.successors(root),
+            graph.successor_follows(root),
+        ):
+            if not follows:
+                fetched |= 1 << target
+                pending.append((target, [key]))
+        while pending:
+            current, path = pending.pop()
+            if len(path) >= self._max_depth:
+                fetched |= closure.descendants(current)
+                continue
+            expand = len(path) + 1 < self._max_depth
+            for key, target, follows in zip(
+                graph.successor_keys(current),
+                graph.successors(current),
+                graph.successor_follows(current),
+            ):
+                if follows:
+                    # already shares the input it follows
+                    continue
+                if (duplicates >> target) & 1:
+                    followed = canonical[groups[target]]
+                    declarations.append(
+                        NixFlakeFollowsDeclaration(
+                            path[0], path[1:] + [key], "/".join(paths[followed])
+                        )
+                    )
+                    fetched |= 1 << followed
+                    continue
+                fetched |= 1 << target
+                if expand and closure.descendants(target) & duplicates:
+                    pending.append((target, path + [key]))
+                else:
+                    fetched |= closure.descendants(target)
+        declarations.sort(key=lambda item: (item.input_name, item.path))
+
+        before = closure.descendants(root)
+        fetched &= ~(1 << root)
+        return NixFlakeFollowsOptimization(
+            declarations,
+            bin(before).count("1"),
+            bin(fetched).count("1"),
+            [graph.name(index) for index in NixFlakeLockClosure.ids(before & ~fetched)],
+        )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,105 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_git_add.py
+
+This file defines the NixFlakeGitAdd class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+from .nix_flake_command_executor import NixFlakeCommandExecutor
+import os
+from pythoneda.shared import BaseObject
+from typing import Dict
+
+
+class NixFlakeGitAdd(BaseObject):
+    """
+    Adds files to git through a NixFlakeCommandExecutor, the way GitAdd does.
+
+    Class name: NixFlakeGitAdd
+
+    Responsibilities:
+        - Offer GitAdd's interface to NixFlake.git_add_files and its overrides.
+        - Skip adding files whose content is already in the index of their folder.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+    """
+
+    # the sha256 of the files added, by folder and file name
+    _added: Dict[str, Dict[str, str]] = {}
+
+    def __init__(self, folder: str, executor: NixFlakeCommandExecutor):
+        """
+        Creates a new NixFlakeGitAdd instance.
+        :param folder: The repository folder.
+        :type folder: str
+        :param executor: The executor running git.
+        :type executor: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        """
+        super().__init__()
+        self._folder = folder
+        self._executor = executor
+
+    @property
+    def folder(self) -> str:
+        """
+        Retrieves the repository folder.
+        :return: Such folder.
+        :rtype: str
+        """
+        return self._folder
+
+    @classmethod
+    def forget(cls, folder: str):
+        """
+        Forgets the files added to given folder, e.g. when it's removed or re-initialised.
+        :param folder: The folder.
+        :type folder: str
+        """
+        cls._added.pop(str(folder), None)
+
+    async def add(self, file: str):
+        """
+        Adds a file, unless the same content was already added.
+        :param file: The file, relative to the folder.
+        :type file: str
+        """
+        folder = str(self._folder)
+        try:
+            with open(os.path.join(folder, file), "rb") as added_file:
+                digest = hashlib.sha256(added_file.read()).hexdigest()
+        except OSError:
+            digest = None
+        added = NixFlakeGitAdd._added.get(folder, {})
+        if digest is not None and added.get(file, None) == digest:
+            NixFlakeGitAdd.logger().debug(f"{file} is already added to {folder}")
+        else:
+            await self._executor.git_add(folder, file)
+            if digest is not None:
+                NixFlakeGitAdd._added.setdefault(folder, {})[file] = digest
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
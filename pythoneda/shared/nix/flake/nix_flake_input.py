@@ -19,9 +19,11 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
+import copy
 from pythoneda.shared import attribute, primary_key_attribute, ValueObject
 import re
-from typing import List
+import sys
+from typing import Dict, List
 
 
 class NixFlakeInput(ValueObject):
@@ -37,6 +39,8 @@ class NixFlakeInput(ValueObject):
         - pythoneda.shared.ValueObject
     """
 
+    _dag_serialization = False
+
     def __init__(self, name: str, version: str, urlTemplate: str, inputs: List = []):
         """
         Creates a new NixFlakeInput instance.
@@ -50,11 +54,26 @@ class NixFlakeInput(ValueObject):
         :type inputs: Dict
         """
         super().__init__()
-        self._name = name
-        self._version = version
-        self._url_template = urlTemplate
+        self._name = self.__class__._intern(name)
+        self._version = self.__class__._intern(version)
+        self._url_template = self.__class__._intern(urlTemplate)
         self._inputs = [aux for aux in inputs if aux.name != name]
         self._follows = []
+        self._follows_overrides = []
+
+    @classmethod
+    def _intern(cls, value: str) -> str:
+        """
+        Interns given string, so that all inputs share a single copy of it.
+        :param value: The string.
+        :type value: str
+        :return: The interned string.
+        :rtype: str
+        """
+        result = value
+        if isinstance(value, str):
+            result = sys.intern(value)
+        return result
 
     @classmethod
     def empty(cls):
@@ -101,7 +120,6 @@ class NixFlakeInput(ValueObject):
         :return: Such information.
         :rtype: str
         """
-        print(f"*** {self.url_template}")
         return self.url_template.format(version=self.version)
 
     @property
@@ -123,13 +141,32 @@ class NixFlakeInput(ValueObject):
         """
         return self._follows
 
+    @property
+    def follows_overrides(self) -> List:
+        """
+        Retrieves the follows declared for this input on top of its follows, according to the flake it's bound to.
+        :return: The declarations, e.g. the ones computed by NixFlakeFollowsOptimizer.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeFollowsDeclaration]
+        """
+        return self._follows_overrides
+
     def bind(self, flake):
         """
         Binds this input to given flake, to take into account the flake's inputs.
+        Each own input gets at most one `follows`: the one declared for it in the flake,
+        if any, or else the flake's input with the same name.
         :param flake: The flake.
         :type flake: pythoneda.shared.nix.flake.NixFlake
         """
-        self._follows = list(set(self.inputs) & set(flake.inputs))
+        self._follows_overrides = list(flake.follows_overrides_of(self.name))
+        overridden = {
+            aux.path[0] for aux in self._follows_overrides if len(aux.path) == 1
+        }
+        self._follows = []
+        for aux in self.inputs:
+            followed = flake.get_input(aux.name)
+            if followed is not None and aux.name not in overridden:
+                self._follows.append(followed)
 
     def _set_attribute_from_json(self, varName, varValue):
         """
@@ -140,7 +177,7 @@ class NixFlakeInput(ValueObject):
         :type varValue: int, bool, str, type
         """
         if varName == "inputs":
-            self._inputs = [NixFlakeInput.from_dict(value) for value in varValue]
+            self._inputs = self.__class__.inputs_from_json(varValue)
         else:
             super()._set_attribute_from_json(varName, varValue)
 
@@ -154,11 +191,140 @@ class NixFlakeInput(ValueObject):
         """
         result = None
         if varName == "inputs":
-            result = [aux.to_dict() for aux in self._inputs]
+            if self._dag_serialization:
+                result = self.__class__.inputs_to_dag(self._inputs)
+            else:
+                result = [aux.to_dict() for aux in self._inputs]
         else:
             result = super()._get_attribute_to_json(varName)
         return result
 
+    def to_dag_dict(self) -> Dict:
+        """
+        Serializes this input, emitting each distinct input in its graph only once.
+        :return: The dictionary, with its inputs as a DAG (see inputs_to_dag).
+        :rtype: Dict
+        """
+        return self._serializer(True).to_dict()
+
+    def _serializer(self, dag: bool):
+        """
+        Retrieves a shallow copy of this instance serializing its inputs in given format.
+        The mode travels with the copy, so concurrent calls to to_dict() on this
+        instance are not affected.
+        :param dag: Whether to serialize the inputs as a DAG.
+        :type dag: bool
+        :return: The copy.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        result = copy.copy(self)
+        result._dag_serialization = dag
+        return result
+
+    @classmethod
+    def from_dag_dict(cls, data: Dict):
+        """
+        Deserializes an input serialized with to_dag_dict, restoring shared inputs as shared instances.
+        :param data: The dictionary.
+        :type data: Dict
+        :return: The input.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        return cls.from_dict(data)
+
+    @classmethod
+    def inputs_to_dag(cls, inputs: List) -> Dict:
+        """
+        Serializes given inputs and their own inputs, each distinct one only once.
+        Inputs are hash-consed by name, version, url template and own inputs, and listed
+        dependencies first; they refer to their own inputs by position.
+        The graph is walked with an explicit stack, leaving out edges that close a cycle.
+        :param inputs: The inputs.
+        :type inputs: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        :return: A dictionary with the "nodes", and the positions of the given inputs as "roots".
+        :rtype: Dict
+        """
+        nodes = []
+        refs_by_id = {}
+        refs_by_key = {}
+        entered = set()
+        pending = list(reversed(inputs))
+        while pending:
+            target = pending[-1]
+            if id(target) in refs_by_id:
+                pending.pop()
+            elif id(target) not in entered:
+                entered.add(id(target))
+                # inputs already entered but not serialized would close a cycle
+                pending.extend(
+                    aux for aux in reversed(target.inputs) if id(aux) not in entered
+                )
+            else:
+                pending.pop()
+                children = [
+                    refs_by_id[id(aux)]
+                    for aux in target.inputs
+                    if id(aux) in refs_by_id
+                ]
+                key = (
+                    target.name,
+                    target.version,
+                    target.url_template,
+                    tuple(children),
+                )
+                result = refs_by_key.get(key, None)
+                if result is None:
+                    result = len(nodes)
+                    nodes.append(
+                        {
+                            "name": target.name,
+                            "version": target.version,
+                            "url_template": target.url_template,
+                            "inputs": children,
+                        }
+                    )
+                    refs_by_key[key] = result
+                refs_by_id[id(target)] = result
+
+        return {"nodes": nodes, "roots": [refs_by_id[id(aux)] for aux in inputs]}
+
+    @classmethod
+    def inputs_from_dag(cls, data: Dict) -> List:
+        """
+        Deserializes inputs serialized with inputs_to_dag.
+        :param data: The serialized inputs.
+        :type data: Dict
+        :return: The inputs, sharing their common own inputs.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        instances = []
+        for node in data.get("nodes", []):
+            instances.append(
+                NixFlakeInput(
+                    node["name"],
+                    node["version"],
+                    node["url_template"],
+                    [instances[aux] for aux in node["inputs"]],
+                )
+            )
+        return [instances[aux] for aux in data.get("roots", [])]
+
+    @classmethod
+    def inputs_from_json(cls, value) -> List:
+        """
+        Deserializes inputs, either as a list of dictionaries or as a DAG.
+        :param value: The serialized inputs.
+        :type value: List or Dict
+        :return: The inputs.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        result = None
+        if isinstance(value, dict):
+            result = cls.inputs_from_dag(value)
+        else:
+            result = [NixFlakeInput.from_dict(aux) for aux in value]
+        return result
+
     @property
     def name_in_camel_case(self) -> str:
         """
@@ -0,0 +1,328 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_input_table.py
+
+This file defines the NixFlakeInputTable class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from array import array
+from .github_url_template import GithubUrlTemplate
+from .nix_flake_input import NixFlakeInput
+from .nix_flake_lock_graph import NixFlakeLockGraph
+from pythoneda.shared import BaseObject
+import sys
+from typing import Dict, Iterator, List
+import weakref
+
+
+class NixFlakeInputTable(BaseObject):
+    """
+    Compact, array-backed representation of the inputs in a flake.lock.
+
+    Class name: NixFlakeInputTable
+
+    Responsibilities:
+        - Store versions and url templates once, as interned strings.
+        - Tell the version and url template of each node of the lock graph, as integer arrays.
+        - Build NixFlakeInput instances only when asked for, sharing them while in use.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeInput
+        - pythoneda.shared.nix.flake.NixFlakeLockGraph
+        - pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+
+    _none = -1
+
+    def __init__(self, graph: NixFlakeLockGraph):
+        """
+        Creates a new NixFlakeInputTable instance, with no inputs yet.
+        Inputs are the nodes of given graph, under the same ids; names and edges are
+        read from the graph, not copied.
+        :param graph: The graph of the lock.
+        :type graph: pythoneda.shared.nix.flake.NixFlakeLockGraph
+        """
+        super().__init__()
+        self._graph = graph
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._versions = array("l", [self._none]) * len(graph)
+        self._url_templates = array("l", [self._none]) * len(graph)
+        self._count = 0
+        self._materialized = weakref.WeakValueDictionary()
+
+    @classmethod
+    def from_lock(cls, locks: Dict, graph: NixFlakeLockGraph = None):
+        """
+        Builds a table with the GitHub inputs of given lock.
+        :param locks: The contents of a flake.lock file.
+        :type locks: Dict
+        :param graph: The graph of the lock, if already built.
+        :type graph: pythoneda.shared.nix.flake.NixFlakeLockGraph
+        :return: The table.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInputTable
+        """
+        if graph is None:
+            graph = NixFlakeLockGraph.from_lock(locks)
+        result = cls(graph)
+        nodes = locks.get("nodes", {})
+        url_templates = {}
+        for index, node in enumerate(graph.names()):
+            if index == graph.root:
+                continue
+            data = nodes[node].get("original", {})
+            if data.get("type", None) != "github":
+                continue
+            key = (data["owner"], data["repo"], data.get("dir", None))
+            url_template = url_templates.get(key, None)
+            if url_template is None:
+                url_template = GithubUrlTemplate(*key).url_template()
+                url_templates[key] = url_template
+            result._add_node(index, data.get("ref", None), url_template)
+        return result
+
+    def _intern(self, value: str) -> int:
+        """
+        Retrieves the id of given string, registering it if needed.
+        :param value: The string.
+        :type value: str
+        :return: Its id.
+        :rtype: int
+        """
+        result = self._none
+        if value is not None:
+            result = self._string_ids.get(value, None)
+            if result is None:
+                result = len(self._strings)
+                self._strings.append(sys.intern(value))
+                self._string_ids[value] = result
+        return result
+
+    def _string(self, stringId: int) -> str:
+        """
+        Retrieves the string with given id.
+        :param stringId: The id.
+        :type stringId: int
+        :return: The string, or None.
+        :rtype: str
+        """
+        return None if stringId == self._none else self._strings[stringId]
+
+    def _add_node(self, index: int, version: str, urlTemplate: str):
+        """
+        Registers given node of the graph as an input.
+        :param index: The id of the node.
+        :type index: int
+        :param version: The version.
+        :type version: str
+        :param urlTemplate: The url template.
+        :type urlTemplate: str
+        """
+        self._versions[index] = self._intern(version)
+        self._url_templates[index] = self._intern(urlTemplate)
+        self._count += 1
+
+    def _is_input(self, index: int) -> bool:
+        """
+        Checks whether the node with given id is an input.
+        :param index: The id.
+        :type index: int
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._url_templates[index] != self._none
+
+    def __len__(self) -> int:
+        """
+        Retrieves the number of inputs.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._count
+
+    def __contains__(self, name: str) -> bool:
+        """
+        Checks whether given input is in the table.
+        :param name: The node name.
+        :type name: str
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self.index_of(name) is not None
+
+    def index_of(self, name: str) -> int:
+        """
+        Retrieves the position of given input, which is its id in the lock graph.
+        :param name: The node name.
+        :type name: str
+        :return: The position, or None if not found.
+        :rtype: int
+        """
+        result = self._graph.index_of(name)
+        if result is not None and not self._is_input(result):
+            result = None
+        return result
+
+    def names(self) -> Iterator[str]:
+        """
+        Iterates over the names of all inputs, in lock order.
+        :return: The names.
+        :rtype: Iterator[str]
+        """
+        graph = self._graph
+        return (
+            graph.name(index) for index in range(len(graph)) if self._is_input(index)
+        )
+
+    def root_names(self) -> List[str]:
+        """
+        Retrieves the names of the direct inputs of the flake.
+        :return: Such names.
+        :rtype: List[str]
+        """
+        result = []
+        if self._graph.root != self._none:
+            result = [
+                self.name(index) for index in self.input_indices(self._graph.root)
+            ]
+        return result
+
+    def name(self, index: int) -> str:
+        """
+        Retrieves the name of the input at given position.
+        :param index: The position.
+        :type index: int
+        :return: The name.
+        :rtype: str
+        """
+        return self._graph.name(index)
+
+    def version(self, index: int) -> str:
+        """
+        Retrieves the version of the input at given position.
+        :param index: The position.
+        :type index: int
+        :return: The version.
+        :rtype: str
+        """
+        return self._string(self._versions[index])
+
+    def url_template(self, index: int) -> str:
+        """
+        Retrieves the url template of the input at given position.
+        :param index: The position.
+        :type index: int
+        :return: The url template.
+        :rtype: str
+        """
+        return self._string(self._url_templates[index])
+
+    def input_indices(self, index: int) -> array:
+        """
+        Retrieves the positions of the own inputs of the input at given position.
+        :param index: The position.
+        :type index: int
+        :return: Such positions.
+        :rtype: array
+        """
+        return array(
+            "l", (aux for aux in self._graph.successors(index) if self._is_input(aux))
+        )
+
+    def input_names(self, name: str) -> List[str]:
+        """
+        Retrieves the names of the own inputs of given input.
+        :param name: The node name.
+        :type name: str
+        :return: Such names, or None if the input is not in the table.
+        :rtype: List[str]
+        """
+        result = None
+        index = self.index_of(name)
+        if index is not None:
+            result = [self.name(aux) for aux in self.input_indices(index)]
+        return result
+
+    def input(self, name: str) -> NixFlakeInput:
+        """
+        Retrieves given input as a NixFlakeInput, along with its own inputs.
+        Instances are shared as long as someone holds a reference to them.
+        :param name: The node name.
+        :type name: str
+        :return: The input, or None if not in the table.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        result = None
+        index = self.index_of(name)
+        if index is not None:
+            result = self._materialize(index)
+        return result
+
+    def _materialize(self, index: int) -> NixFlakeInput:
+        """
+        Builds the NixFlakeInput at given position, or retrieves the one in use.
+        Inputs are built after their own inputs, using an explicit stack so that
+        deep chains don't exhaust the interpreter's recursion limit. Edges closing
+        a cycle, if any, are left out.
+        :param index: The position.
+        :type index: int
+        :return: The input.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        result = self._materialized.get(index, None)
+        if result is None:
+            built = {}
+            entered = set()
+            pending = [index]
+            while pending:
+                current = pending[-1]
+                if current in built:
+                    pending.pop()
+                elif current not in entered:
+                    entered.add(current)
+                    for aux in self.input_indices(current):
+                        if aux not in entered:
+                            existing = self._materialized.get(aux, None)
+                            if existing is None:
+                                pending.append(aux)
+                            else:
+                                built[aux] = existing
+                else:
+                    pending.pop()
+                    built[current] = NixFlakeInput(
+                        self.name(current),
+                        self.version(current),
+                        self.url_template(current),
+                        [
+                            built[aux]
+                            for aux in self.input_indices(current)
+                            if aux in built
+                        ],
+                    )
+                    self._materialized[current] = built[current]
+            result = built[index]
+        return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
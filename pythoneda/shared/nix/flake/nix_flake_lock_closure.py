@@ -0,0 +1,216 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_lock_closure.py
+
+This file defines the NixFlakeLockClosure class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .nix_flake_lock_graph import NixFlakeLockGraph
+from pythoneda.shared import BaseObject
+from typing import List
+
+
+class NixFlakeLockClosure(BaseObject):
+    """
+    The transitive closure of a NixFlakeLockGraph, as one bitset per node.
+
+    Class name: NixFlakeLockClosure
+
+    Responsibilities:
+        - Compute, in a single pass, what each node depends on, directly or not.
+        - Compute, the first time it's needed, what depends on each node.
+        - Answer reachability, common ancestor and path queries without walking the graph.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeLockGraph
+        - pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+
+    def __init__(self, graph: NixFlakeLockGraph):
+        """
+        Creates a new NixFlakeLockClosure instance.
+        Bit i of a bitset is set when node i belongs to it.
+        :param graph: The graph.
+        :type graph: pythoneda.shared.nix.flake.NixFlakeLockGraph
+        """
+        super().__init__()
+        self._graph = graph
+        self._descendants = self._close(False)
+        self._ancestors = None
+        self._root_inputs = 0
+        if graph.root >= 0:
+            for target in graph.successors(graph.root):
+                self._root_inputs |= 1 << target
+
+    @property
+    def graph(self) -> NixFlakeLockGraph:
+        """
+        Retrieves the graph.
+        :return: Such graph.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeLockGraph
+        """
+        return self._graph
+
+    def _close(self, reverse: bool) -> List[int]:
+        """
+        Computes the bitsets of the nodes each node reaches.
+        Nodes are visited so that the bitsets they combine are already complete,
+        unless the graph has cycles, in which case passes repeat until nothing changes.
+        :param reverse: Whether to follow edges backwards.
+        :type reverse: bool
+        :return: The bitsets, by id.
+        :rtype: List[int]
+        """
+        graph = self._graph
+        result = [0] * len(graph)
+        if reverse:
+            neighbours = graph.predecessors
+            order = graph.topological_order()
+        else:
+            neighbours = graph.successors
+            order = graph.topological_order()[::-1]
+        changed = True
+        while changed:
+            changed = False
+            for index in order:
+                bits = 0
+                for neighbour in neighbours(index):
+                    bits |= result[neighbour] | (1 << neighbour)
+                if bits != result[index]:
+                    result[index] = bits
+                    changed = True
+            if graph.is_acyclic():
+                break
+        return result
+
+    @staticmethod
+    def ids(bits: int) -> List[int]:
+        """
+        Retrieves the ids in given bitset.
+        :param bits: The bitset.
+        :type bits: int
+        :return: Such ids, in ascending order.
+        :rtype: List[int]
+        """
+        result = []
+        while bits:
+            lowest = bits & -bits
+            result.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return result
+
+    def descendants(self, index: int) -> int:
+        """
+        Retrieves the nodes given one depends on, directly or not.
+        :param index: The id.
+        :type index: int
+        :return: Such nodes, as a bitset.
+        :rtype: int
+        """
+        return self._descendants[index]
+
+    def ancestors(self, index: int) -> int:
+        """
+        Retrieves the nodes depending on given one, directly or not.
+        :param index: The id.
+        :type index: int
+        :return: Such nodes, as a bitset.
+        :rtype: int
+        """
+        if self._ancestors is None:
+            self._ancestors = self._close(True)
+        return self._ancestors[index]
+
+    def reaches(self, source: int, target: int) -> bool:
+        """
+        Checks whether a node depends on another one, directly or not.
+        :param source: The id of the dependent node.
+        :type source: int
+        :param target: The id of the dependency.
+        :type target: int
+        :return: True in such case.
+        :rtype: bool
+        """
+        return (self._descendants[source] >> target) & 1 == 1
+
+    def common_ancestors(self, first: int, second: int) -> int:
+        """
+        Retrieves the nodes depending on both given ones, directly or not.
+        :param first: The id of one node.
+        :type first: int
+        :param second: The id of the other node.
+        :type second: int
+        :return: Such nodes, as a bitset.
+        :rtype: int
+        """
+        return self.ancestors(first) & self.ancestors(second)
+
+    def root_inputs_reaching(self, index: int) -> int:
+        """
+        Retrieves the direct inputs of the root which are, or depend on, given node.
+        :param index: The id.
+        :type index: int
+        :return: Such inputs, as a bitset.
+        :rtype: int
+        """
+        return (self.ancestors(index) | (1 << index)) & self._root_inputs
+
+    def paths(self, source: int, target: int, limit: int = None) -> List[List[int]]:
+        """
+        Retrieves the chains of inputs leading from a node to another one.
+        Only nodes reaching the target are explored.
+        :param source: The id of the first node.
+        :type source: int
+        :param target: The id of the last node.
+        :type target: int
+        :param limit: The maximum number of paths, or None for all of them.
+        :type limit: int
+        :return: The paths, as lists of ids from source to target.
+        :rtype: List[List[int]]
+        """
+        result = []
+        if source == target or self.reaches(source, target):
+            path = [source]
+            on_path = 1 << source
+            pending = [iter(self._graph.successors(source))]
+            if source == target:
+                result.append(list(path))
+                pending = []
+            while pending and (limit is None or len(result) < limit):
+                current = next(pending[-1], None)
+                if current is None:
+                    pending.pop()
+                    on_path ^= 1 << path.pop()
+                elif (on_path >> current) & 1:
+                    continue
+                elif current == target:
+                    result.append(path + [current])
+                elif self.reaches(current, target):
+                    path.append(current)
+                    on_path |= 1 << current
+                    pending.append(iter(self._graph.successors(current)))
+        return result
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
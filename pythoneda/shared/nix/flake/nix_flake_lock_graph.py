@@ -0,0 +1,396 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_lock_graph.py
+
+This file defines the NixFlakeLockGraph class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from array import array
+from pythoneda.shared import BaseObject
+import sys
+from typing import Dict, Iterator, List, Set, Tuple
+
+
+class NixFlakeLockGraph(BaseObject):
+    """
+    The nodes of a flake.lock as dense integer ids, linked by adjacency arrays.
+
+    Class name: NixFlakeLockGraph
+
+    Responsibilities:
+        - Assign each lock node an id, in lock order.
+        - Resolve `follows` paths to the nodes they point to.
+        - Store the edges, and their reverse, as integer arrays (compressed sparse rows).
+        - Answer traversal, reverse dependency, topological order and depth queries.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeInputTable
+        - pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+
+    _none = -1
+
+    def __init__(self):
+        """
+        Creates a new, empty NixFlakeLockGraph instance.
+        """
+        super().__init__()
+        self._names: List[str] = []
+        self._index_by_name: Dict[str, int] = {}
+        self._input_keys: List[Tuple[str, ...]] = []
+        self._offsets = array("l", [0])
+        self._edges = array("l")
+        self._edge_keys: List[str] = []
+        self._edge_follows = array("b")
+        self._root = self._none
+        self._reverse_offsets = None
+        self._reverse_edges = None
+        self._depths = None
+        self._topological_order = None
+        self._acyclic = None
+
+    @classmethod
+    def from_lock(cls, locks: Dict):
+        """
+        Builds the graph of given lock.
+        An input following another one (a list of input names, from the root) links
+        to the node such path leads to; inputs following the flake itself, or a path
+        that can't be resolved, get no edge.
+        :param locks: The contents of a flake.lock file.
+        :type locks: Dict
+        :return: The graph.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeLockGraph
+        """
+        result = cls()
+        nodes = locks.get("nodes", {})
+        for node in nodes.keys():
+            if node is not None:
+                result._index_by_name[sys.intern(node)] = len(result._names)
+                result._names.append(node)
+        root = locks.get("root", "root")
+        result._root = result._index_by_name.get(root, result._none)
+
+        resolved = {}
+        for node in result._names:
+            inputs = nodes[node].get("inputs", {})
+            for dep, contents in inputs.items():
+                follows = isinstance(contents, list)
+                if follows:
+                    contents = cls._resolve(nodes, root, contents, resolved, set())
+                target = result._index_by_name.get(contents, None)
+                if target is not None and not (follows and contents == root):
+                    result._edges.append(target)
+                    result._edge_keys.append(sys.intern(dep))
+                    result._edge_follows.append(follows)
+            result._offsets.append(len(result._edges))
+            result._input_keys.append(tuple(sys.intern(key) for key in inputs.keys()))
+
+        return result
+
+    @classmethod
+    def _resolve(
+        cls, nodes: Dict, root: str, path: List[str], resolved: Dict, resolving: Set
+    ) -> str:
+        """
+        Resolves a `follows` path, walking the inputs from the root one name at a time.
+        :param nodes: The nodes in the lock.
+        :type nodes: Dict
+        :param root: The name of the root node.
+        :type root: str
+        :param path: The input names, from the root.
+        :type path: List[str]
+        :param resolved: The nodes of the paths already resolved.
+        :type resolved: Dict
+        :param resolving: The paths being resolved, to detect cycles.
+        :type resolving: Set
+        :return: The name of the node, or None if the path can't be resolved.
+        :rtype: str
+        """
+        key = tuple(path)
+        result = resolved.get(key, None)
+        if key not in resolved and key not in resolving:
+            resolving.add(key)
+            result = root
+            for name in path:
+                contents = nodes.get(result, {}).get("inputs", {}).get(name, None)
+                if isinstance(contents, list):
+                    contents = cls._resolve(nodes, root, contents, resolved, resolving)
+                result = contents
+                if result is None:
+                    break
+            resolving.discard(key)
+            resolved[key] = result
+        return result
+
+    def __len__(self) -> int:
+        """
+        Retrieves the number of nodes.
+        :return: Such number.
+        :rtype: int
+        """
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        """
+        Checks whether given node is in the graph.
+        :param name: The node name.
+        :type name: str
+        :return: True in such case.
+        :rtype: bool
+        """
+        return name in self._index_by_name
+
+    @property
+    def root(self) -> int:
+        """
+        Retrieves the id of the root node.
+        :return: Such id, or -1 if the lock has no root.
+        :rtype: int
+        """
+        return self._root
+
+    def index_of(self, name: str) -> int:
+        """
+        Retrieves the id of given node.
+        :param name: The node name.
+        :type name: str
+        :return: The id, or None if not found.
+        :rtype: int
+        """
+        return self._index_by_name.get(name, None)
+
+    def name(self, index: int) -> str:
+        """
+        Retrieves the name of the node with given id.
+        :param index: The id.
+        :type index: int
+        :return: The name.
+        :rtype: str
+        """
+        return self._names[index]
+
+    def names(self) -> Iterator[str]:
+        """
+        Iterates over the names of all nodes, in lock order.
+        :return: The names.
+        :rtype: Iterator[str]
+        """
+        return iter(self._names)
+
+    def input_keys(self, index: int) -> Tuple[str, ...]:
+        """
+        Retrieves the names under which given node declares its inputs.
+        :param index: The id.
+        :type index: int
+        :return: Such names, including those of inputs missing in the lock.
+        :rtype: Tuple[str, ...]
+        """
+        return self._input_keys[index] if index != self._none else ()
+
+    def successors(self, index: int) -> array:
+        """
+        Retrieves the ids of the inputs of given node.
+        :param index: The id.
+        :type index: int
+        :return: Such ids.
+        :rtype: array
+        """
+        return self._edges[self._offsets[index] : self._offsets[index + 1]]
+
+    def successor_keys(self, index: int) -> List[str]:
+        """
+        Retrieves the names under which given node declares the inputs returned by successors().
+        :param index: The id.
+        :type index: int
+        :return: Such names, in the same order.
+        :rtype: List[str]
+        """
+        return self._edge_keys[self._offsets[index] : self._offsets[index + 1]]
+
+    def successor_follows(self, index: int) -> array:
+        """
+        Tells which of the inputs returned by successors() are declared as following another input.
+        :param index: The id.
+        :type index: int
+        :return: 1 for each such input, 0 otherwise, in the same order.
+        :rtype: array
+        """
+        return self._edge_follows[self._offsets[index] : self._offsets[index + 1]]
+
+    def _build_reverse_edges(self):
+        """
+        Builds the reverse adjacency arrays, by counting the incoming edges of each node.
+        """
+        if self._reverse_offsets is None:
+            size = len(self._names)
+            offsets = array("l", bytes(array("l").itemsize * (size + 1)))
+            for target in self._edges:
+                offsets[target + 1] += 1
+            for index in range(size):
+                offsets[index + 1] += offsets[index]
+            edges = array("l", bytes(array("l").itemsize * len(self._edges)))
+            positions = array("l", offsets[:size])
+            for source in range(size):
+                for target in self.successors(source):
+                    edges[positions[target]] = source
+                    positions[target] += 1
+            self._reverse_offsets = offsets
+            self._reverse_edges = edges
+
+    def predecessors(self, index: int) -> array:
+        """
+        Retrieves the ids of the nodes having given one as input.
+        :param index: The id.
+        :type index: int
+        :return: Such ids.
+        :rtype: array
+        """
+        self._build_reverse_edges()
+        return self._reverse_edges[
+            self._reverse_offsets[index] : self._reverse_offsets[index + 1]
+        ]
+
+    def bfs(self, start: int = None, reverse: bool = False) -> List[int]:
+        """
+        Traverses the graph breadth-first.
+        :param start: The id of the first node, or None for the root.
+        :type start: int
+        :param reverse: Whether to follow edges backwards, from inputs to the nodes using them.
+        :type reverse: bool
+        :return: The ids of the nodes reached, starting with the first one.
+        :rtype: List[int]
+        """
+        result = []
+        if start is None:
+            start = self._root
+        if start != self._none:
+            if reverse:
+                self._build_reverse_edges()
+                offsets = self._reverse_offsets
+                edges = self._reverse_edges
+            else:
+                offsets = self._offsets
+                edges = self._edges
+            visited = bytearray(len(self._names))
+            visited[start] = 1
+            result.append(start)
+            position = 0
+            while position < len(result):
+                current = result[position]
+                position += 1
+                for target in edges[offsets[current] : offsets[current + 1]]:
+                    if not visited[target]:
+                        visited[target] = 1
+                        result.append(target)
+        return result
+
+    def dependencies(self, index: int) -> List[int]:
+        """
+        Retrieves the ids of the nodes given one depends on, directly or not.
+        :param index: The id.
+        :type index: int
+        :return: Such ids, nearest first.
+        :rtype: List[int]
+        """
+        return self.bfs(index)[1:]
+
+    def reverse_dependencies(self, index: int) -> List[int]:
+        """
+        Retrieves the ids of the nodes depending on given one, directly or not.
+        :param index: The id.
+        :type index: int
+        :return: Such ids, nearest first.
+        :rtype: List[int]
+        """
+        return self.bfs(index, reverse=True)[1:]
+
+    def topological_order(self) -> array:
+        """
+        Sorts the nodes so that each one comes before its inputs.
+        Nodes within cycles, if any, come last, in lock order.
+        :return: The ids of all nodes.
+        :rtype: array
+        """
+        if self._topological_order is None:
+            size = len(self._names)
+            pending = array("l", bytes(array("l").itemsize * size))
+            for target in self._edges:
+                pending[target] += 1
+            order = array("l", (index for index in range(size) if not pending[index]))
+            position = 0
+            while position < len(order):
+                current = order[position]
+                position += 1
+                for target in self.successors(current):
+                    pending[target] -= 1
+                    if not pending[target]:
+                        order.append(target)
+            self._acyclic = len(order) == size
+            if not self._acyclic:
+                sorted_nodes = set(order)
+                order.extend(
+                    index for index in range(size) if index not in sorted_nodes
+                )
+            self._topological_order = order
+        return self._topological_order
+
+    def is_acyclic(self) -> bool:
+        """
+        Checks whether no node depends on itself, directly or not.
+        :return: True in such case.
+        :rtype: bool
+        """
+        self.topological_order()
+        return self._acyclic
+
+    def depths(self) -> array:
+        """
+        Retrieves the length of the shortest path from the root to each node.
+        :return: Such lengths, by id, or -1 for nodes the root doesn't reach.
+        :rtype: array
+        """
+        if self._depths is None:
+            depths = array("l", [self._none]) * len(self._names)
+            if self._root != self._none:
+                depths[self._root] = 0
+                for current in self.bfs():
+                    depth = depths[current] + 1
+                    for target in self.successors(current):
+                        if depths[target] == self._none:
+                            depths[target] = depth
+            self._depths = depths
+        return self._depths
+
+    def depth(self, index: int) -> int:
+        """
+        Retrieves the length of the shortest path from the root to given node.
+        :param index: The id.
+        :type index: int
+        :return: Such length, or -1 if the root doesn't reach it.
+        :rtype: int
+        """
+        return self.depths()[index]
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -19,12 +19,20 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
-from .github_url_template import GithubUrlTemplate
 import json
+from .nix_flake_command_executor import NixFlakeCommandExecutor
+from .nix_flake_follows_optimization import NixFlakeFollowsOptimization
+from .nix_flake_follows_optimizer import NixFlakeFollowsOptimizer
 from .nix_flake_input import NixFlakeInput
+from .nix_flake_input_table import NixFlakeInputTable
 from .nix_flake_input_relationship import NixFlakeInputRelationship
+from .nix_flake_lock_closure import NixFlakeLockClosure
+from .nix_flake_lock_graph import NixFlakeLockGraph
+from .nix_flake_metadata_cache import NixFlakeMetadataCache
+from .nix_flake_metadata_diff import NixFlakeMetadataDiff
+from .nix_flake_metadata_failed import NixFlakeMetadataFailed
+from pathlib import Path
 from pythoneda.shared import attribute, Entity, EventReference
-import subprocess
 from typing import Dict, List
 
 
@@ -59,8 +67,12 @@ class NixFlakeMetadata(Entity):
         self._input_versions = None
         self._indirect_inputs = None
         self._all_inputs = None
-        self._inputs_of_node = {}
-        self._inputs_by_node = {}
+        self._all_inputs_by_key = None
+        self._inputs_by_normalized_name = None
+        self._versions_by_normalized_name = None
+        self._lock_graph = None
+        self._lock_closure = None
+        self._input_table = None
         self._duplicated_inputs = None
         self._inputs_with_no_duplicates = None
         self._inputs_with_duplicates = None
@@ -95,19 +107,100 @@ class NixFlakeMetadata(Entity):
         return self._flake_ref
 
     @classmethod
-    def from_ref(cls, flakeRef: str):
+    def from_ref(
+        cls,
+        flakeRef: str,
+        useCache: bool = True,
+        executor: NixFlakeCommandExecutor = None,
+    ):
         """
         Creates a new instance using given flake reference.
         :param flakeRef: The flake reference (a folder or an url).
         :type flakeRef: str
+        :param useCache: Whether to reuse the metadata of references pinned to a revision.
+        :type useCache: bool
+        :param executor: The executor running nix, or None to use the process-wide one.
+        :type executor: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
         :return: The metadata, of None if it could not be extracted.
         :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
         """
-        command = f"nix flake metadata --json {flakeRef}"
-        execution = subprocess.run(command, shell=True, capture_output=True, text=True)
-        if execution.returncode != 0:
-            raise Exception(f"Error running command: {execution.stderr}")
-        return cls(json.loads(execution.stdout), flakeRef)
+        metadata = None
+        if useCache:
+            metadata = NixFlakeMetadataCache.instance().get(flakeRef)
+        if metadata is None:
+            returncode, stdout, stderr = (
+                executor or NixFlakeCommandExecutor.instance()
+            ).execute_sync(["nix", "flake", "metadata", "--json", flakeRef])
+            if returncode != 0:
+                raise NixFlakeMetadataFailed(flakeRef, stderr)
+            metadata = json.loads(stdout)
+            if useCache:
+                NixFlakeMetadataCache.instance().put(flakeRef, metadata)
+        return cls(metadata, flakeRef)
+
+    @classmethod
+    async def from_ref_async(
+        cls,
+        flakeRef: str,
+        useCache: bool = True,
+        revision: str = None,
+        executor: NixFlakeCommandExecutor = None,
+    ):
+        """
+        Creates a new instance using given flake reference, without blocking the event loop.
+        :param flakeRef: The flake reference (a folder or an url).
+        :type flakeRef: str
+        :param useCache: Whether to reuse the metadata of references pinned to a revision.
+        :type useCache: bool
+        :param revision: The revision the reference is known to be locked to, if any.
+        :type revision: str
+        :param executor: The executor running nix, or None to use the process-wide one.
+        :type executor: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        :return: The metadata.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
+        """
+        metadata = None
+        if useCache:
+            metadata = NixFlakeMetadataCache.instance().get(flakeRef, revision)
+        if metadata is None:
+            returncode, stdout, stderr = await (
+                executor or NixFlakeCommandExecutor.instance()
+            ).execute(["command", "nix", "flake", "metadata", "--json", flakeRef])
+            if returncode != 0:
+                raise NixFlakeMetadataFailed(flakeRef, stderr)
+            metadata = json.loads(stdout)
+            if useCache:
+                NixFlakeMetadataCache.instance().put(flakeRef, metadata)
+        return cls(metadata, flakeRef)
+
+    @classmethod
+    def from_lock_file(cls, path: str):
+        """
+        Creates a new instance by parsing a flake.lock file, without running nix.
+        Only the "locks" section is available, plus the location of the flake.
+        :param path: The flake.lock file, or the folder containing it.
+        :type path: str
+        :return: The metadata.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
+        """
+        lock_file = Path(path)
+        if lock_file.is_dir():
+            lock_file = lock_file / "flake.lock"
+        flake_folder = str(lock_file.resolve().parent)
+
+        with open(lock_file, "r", encoding="utf-8") as file:
+            locks = json.load(file)
+
+        return cls(
+            {
+                "locks": locks,
+                "locked": {"type": "path", "path": flake_folder},
+                "original": {"type": "path", "path": flake_folder},
+                "path": flake_folder,
+                "url": f"path:{flake_folder}",
+            },
+            flake_folder,
+        )
 
     def url(self) -> str:
         """
@@ -124,15 +217,11 @@ class NixFlakeMetadata(Entity):
         :rtype: List
         """
         if self._inputs is None:
-            self._inputs = []
-            for node, details in (
-                self.metadata.get("locks", {})
-                .get("nodes", {})
-                .get("root", {})
-                .get("inputs", {})
-                .items()
-            ):
-                self._inputs.append(self._to_input(node))
+            graph = self.lock_graph()
+            self._inputs = [
+                self._to_input(graph.name(index))
+                for index in dict.fromkeys(graph.successors(graph.root))
+            ]
 
         return self._inputs
 
@@ -146,6 +235,16 @@ class NixFlakeMetadata(Entity):
         """
         return self.metadata.get("locks", {}).get("nodes", {}).get(node, {})
 
+    def locked_details(self, node: str) -> Dict:
+        """
+        Retrieves what given node is locked to.
+        :param node: The node.
+        :type node: str
+        :return: The "locked" section of the node, e.g. its rev, narHash and lastModified.
+        :rtype: Dict
+        """
+        return self._find_input_details(node).get("locked", {})
+
     def indirect_inputs(self) -> List[NixFlakeInput]:
         """
         Retrieves the indirect inputs.
@@ -153,75 +252,62 @@ class NixFlakeMetadata(Entity):
         :rtype: List[NixFlakeInput]
         """
         if self._indirect_inputs is None:
-            root_inputs = list(
-                self.metadata.get("locks", {})
-                .get("nodes", {})
-                .get("root", {})
-                .get("inputs", {})
-                .keys()
-            )
+            graph = self.lock_graph()
+            root_inputs = {graph.name(index) for index in graph.successors(graph.root)}
             self._indirect_inputs = [
                 self._to_input(node)
-                for node, _ in self.metadata.get("locks", {}).get("nodes", {}).items()
-                if node is not None and node not in root_inputs
+                for node in graph.names()
+                if node not in root_inputs
             ]
             self._indirect_inputs = [
                 aux for aux in self._indirect_inputs if aux is not None
             ]
         return self._indirect_inputs
 
-    def _to_input(self, node: str) -> NixFlakeInput:
+    def lock_graph(self) -> NixFlakeLockGraph:
         """
-        Converts given information into a NixFlakeInput.
-        :param node: The node name.
-        :type node: str
-        :return: The Nix flake input.
-        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
+        Retrieves the graph of the nodes in the lock, indexed by integer ids.
+        :return: Such graph.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeLockGraph
         """
-        result = self._inputs_by_node.get(node, None)
-        if result is None:
-            data = (
+        if self._lock_graph is None:
+            self._lock_graph = NixFlakeLockGraph.from_lock(
                 self.metadata.get("locks", {})
-                .get("nodes", {})
-                .get(node, {})
-                .get("original", {})
             )
-            if data.get("type", None) == "github":
-                aux_owner = data["owner"]
-                aux_repo = data["repo"]
-                aux_version = data.get("ref", None)
-                aux_dir = data.get("dir", None)
-
-                inputs = self._get_inputs(node)
-
-                result = NixFlakeInput(
-                    node,
-                    aux_version,
-                    GithubUrlTemplate(aux_owner, aux_repo, aux_dir).url_template,
-                    inputs,
-                )
-                self._inputs_by_node[node] = result
-        return result
+        return self._lock_graph
 
-    def _get_inputs(self, node: str) -> List[NixFlakeInput]:
+    def lock_closure(self) -> NixFlakeLockClosure:
+        """
+        Retrieves the transitive closure of the lock graph.
+        :return: Such closure.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeLockClosure
         """
-        Retrieves the inputs of given node.
+        if self._lock_closure is None:
+            self._lock_closure = NixFlakeLockClosure(self.lock_graph())
+        return self._lock_closure
+
+    def input_table(self) -> NixFlakeInputTable:
+        """
+        Retrieves the compact representation of the inputs in the lock.
+        :return: Such table.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInputTable
+        """
+        if self._input_table is None:
+            self._input_table = NixFlakeInputTable.from_lock(
+                self.metadata.get("locks", {}), self.lock_graph()
+            )
+        return self._input_table
+
+    def _to_input(self, node: str) -> NixFlakeInput:
+        """
+        Converts given information into a NixFlakeInput.
+        The input table shares the instances still in use, so they are not cached here.
         :param node: The node name.
         :type node: str
-        :return: The node's inputs, if any.
-        :rtype: List
+        :return: The Nix flake input.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
         """
-        result = self._inputs_of_node.get(node, None)
-        if result is None:
-            result = []
-            details = self._find_input_details(node)
-            for dep, contents in details.get("inputs", {}).items():
-                if isinstance(contents, str):
-                    result.append(self._to_input(contents))
-                else:
-                    result.append(self._to_input(dep))
-            self._inputs_of_node[node] = result
-        return result
+        return self.input_table().input(node)
 
     def _process_all_inputs(self):
         """
@@ -261,7 +347,7 @@ class NixFlakeMetadata(Entity):
         :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
         """
         if self._inputs_with_no_duplicates is None:
-            duplicated_inputs = self.duplicated_inputs()
+            duplicated_inputs = set(self.duplicated_inputs())
             self._inputs_with_no_duplicates = [
                 aux for aux in self.inputs() if aux not in duplicated_inputs
             ]
@@ -274,7 +360,7 @@ class NixFlakeMetadata(Entity):
         :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
         """
         if self._inputs_with_duplicates is None:
-            duplicated_inputs = self.duplicated_inputs()
+            duplicated_inputs = set(self.duplicated_inputs())
             self._inputs_with_duplicates = [
                 aux for aux in self.inputs() if aux in duplicated_inputs
             ]
@@ -317,7 +403,7 @@ class NixFlakeMetadata(Entity):
         :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
         """
         if self._indirect_inputs_with_no_duplicates is None:
-            duplicated_inputs = self.duplicated_inputs()
+            duplicated_inputs = set(self.duplicated_inputs())
             self._indirect_inputs_with_no_duplicates = [
                 aux for aux in self.indirect_inputs() if aux not in duplicated_inputs
             ]
@@ -330,7 +416,7 @@ class NixFlakeMetadata(Entity):
         :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
         """
         if self._indirect_inputs_with_duplicates is None:
-            duplicated_inputs = self.duplicated_inputs()
+            duplicated_inputs = set(self.duplicated_inputs())
             self._indirect_inputs_with_duplicates = [
                 aux for aux in self.indirect_inputs() if aux in duplicated_inputs
             ]
@@ -375,14 +461,37 @@ class NixFlakeMetadata(Entity):
         :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
         """
         if self._all_inputs is None:
-            self._all_inputs = []
-            [
-                self._all_inputs.append(item)
-                for item in (self.inputs() + self.indirect_inputs())
-                if item is not None and item not in self._all_inputs
-            ]
+            self._all_inputs_by_key = {}
+            for item in self.inputs() + self.indirect_inputs():
+                if item is not None and item not in self._all_inputs_by_key:
+                    self._all_inputs_by_key[item] = item
+            self._all_inputs = list(self._all_inputs_by_key.values())
         return self._all_inputs
 
+    def _build_duplicates_index(self):
+        """
+        Groups all inputs by their normalized name, and counts the versions within each group.
+        """
+        if self._inputs_by_normalized_name is None:
+            self._inputs_by_normalized_name = {}
+            self._versions_by_normalized_name = {}
+            for item in self.all_inputs():
+                name = item.normalized_name
+                self._inputs_by_normalized_name.setdefault(name, []).append(item)
+                versions = self._versions_by_normalized_name.setdefault(name, {})
+                versions[item.version] = versions.get(item.version, 0) + 1
+
+    def _known_input(self, target: NixFlakeInput) -> NixFlakeInput:
+        """
+        Retrieves the input among all inputs which is equal to given one.
+        :param target: The input.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: The known input, or None if it's not part of the metadata.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeInput
+        """
+        self.all_inputs()
+        return self._all_inputs_by_key.get(target, None)
+
     def get_duplicates(self, target: NixFlakeInput) -> List[NixFlakeInput]:
         """
         Retrieves the duplicates of given input.
@@ -393,13 +502,14 @@ class NixFlakeMetadata(Entity):
         """
         result = []
         if target is not None:
-            for candidate in self.all_inputs():
-                if (
-                    target != candidate
-                    and candidate is not None
-                    and target.normalized_name == candidate.normalized_name
-                ):
-                    result.append(candidate)
+            self._build_duplicates_index()
+            result = [
+                candidate
+                for candidate in self._inputs_by_normalized_name.get(
+                    target.normalized_name, []
+                )
+                if candidate != target
+            ]
 
         return result
 
@@ -411,7 +521,15 @@ class NixFlakeMetadata(Entity):
         :return: True in such case.
         :rtype: bool
         """
-        return len(self.get_duplicates(target)) > 0
+        result = False
+        if target is not None:
+            self._build_duplicates_index()
+            count = len(self._inputs_by_normalized_name.get(target.normalized_name, []))
+            if self._known_input(target) is not None:
+                count -= 1
+            result = count > 0
+
+        return result
 
     def has_duplicates_with_same_version(self, target: NixFlakeInput) -> bool:
         """
@@ -434,10 +552,17 @@ class NixFlakeMetadata(Entity):
         :rtype: bool
         """
         result = False
-        for candidate in self.get_duplicates(target):
-            if candidate.version != target.version:
-                result = True
-                break
+        if target is not None:
+            self._build_duplicates_index()
+            name = target.normalized_name
+            count = len(self._inputs_by_normalized_name.get(name, [])) - (
+                self._versions_by_normalized_name.get(name, {}).get(target.version, 0)
+            )
+            known = self._known_input(target)
+            if known is not None and known.version != target.version:
+                # the known input is not a duplicate of the target itself
+                count -= 1
+            result = count > 0
 
         return result
 
@@ -448,13 +573,208 @@ class NixFlakeMetadata(Entity):
         """
         if self._all_relationships is None:
             self._all_relationships = []
+            graph = self.lock_graph()
             for source in self.all_inputs():
-                for destination in source.inputs:
-                    self._all_relationships.append(
-                        NixFlakeInputRelationship(source, destination)
-                    )
+                for target in graph.successors(graph.index_of(source.name)):
+                    destination = self._to_input(graph.name(target))
+                    if destination is not None:
+                        self._all_relationships.append(
+                            NixFlakeInputRelationship(source, destination)
+                        )
         return self._all_relationships
 
+    def depth(self, target: NixFlakeInput) -> int:
+        """
+        Retrieves the length of the shortest chain of inputs from the flake to given input.
+        :param target: The input.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: Such length (1 for direct inputs), or None if the flake doesn't use it.
+        :rtype: int
+        """
+        result = None
+        graph = self.lock_graph()
+        index = graph.index_of(target.name)
+        if index is not None and graph.depth(index) >= 0:
+            result = graph.depth(index)
+        return result
+
+    def dependents(self, target: NixFlakeInput) -> List[NixFlakeInput]:
+        """
+        Retrieves the inputs depending on given one, directly or not.
+        :param target: The input.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: Such inputs, nearest first.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        result = []
+        graph = self.lock_graph()
+        index = graph.index_of(target.name)
+        if index is not None:
+            for aux in graph.reverse_dependencies(index):
+                dependent = self._to_input(graph.name(aux))
+                if dependent is not None:
+                    result.append(dependent)
+        return result
+
+    def _index_of(self, target: NixFlakeInput) -> int:
+        """
+        Retrieves the id of given input in the lock graph.
+        :param target: The input, or None for the flake itself.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: Such id, or None if not in the lock.
+        :rtype: int
+        """
+        graph = self.lock_graph()
+        if target is None:
+            result = graph.root if graph.root >= 0 else None
+        else:
+            result = graph.index_of(target.name)
+        return result
+
+    def _inputs_in(self, bits: int) -> List[NixFlakeInput]:
+        """
+        Retrieves the inputs in given bitset of the lock closure.
+        :param bits: The bitset.
+        :type bits: int
+        :return: Such inputs, in lock order.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        graph = self.lock_graph()
+        result = []
+        for index in NixFlakeLockClosure.ids(bits):
+            item = self._to_input(graph.name(index))
+            if item is not None:
+                result.append(item)
+        return result
+
+    def depends_on(self, target: NixFlakeInput, source: NixFlakeInput = None) -> bool:
+        """
+        Checks whether an input is needed by another one, directly or not.
+        :param target: The dependency.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        :param source: The dependent input, or None for the flake itself.
+        :type source: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: True in such case.
+        :rtype: bool
+        """
+        source_index = self._index_of(source)
+        target_index = self._index_of(target)
+        return (
+            source_index is not None
+            and target_index is not None
+            and self.lock_closure().reaches(source_index, target_index)
+        )
+
+    def find_dependencies(
+        self, name: str, version: str = None, source: NixFlakeInput = None
+    ) -> List[NixFlakeInput]:
+        """
+        Retrieves the copies of an input needed by another one, directly or not.
+        :param name: The normalized name of the input, e.g. "nixpkgs".
+        :type name: str
+        :param version: The version, or None for any.
+        :type version: str
+        :param source: The dependent input, or None for the flake itself.
+        :type source: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: Such copies, in lock order.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        result = []
+        index = self._index_of(source)
+        if index is not None:
+            result = [
+                item
+                for item in self._inputs_in(self.lock_closure().descendants(index))
+                if item.normalized_name == name
+                and (version is None or item.version == version)
+            ]
+        return result
+
+    def dependency_paths(
+        self, target: NixFlakeInput, source: NixFlakeInput = None, limit: int = None
+    ) -> List[List[str]]:
+        """
+        Retrieves the chains of lock nodes through which an input is needed by another one.
+        :param target: The dependency.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        :param source: The dependent input, or None for the flake itself.
+        :type source: pythoneda.shared.nix.flake.NixFlakeInput
+        :param limit: The maximum number of paths, or None for all of them.
+        :type limit: int
+        :return: The paths, as node names from the source (left out if it's the flake) to the target.
+        :rtype: List[List[str]]
+        """
+        result = []
+        source_index = self._index_of(source)
+        target_index = self._index_of(target)
+        if source_index is not None and target_index is not None:
+            graph = self.lock_graph()
+            first = 1 if source is None else 0
+            result = [
+                [graph.name(index) for index in path[first:]]
+                for path in self.lock_closure().paths(source_index, target_index, limit)
+            ]
+        return result
+
+    def common_dependents(
+        self, first: NixFlakeInput, second: NixFlakeInput
+    ) -> List[NixFlakeInput]:
+        """
+        Retrieves the inputs needing both given ones, directly or not.
+        :param first: One input.
+        :type first: pythoneda.shared.nix.flake.NixFlakeInput
+        :param second: The other input.
+        :type second: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: Such inputs, in lock order.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        result = []
+        first_index = self._index_of(first)
+        second_index = self._index_of(second)
+        if first_index is not None and second_index is not None:
+            result = self._inputs_in(
+                self.lock_closure().common_ancestors(first_index, second_index)
+            )
+        return result
+
+    def inputs_pulling(self, target: NixFlakeInput) -> List[NixFlakeInput]:
+        """
+        Retrieves the direct inputs of the flake through which given input gets into the lock.
+        :param target: The input.
+        :type target: pythoneda.shared.nix.flake.NixFlakeInput
+        :return: Such direct inputs, including the input itself if it's direct.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        result = []
+        index = self._index_of(target)
+        if index is not None:
+            result = self._inputs_in(self.lock_closure().root_inputs_reaching(index))
+        return result
+
+    def optimize_follows(
+        self, maxDepth: int = 2, sameVersionOnly: bool = False
+    ) -> NixFlakeFollowsOptimization:
+        """
+        Computes the follows declarations that would collapse the duplicated inputs.
+        :param maxDepth: The maximum number of nested inputs in a declaration.
+        :type maxDepth: int
+        :param sameVersionOnly: Whether to collapse only copies locked to the same version.
+        :type sameVersionOnly: bool
+        :return: The declarations, and the inputs they'd stop fetching.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeFollowsOptimization
+        """
+        return NixFlakeFollowsOptimizer(self, maxDepth, sameVersionOnly).optimize()
+
+    def diff(self, other):
+        """
+        Computes the differences between this lock state and given one.
+        :param other: The new lock state.
+        :type other: pythoneda.shared.nix.flake.NixFlakeMetadata
+        :return: The inputs and relationships added, removed or changed in the new state.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadataDiff
+        """
+        return NixFlakeMetadataDiff.between(self, other)
+
     def relationships_for_duplicated_nodes(self) -> List[NixFlakeInputRelationship]:
         """
         Retrieves all relationships.
@@ -0,0 +1,224 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_metadata_cache.py
+
+This file defines the NixFlakeMetadataCache class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+import json
+from .nix_flake_result_cache import NixFlakeResultCache
+import os
+from pathlib import Path
+from pythoneda.shared import BaseObject
+import re
+import tempfile
+import threading
+from typing import Dict
+
+
+class NixFlakeMetadataCache(BaseObject):
+    """
+    Cache of the output of `nix flake metadata` for pinned flake references.
+
+    Class name: NixFlakeMetadataCache
+
+    Responsibilities:
+        - Store flake metadata keyed by flake reference and locked revision.
+        - Serve metadata for references pinned to a revision, from memory or disk.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+
+    _singleton = None
+
+    _rev_in_query_pattern = re.compile(r"[?&]rev=([0-9a-f]{40})\b")
+
+    _rev_in_path_pattern = re.compile(
+        r"^(?:github|gitlab|sourcehut):[^/?]+/[^/?]+/([0-9a-f]{40})(?:[?]|$)"
+    )
+
+    def __init__(self, folder: str = None):
+        """
+        Creates a new NixFlakeMetadataCache instance.
+        :param folder: The folder where the metadata is persisted, or None to keep it in memory only.
+        :type folder: str
+        """
+        super().__init__()
+        self._folder = folder
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadataCache
+        """
+        if cls._singleton is None:
+            cls._singleton = cls(
+                str(Path(NixFlakeResultCache.default_folder()) / "metadata")
+            )
+        return cls._singleton
+
+    @property
+    def folder(self) -> str:
+        """
+        Retrieves the folder where the metadata is persisted.
+        :return: Such folder, or None if it's kept in memory only.
+        :rtype: str
+        """
+        return self._folder
+
+    @classmethod
+    def pinned_revision(cls, flakeRef: str) -> str:
+        """
+        Retrieves the revision given flake reference is pinned to, if any.
+        :param flakeRef: The flake reference.
+        :type flakeRef: str
+        :return: The revision, or None if the reference is not pinned.
+        :rtype: str
+        """
+        result = None
+        match = cls._rev_in_query_pattern.search(flakeRef)
+        if match is None:
+            match = cls._rev_in_path_pattern.match(flakeRef)
+        if match is not None:
+            result = match.group(1)
+        return result
+
+    @classmethod
+    def locked_revision(cls, metadata: Dict) -> str:
+        """
+        Retrieves the locked revision of given metadata.
+        :param metadata: The output of `nix flake metadata --json`.
+        :type metadata: Dict
+        :return: The revision, or None if the flake is not locked to a revision.
+        :rtype: str
+        """
+        return metadata.get("locked", {}).get("rev", metadata.get("revision", None))
+
+    def _key(self, flakeRef: str, revision: str) -> str:
+        """
+        Builds the key of an entry.
+        :param flakeRef: The flake reference.
+        :type flakeRef: str
+        :param revision: The locked revision.
+        :type revision: str
+        :return: The key.
+        :rtype: str
+        """
+        return f"{flakeRef}#{revision}"
+
+    def _file_for(self, key: str) -> Path:
+        """
+        Retrieves the file storing the entry with given key.
+        :param key: The key.
+        :type key: str
+        :return: The file.
+        :rtype: pathlib.Path
+        """
+        return (
+            Path(self.folder) / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+        )
+
+    def get(self, flakeRef: str, revision: str = None) -> Dict:
+        """
+        Retrieves the cached metadata of given flake reference.
+        :param flakeRef: The flake reference.
+        :type flakeRef: str
+        :param revision: The locked revision, if known. Otherwise, it's taken from the reference itself.
+        :type revision: str
+        :return: The metadata, or None if the reference is not pinned or not cached.
+        :rtype: Dict
+        """
+        result = None
+        if revision is None:
+            revision = self.__class__.pinned_revision(flakeRef)
+        if revision is not None:
+            key = self._key(flakeRef, revision)
+            with self._lock:
+                result = self._entries.get(key, None)
+                if result is None and self.folder is not None:
+                    cached_file = self._file_for(key)
+                    if cached_file.exists():
+                        try:
+                            with open(cached_file, "r", encoding="utf-8") as file:
+                                result = json.load(file)
+                            self._entries[key] = result
+                        except (OSError, ValueError) as error:
+                            NixFlakeMetadataCache.logger().warning(
+                                f"Ignoring unreadable {cached_file}: {error}"
+                            )
+        return result
+
+    def put(self, flakeRef: str, metadata: Dict):
+        """
+        Stores the metadata of given flake reference, if it's locked to a revision.
+        :param flakeRef: The flake reference.
+        :type flakeRef: str
+        :param metadata: The output of `nix flake metadata --json`.
+        :type metadata: Dict
+        """
+        revision = self.__class__.locked_revision(metadata)
+        if revision is not None:
+            key = self._key(flakeRef, revision)
+            with self._lock:
+                self._entries[key] = metadata
+                if self.folder is not None:
+                    self._persist(key, metadata)
+
+    def _persist(self, key: str, metadata: Dict):
+        """
+        Writes given entry to disk, atomically.
+        :param key: The key.
+        :type key: str
+        :param metadata: The metadata.
+        :type metadata: Dict
+        """
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(metadata, file)
+            os.replace(tmp_file, self._file_for(key))
+        except OSError as error:
+            NixFlakeMetadataCache.logger().warning(
+                f"Could not persist metadata for {key}: {error}"
+            )
+
+    def clear(self):
+        """
+        Removes all entries, from memory and disk.
+        """
+        with self._lock:
+            self._entries = {}
+            if self.folder is not None and os.path.isdir(self.folder):
+                for cached_file in Path(self.folder).glob("*.json"):
+                    cached_file.unlink()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
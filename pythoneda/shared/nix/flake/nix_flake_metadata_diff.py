@@ -0,0 +1,267 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_metadata_diff.py
+
+This file declares the NixFlakeMetadataDiff class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from .nix_flake_input import NixFlakeInput
+from .nix_flake_input_relationship import NixFlakeInputRelationship
+from pythoneda.shared import attribute, ValueObject
+from typing import Dict, List, Tuple
+
+
+class NixFlakeMetadataDiff(ValueObject):
+    """
+    The differences between two lock states of a flake.
+
+    Class name: NixFlakeMetadataDiff
+
+    Responsibilities:
+        - Tell which inputs appeared, disappeared or changed version or url.
+        - Tell which inputs were locked to a different revision, e.g. by `nix flake update`.
+        - Tell which relationships appeared or disappeared, and which are affected by changed inputs.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeMetadata
+        - pythoneda.shared.nix.flake.NixFlakeInput
+        - pythoneda.shared.nix.flake.NixFlakeInputRelationship
+    """
+
+    _locked_keys = ("rev", "narHash", "lastModified")
+
+    def __init__(
+        self,
+        added: List[NixFlakeInput],
+        removed: List[NixFlakeInput],
+        changed: List[Tuple[NixFlakeInput, NixFlakeInput]],
+        addedRelationships: List[NixFlakeInputRelationship],
+        removedRelationships: List[NixFlakeInputRelationship],
+        affectedRelationships: List[NixFlakeInputRelationship],
+        relocked: Dict[str, Tuple[Dict, Dict]] = None,
+    ):
+        """
+        Creates a new NixFlakeMetadataDiff instance.
+        :param added: The inputs only present in the new state.
+        :type added: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        :param removed: The inputs only present in the old state.
+        :type removed: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        :param changed: The (old, new) pairs of inputs whose version, url or locked revision changed.
+        :type changed: List[Tuple[pythoneda.shared.nix.flake.NixFlakeInput, pythoneda.shared.nix.flake.NixFlakeInput]]
+        :param addedRelationships: The relationships only present in the new state.
+        :type addedRelationships: List[pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        :param removedRelationships: The relationships only present in the old state.
+        :type removedRelationships: List[pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        :param affectedRelationships: The relationships in both states involving a changed input.
+        :type affectedRelationships: List[pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        :param relocked: The old and new locked rev, narHash and lastModified of the inputs whose lock changed, by name.
+        :type relocked: Dict[str, Tuple[Dict, Dict]]
+        """
+        super().__init__()
+        self._added = added
+        self._removed = removed
+        self._changed = changed
+        self._added_relationships = addedRelationships
+        self._removed_relationships = removedRelationships
+        self._affected_relationships = affectedRelationships
+        self._relocked = relocked or {}
+
+    @property
+    @attribute
+    def added(self) -> List[NixFlakeInput]:
+        """
+        Retrieves the inputs only present in the new state.
+        :return: Such inputs.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        return self._added
+
+    @property
+    @attribute
+    def removed(self) -> List[NixFlakeInput]:
+        """
+        Retrieves the inputs only present in the old state.
+        :return: Such inputs.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInput]
+        """
+        return self._removed
+
+    @property
+    @attribute
+    def changed(self) -> List[Tuple[NixFlakeInput, NixFlakeInput]]:
+        """
+        Retrieves the inputs whose version, url or locked revision changed.
+        :return: Such inputs, as (old, new) pairs.
+        :rtype: List[Tuple[pythoneda.shared.nix.flake.NixFlakeInput, pythoneda.shared.nix.flake.NixFlakeInput]]
+        """
+        return self._changed
+
+    @property
+    @attribute
+    def added_relationships(self) -> List[NixFlakeInputRelationship]:
+        """
+        Retrieves the relationships only present in the new state.
+        :return: Such relationships.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        """
+        return self._added_relationships
+
+    @property
+    @attribute
+    def removed_relationships(self) -> List[NixFlakeInputRelationship]:
+        """
+        Retrieves the relationships only present in the old state.
+        :return: Such relationships.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        """
+        return self._removed_relationships
+
+    @property
+    @attribute
+    def affected_relationships(self) -> List[NixFlakeInputRelationship]:
+        """
+        Retrieves the relationships present in both states which involve a changed input.
+        :return: Such relationships, as found in the new state.
+        :rtype: List[pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        """
+        return self._affected_relationships
+
+    @property
+    @attribute
+    def relocked(self) -> Dict[str, Tuple[Dict, Dict]]:
+        """
+        Retrieves what the inputs whose lock changed were locked to, before and after.
+        :return: The old and new rev, narHash and lastModified, by input name.
+        :rtype: Dict[str, Tuple[Dict, Dict]]
+        """
+        return self._relocked
+
+    @property
+    def is_empty(self) -> bool:
+        """
+        Checks whether both states are equivalent.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return not (
+            self._added
+            or self._removed
+            or self._changed
+            or self._added_relationships
+            or self._removed_relationships
+        )
+
+    @classmethod
+    def _relationships_by_names(
+        cls, relationships: List[NixFlakeInputRelationship]
+    ) -> Dict[Tuple[str, str], NixFlakeInputRelationship]:
+        """
+        Indexes given relationships by the names of their source and destination.
+        :param relationships: The relationships.
+        :type relationships: List[pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        :return: The index.
+        :rtype: Dict[Tuple[str, str], pythoneda.shared.nix.flake.NixFlakeInputRelationship]
+        """
+        return {
+            (aux.source.name, aux.destination.name): aux
+            for aux in relationships
+            if aux.source is not None and aux.destination is not None
+        }
+
+    @classmethod
+    def _locked(cls, metadata, name: str) -> Dict:
+        """
+        Retrieves the revision given input is locked to.
+        :param metadata: The lock state.
+        :type metadata: pythoneda.shared.nix.flake.NixFlakeMetadata
+        :param name: The input name.
+        :type name: str
+        :return: Its rev, narHash and lastModified, when present.
+        :rtype: Dict
+        """
+        locked = metadata.locked_details(name)
+        return {key: locked[key] for key in cls._locked_keys if key in locked}
+
+    @classmethod
+    def between(cls, old, new):
+        """
+        Computes the differences between two lock states, in linear time.
+        :param old: The old state.
+        :type old: pythoneda.shared.nix.flake.NixFlakeMetadata
+        :param new: The new state.
+        :type new: pythoneda.shared.nix.flake.NixFlakeMetadata
+        :return: The differences.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeMetadataDiff
+        """
+        old_inputs = {aux.name: aux for aux in old.all_inputs()}
+        new_inputs = {aux.name: aux for aux in new.all_inputs()}
+
+        added = [aux for name, aux in new_inputs.items() if name not in old_inputs]
+        removed = [aux for name, aux in old_inputs.items() if name not in new_inputs]
+        changed = []
+        changed_names = set()
+        relocked = {}
+        for name, new_input in new_inputs.items():
+            old_input = old_inputs.get(name, None)
+            if old_input is None:
+                continue
+            old_locked = cls._locked(old, name)
+            new_locked = cls._locked(new, name)
+            if old_locked != new_locked:
+                relocked[name] = (old_locked, new_locked)
+            if (
+                old_input.version != new_input.version
+                or old_input.url_template != new_input.url_template
+                or name in relocked
+            ):
+                changed.append((old_input, new_input))
+                changed_names.add(name)
+
+        old_relationships = cls._relationships_by_names(old.all_relationships())
+        new_relationships = cls._relationships_by_names(new.all_relationships())
+        added_relationships = []
+        affected_relationships = []
+        for key, relationship in new_relationships.items():
+            if key not in old_relationships:
+                added_relationships.append(relationship)
+            elif key[0] in changed_names or key[1] in changed_names:
+                affected_relationships.append(relationship)
+        removed_relationships = [
+            relationship
+            for key, relationship in old_relationships.items()
+            if key not in new_relationships
+        ]
+
+        return cls(
+            added,
+            removed,
+            changed,
+            added_relationships,
+            removed_relationships,
+            affected_relationships,
+            relocked,
+        )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
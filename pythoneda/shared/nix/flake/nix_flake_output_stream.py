@@ -0,0 +1,171 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_output_stream.py
+
+This file defines the NixFlakeOutputStream class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from collections import deque
+from .nix_flake_command_executor import NixFlakeCommandExecutor
+from .nix_flake_git_add import NixFlakeGitAdd
+from pythoneda.shared import BaseObject
+from typing import AsyncIterator, Dict, List, Tuple
+
+
+class NixFlakeOutputStream(BaseObject):
+    """
+    Streams the output of a nix command run on a flake, line by line.
+
+    Class name: NixFlakeOutputStream
+
+    Responsibilities:
+        - Prepare the flake's workspace and run the command through the flake's executor.
+        - Yield stdout and stderr lines as they are produced.
+        - Retain a bounded tail of the output, and the exit code.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+    """
+
+    STDOUT = NixFlakeCommandExecutor.STDOUT
+
+    STDERR = NixFlakeCommandExecutor.STDERR
+
+    def __init__(
+        self,
+        flake,
+        args: List[str],
+        env: Dict[str, str] = None,
+        usePool: bool = True,
+        maxQueuedLines: int = 1024,
+        maxRetainedLines: int = 1000,
+    ):
+        """
+        Creates a new NixFlakeOutputStream instance.
+        :param flake: The flake.
+        :type flake: pythoneda.shared.nix.flake.NixFlake
+        :param args: The command to run in the flake's folder.
+        :type args: List[str]
+        :param env: Additional environment variables.
+        :type env: Dict[str, str]
+        :param usePool: Whether to reuse the flake's workspace from the pool.
+        :type usePool: bool
+        :param maxQueuedLines: The number of lines read ahead of the consumer before pausing the command.
+        :type maxQueuedLines: int
+        :param maxRetainedLines: The number of most recent lines to keep, or None to keep them all.
+        :type maxRetainedLines: int
+        """
+        super().__init__()
+        self._flake = flake
+        self._args = args
+        self._env = env or {}
+        self._use_pool = usePool
+        self._max_queued_lines = maxQueuedLines
+        self._retained_lines = deque(maxlen=maxRetainedLines)
+        self._returncode = None
+
+    @property
+    def flake(self):
+        """
+        Retrieves the flake.
+        :return: Such flake.
+        :rtype: pythoneda.shared.nix.flake.NixFlake
+        """
+        return self._flake
+
+    @property
+    def args(self) -> List[str]:
+        """
+        Retrieves the command.
+        :return: Such command.
+        :rtype: List[str]
+        """
+        return self._args
+
+    @property
+    def returncode(self) -> int:
+        """
+        Retrieves the exit code of the command.
+        :return: Such code, or None if the command hasn't finished.
+        :rtype: int
+        """
+        return self._returncode
+
+    @property
+    def retained_lines(self) -> List[Tuple[str, str]]:
+        """
+        Retrieves the most recent lines of output.
+        :return: Such lines, as (stream, line) tuples.
+        :rtype: List[Tuple[str, str]]
+        """
+        return list(self._retained_lines)
+
+    @property
+    def retained_output(self) -> str:
+        """
+        Retrieves the most recent lines written to stdout.
+        :return: Such output.
+        :rtype: str
+        """
+        return "\n".join(
+            [line for source, line in self._retained_lines if source == self.STDOUT]
+        )
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Runs the command, yielding its output as it's produced.
+        :return: The lines, as (stream, line) tuples.
+        :rtype: AsyncIterator[Tuple[str, str]]
+        """
+        async with self.flake.workspace(self._use_pool) as flake_folder:
+            with self.flake.span("generate_files"):
+                await self.flake.generate_files(flake_folder)
+            with self.flake.span("git_add_files"):
+                await self.flake.git_add_files(
+                    NixFlakeGitAdd(flake_folder, self.flake.executor)
+                )
+
+            NixFlakeOutputStream.logger().debug(
+                f'Streaming "{" ".join(self.args)}" on {flake_folder}'
+            )
+            lines = self.flake.executor.stream(
+                self.args, flake_folder, self._env, self._max_queued_lines
+            )
+            try:
+                async for source, value in lines:
+                    if source == NixFlakeCommandExecutor.EXIT:
+                        self._returncode = value
+                    else:
+                        self._retained_lines.append((source, value))
+                        yield source, value
+            finally:
+                await lines.aclose()
+
+        NixFlakeOutputStream.logger().debug(
+            f'"{" ".join(self.args)}" finished with {self.returncode}'
+        )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
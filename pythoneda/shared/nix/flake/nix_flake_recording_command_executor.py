@@ -0,0 +1,235 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_recording_command_executor.py
+
+This file defines the NixFlakeRecordingCommandExecutor class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import json
+from .nix_flake_command_executor import NixFlakeCommandExecutor
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Tuple
+
+
+class NixFlakeRecordingCommandExecutor(NixFlakeCommandExecutor):
+    """
+    Runs commands through another executor, recording their outcome and duration.
+
+    Class name: NixFlakeRecordingCommandExecutor
+
+    Responsibilities:
+        - Delegate each command to another executor.
+        - Keep the arguments, exit code, output and duration of each command.
+        - Save the recordings, so NixFlakeReplayCommandExecutor can serve them later.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        - pythoneda.shared.nix.flake.NixFlakeReplayCommandExecutor
+    """
+
+    def __init__(self, delegate: NixFlakeCommandExecutor = None):
+        """
+        Creates a new NixFlakeRecordingCommandExecutor instance.
+        :param delegate: The executor actually running the commands, or None to run them in a shell.
+        :type delegate: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        """
+        super().__init__()
+        self._delegate = delegate or NixFlakeCommandExecutor()
+        self._recordings: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @property
+    def delegate(self) -> NixFlakeCommandExecutor:
+        """
+        Retrieves the executor actually running the commands.
+        :return: Such executor.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        """
+        return self._delegate
+
+    @property
+    def recordings(self) -> List[Dict]:
+        """
+        Retrieves the recorded commands, in the order they finished.
+        :return: The recordings, with keys args, returncode, stdout, stderr and seconds.
+        :rtype: List[Dict]
+        """
+        with self._lock:
+            return list(self._recordings)
+
+    def _record(
+        self, args: List[str], outcome: Tuple[int, str, str], seconds: float
+    ) -> Tuple[int, str, str]:
+        """
+        Records the outcome of a command.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param outcome: The exit code, the standard output and the standard error.
+        :type outcome: Tuple[int, str, str]
+        :param seconds: How long the command took.
+        :type seconds: float
+        :return: The outcome.
+        :rtype: Tuple[int, str, str]
+        """
+        returncode, stdout, stderr = outcome
+        with self._lock:
+            self._recordings.append(
+                {
+                    "args": list(args),
+                    "returncode": returncode,
+                    "stdout": stdout,
+                    "stderr": stderr,
+                    "seconds": seconds,
+                }
+            )
+        return outcome
+
+    async def execute(
+        self, args: List[str], cwd: str = None, env: Dict[str, str] = None
+    ) -> Tuple[int, str, str]:
+        """
+        Runs given command.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: The folder where to run it.
+        :type cwd: str
+        :param env: Additional environment variables.
+        :type env: Dict[str, str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        start = time.perf_counter()
+        outcome = await self._delegate.execute(args, cwd, env)
+        return self._record(args, outcome, time.perf_counter() - start)
+
+    async def execute_in_a_temporary_folder(
+        self, args: List[str]
+    ) -> Tuple[int, str, str]:
+        """
+        Runs given command in a throwaway folder.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        start = time.perf_counter()
+        outcome = await self._delegate.execute_in_a_temporary_folder(args)
+        return self._record(args, outcome, time.perf_counter() - start)
+
+    def execute_sync(
+        self, args: List[str], cwd: str = None, env: Dict[str, str] = None
+    ) -> Tuple[int, str, str]:
+        """
+        Runs given command, blocking until it finishes.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: The folder where to run it.
+        :type cwd: str
+        :param env: Additional environment variables.
+        :type env: Dict[str, str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        start = time.perf_counter()
+        outcome = self._delegate.execute_sync(args, cwd, env)
+        return self._record(args, outcome, time.perf_counter() - start)
+
+    async def stream(
+        self,
+        args: List[str],
+        cwd: str = None,
+        env: Dict[str, str] = None,
+        maxQueuedLines: int = 1024,
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Runs given command, yielding its output as it's produced.
+        Only commands streamed to the end are recorded.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: The folder where to run it.
+        :type cwd: str
+        :param env: Additional environment variables.
+        :type env: Dict[str, str]
+        :param maxQueuedLines: The number of lines read ahead of the consumer.
+        :type maxQueuedLines: int
+        :return: (STDOUT or STDERR, line) tuples, and lastly (EXIT, the exit code).
+        :rtype: AsyncIterator[Tuple[str, object]]
+        """
+        start = time.perf_counter()
+        lines = {self.STDOUT: [], self.STDERR: []}
+        returncode = None
+        items = self._delegate.stream(args, cwd, env, maxQueuedLines)
+        try:
+            async for source, value in items:
+                if source == self.EXIT:
+                    returncode = value
+                else:
+                    lines[source].append(value)
+                yield source, value
+        finally:
+            await items.aclose()
+        self._record(
+            args,
+            (
+                returncode,
+                "\n".join(lines[self.STDOUT]),
+                "\n".join(lines[self.STDERR]),
+            ),
+            time.perf_counter() - start,
+        )
+
+    async def git_init(self, folder: str):
+        """
+        Initialises a git repository.
+        :param folder: The folder.
+        :type folder: str
+        """
+        start = time.perf_counter()
+        await self._delegate.git_init(folder)
+        self._record(["git", "init"], (0, "", ""), time.perf_counter() - start)
+
+    async def git_add(self, folder: str, file: str):
+        """
+        Adds a file to a git repository.
+        :param folder: The repository folder.
+        :type folder: str
+        :param file: The file, relative to the folder.
+        :type file: str
+        """
+        start = time.perf_counter()
+        await self._delegate.git_add(folder, file)
+        self._record(["git", "add", file], (0, "", ""), time.perf_counter() - start)
+
+    def save(self, path: str):
+        """
+        Writes the recordings to a JSON file.
+        :param path: The file.
+        :type path: str
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.recordings, file, indent=2)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
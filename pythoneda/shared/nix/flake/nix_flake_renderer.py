@@ -0,0 +1,215 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_renderer.py
+
+This file defines the NixFlakeRenderer class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+from .nix_flake_snapshot import NixFlakeSnapshot
+import os
+from pathlib import Path
+from pythoneda.shared import BaseObject
+from .string_template_group_cache import StringTemplateGroupCache
+from typing import Dict, List, Tuple
+
+
+class NixFlakeRenderer(BaseObject):
+    """
+    Renders the files of many flakes in parallel, using a pool of processes.
+
+    Class name: NixFlakeRenderer
+
+    Responsibilities:
+        - Render a template for a flake, or a snapshot of it.
+        - Fan out the rendering of many flakes across processes.
+        - Write the rendered files, unless they didn't change, and report their sha256 hashes.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeSnapshot
+        - pythoneda.shared.nix.flake.StringTemplateGroupCache
+    """
+
+    _singleton = None
+
+    def __init__(self, maxWorkers: int = None):
+        """
+        Creates a new NixFlakeRenderer instance.
+        :param maxWorkers: The number of processes, or None to use one per core.
+        :type maxWorkers: int
+        """
+        super().__init__()
+        self._max_workers = maxWorkers
+        self._executor = None
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeRenderer
+        """
+        if cls._singleton is None:
+            cls._singleton = cls()
+        return cls._singleton
+
+    @property
+    def max_workers(self) -> int:
+        """
+        Retrieves the number of processes.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._max_workers or os.cpu_count() or 1
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """
+        Retrieves the pool of processes, starting it if needed.
+        :return: The pool.
+        :rtype: concurrent.futures.ProcessPoolExecutor
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    @classmethod
+    def render_template(
+        cls, target, groupName: str, templateFolder: str, rootTemplate: str
+    ) -> str:
+        """
+        Renders a template.
+        :param target: The flake, or a snapshot of it.
+        :type target: pythoneda.shared.nix.flake.NixFlake
+        :param groupName: The name of the stringtemplate group.
+        :type groupName: str
+        :param templateFolder: The subfolder with the templates.
+        :type templateFolder: str
+        :param rootTemplate: The root template.
+        :type rootTemplate: str
+        :return: The rendered text.
+        :rtype: str
+        """
+        group = StringTemplateGroupCache.instance().get(templateFolder, groupName)
+        root_template = group.getInstanceOf(rootTemplate)
+        root_template["flake"] = target
+        return str(root_template)
+
+    @classmethod
+    def write_if_changed(cls, path: str, content: str) -> Tuple[str, bool]:
+        """
+        Writes given file, unless it already has given content.
+        Skipping identical writes keeps mtimes, git's index and nix's evaluation cache valid.
+        :param path: The file.
+        :type path: str
+        :param content: The content.
+        :type content: str
+        :return: The sha256 of the content, and whether the file was written.
+        :rtype: Tuple[str, bool]
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        changed = True
+        try:
+            if os.path.getsize(path) == len(data):
+                with open(path, "rb") as existing_file:
+                    changed = hashlib.sha256(existing_file.read()).hexdigest() != digest
+        except OSError:
+            pass
+        if changed:
+            with open(path, "wb") as output_file:
+                output_file.write(data)
+        return digest, changed
+
+    @classmethod
+    def render(
+        cls,
+        snapshot: NixFlakeSnapshot,
+        jobs: List[Tuple[str, str, str, str]],
+        outputFolder: str,
+    ) -> Dict[str, str]:
+        """
+        Renders the files of a flake. Meant to run in a worker process.
+        :param snapshot: The snapshot of the flake.
+        :type snapshot: pythoneda.shared.nix.flake.NixFlakeSnapshot
+        :param jobs: The (group name, template folder, root template, output file name) of each file.
+        :type jobs: List[Tuple[str, str, str, str]]
+        :param outputFolder: The folder where to write the files.
+        :type outputFolder: str
+        :return: The sha256 of each file, by name.
+        :rtype: Dict[str, str]
+        """
+        result = {}
+        os.makedirs(outputFolder, exist_ok=True)
+        for group_name, template_folder, root_template, output_file_name in jobs:
+            content = cls.render_template(
+                snapshot, group_name, template_folder, root_template
+            )
+            result[output_file_name], _ = cls.write_if_changed(
+                str(Path(outputFolder) / output_file_name), content
+            )
+        return result
+
+    async def render_many(
+        self, flakes: List, outputFolders: List[str]
+    ) -> List[Dict[str, str]]:
+        """
+        Renders the files of given flakes in parallel.
+        :param flakes: The flakes.
+        :type flakes: List[pythoneda.shared.nix.flake.NixFlake]
+        :param outputFolders: The folder where to write the files of each flake.
+        :type outputFolders: List[str]
+        :return: The sha256 of each file, by name, for each flake.
+        :rtype: List[Dict[str, str]]
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        NixFlakeRenderer.logger().debug(
+            f"Rendering {len(flakes)} flake(s) with {self.max_workers} process(es)"
+        )
+        return await asyncio.gather(
+            *[
+                loop.run_in_executor(
+                    pool,
+                    NixFlakeRenderer.render,
+                    flake.snapshot(),
+                    flake.template_jobs(),
+                    str(output_folder),
+                )
+                for flake, output_folder in zip(flakes, outputFolders)
+            ]
+        )
+
+    def close(self):
+        """
+        Stops the pool of processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,255 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_replay_command_executor.py
+
+This file defines the NixFlakeReplayCommandExecutor class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import json
+from .nix_flake_command_executor import NixFlakeCommandExecutor
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Tuple
+
+
+class NixFlakeReplayCommandExecutor(NixFlakeCommandExecutor):
+    """
+    Serves recorded outcomes instead of running commands.
+
+    Class name: NixFlakeReplayCommandExecutor
+
+    Responsibilities:
+        - Answer each command with its recorded exit code and output.
+        - Simulate the recorded durations, or a fixed latency.
+        - Let flakes be run, built and locked without nix or git, e.g. in load tests.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+        - pythoneda.shared.nix.flake.NixFlakeRecordingCommandExecutor
+    """
+
+    def __init__(
+        self, recordings: List[Dict], latency: float = None, strict: bool = False
+    ):
+        """
+        Creates a new NixFlakeReplayCommandExecutor instance.
+        :param recordings: The recordings, as produced by NixFlakeRecordingCommandExecutor.
+        :type recordings: List[Dict]
+        :param latency: The seconds each command takes, or None to take as long as when recorded.
+        :type latency: float
+        :param strict: Whether commands not recorded fail, instead of succeeding with no output.
+        :type strict: bool
+        """
+        super().__init__()
+        self._latency = latency
+        self._strict = strict
+        self._recordings: Dict[Tuple[str, ...], List[Dict]] = {}
+        for recording in recordings:
+            self._recordings.setdefault(tuple(recording["args"]), []).append(recording)
+        self._served: Dict[Tuple[str, ...], int] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str, latency: float = None, strict: bool = False):
+        """
+        Creates a new instance from the recordings saved in given file.
+        :param path: The file.
+        :type path: str
+        :param latency: The seconds each command takes, or None to take as long as when recorded.
+        :type latency: float
+        :param strict: Whether commands not recorded fail, instead of succeeding with no output.
+        :type strict: bool
+        :return: The executor.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeReplayCommandExecutor
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            recordings = json.load(file)
+        return cls(recordings, latency, strict)
+
+    @property
+    def latency(self) -> float:
+        """
+        Retrieves the seconds each command takes.
+        :return: Such latency, or None if commands take as long as when recorded.
+        :rtype: float
+        """
+        return self._latency
+
+    @property
+    def strict(self) -> bool:
+        """
+        Checks whether commands not recorded fail.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._strict
+
+    @property
+    def count(self) -> int:
+        """
+        Retrieves the number of commands served.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._count
+
+    def _next(self, args: List[str]) -> Tuple[Tuple[int, str, str], float]:
+        """
+        Picks the recording to serve for given command.
+        Repeated commands get their recordings in order, the last one once exhausted.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :return: The exit code, the standard output and the standard error, and the delay.
+        :rtype: Tuple[Tuple[int, str, str], float]
+        """
+        key = tuple(args)
+        with self._lock:
+            self._count += 1
+            recordings = self._recordings.get(key, None)
+            if recordings is None:
+                recording = None
+            else:
+                served = self._served.get(key, 0)
+                recording = recordings[min(served, len(recordings) - 1)]
+                self._served[key] = served + 1
+
+        if recording is None:
+            NixFlakeReplayCommandExecutor.logger().debug(
+                f"No recording for {' '.join(args)}"
+            )
+            if self._strict:
+                outcome = (127, "", f"No recording for {' '.join(args)}")
+            else:
+                outcome = (0, "", "")
+            seconds = 0.0
+        else:
+            outcome = (
+                recording["returncode"],
+                recording["stdout"],
+                recording["stderr"],
+            )
+            seconds = recording.get("seconds", 0.0)
+        if self._latency is not None:
+            seconds = self._latency
+
+        return outcome, seconds
+
+    async def execute(
+        self, args: List[str], cwd: str = None, env: Dict[str, str] = None
+    ) -> Tuple[int, str, str]:
+        """
+        Serves the recorded outcome of given command.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: Ignored.
+        :type cwd: str
+        :param env: Ignored.
+        :type env: Dict[str, str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        outcome, seconds = self._next(args)
+        await asyncio.sleep(seconds)
+        return outcome
+
+    async def execute_in_a_temporary_folder(
+        self, args: List[str]
+    ) -> Tuple[int, str, str]:
+        """
+        Serves the recorded outcome of given command.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        return await self.execute(args)
+
+    def execute_sync(
+        self, args: List[str], cwd: str = None, env: Dict[str, str] = None
+    ) -> Tuple[int, str, str]:
+        """
+        Serves the recorded outcome of given command, blocking for as long as it takes.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: Ignored.
+        :type cwd: str
+        :param env: Ignored.
+        :type env: Dict[str, str]
+        :return: The exit code, the standard output and the standard error.
+        :rtype: Tuple[int, str, str]
+        """
+        outcome, seconds = self._next(args)
+        time.sleep(seconds)
+        return outcome
+
+    async def stream(
+        self,
+        args: List[str],
+        cwd: str = None,
+        env: Dict[str, str] = None,
+        maxQueuedLines: int = 1024,
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Serves the recorded output of given command, line by line: stdout first, then stderr.
+        :param args: The command and its arguments.
+        :type args: List[str]
+        :param cwd: Ignored.
+        :type cwd: str
+        :param env: Ignored.
+        :type env: Dict[str, str]
+        :param maxQueuedLines: Ignored.
+        :type maxQueuedLines: int
+        :return: (STDOUT or STDERR, line) tuples, and lastly (EXIT, the exit code).
+        :rtype: AsyncIterator[Tuple[str, object]]
+        """
+        (returncode, stdout, stderr), seconds = self._next(args)
+        await asyncio.sleep(seconds)
+        for line in stdout.splitlines():
+            yield self.STDOUT, line
+        for line in stderr.splitlines():
+            yield self.STDERR, line
+        yield self.EXIT, returncode
+
+    async def git_init(self, folder: str):
+        """
+        Pretends to initialise a git repository.
+        :param folder: Ignored.
+        :type folder: str
+        """
+        await self.execute(["git", "init"])
+
+    async def git_add(self, folder: str, file: str):
+        """
+        Pretends to add a file to a git repository.
+        :param folder: Ignored.
+        :type folder: str
+        :param file: The file.
+        :type file: str
+        """
+        await self.execute(["git", "add", file])
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,385 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_result_cache.py
+
+This file defines the NixFlakeResultCache class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+from pathlib import Path
+from pythoneda.shared import BaseObject
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Iterator, List
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows
+    fcntl = None
+
+
+class NixFlakeResultCache(BaseObject):
+    """
+    Persistent, content-addressed cache of the results of building or running flakes.
+
+    Class name: NixFlakeResultCache
+
+    Responsibilities:
+        - Map the hash of the generated files of a flake to the result of a nix operation on them.
+        - Persist the mapping on disk, merging the changes of concurrent processes.
+        - Evict entries based on their age and the number of entries.
+        - Verify the cached store paths still exist.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+    """
+
+    _singleton = None
+
+    _ignored_entries = [".git", "flake.lock", "result"]
+
+    _store_path_pattern = re.compile(r"/nix/store/[^\s\"'»]+")
+
+    def __init__(
+        self,
+        folder: str = None,
+        maxEntries: int = 1024,
+        maxAge: int = 30 * 24 * 60 * 60,
+    ):
+        """
+        Creates a new NixFlakeResultCache instance.
+        :param folder: The folder where the cache is persisted.
+        :type folder: str
+        :param maxEntries: The maximum number of entries to keep.
+        :type maxEntries: int
+        :param maxAge: The maximum age of the entries, in seconds.
+        :type maxAge: int
+        """
+        super().__init__()
+        if folder is None:
+            folder = self.__class__.default_folder()
+        self._folder = folder
+        self._max_entries = maxEntries
+        self._max_age = maxAge
+        self._entries = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeResultCache
+        """
+        if cls._singleton is None:
+            cls._singleton = cls()
+        return cls._singleton
+
+    @classmethod
+    def default_folder(cls) -> str:
+        """
+        Retrieves the default folder for the cache.
+        :return: Such folder.
+        :rtype: str
+        """
+        base = os.environ.get("XDG_CACHE_HOME", None)
+        if base is None:
+            base = Path.home() / ".cache"
+        return str(Path(base) / "pythoneda" / "nix-flake")
+
+    @property
+    def folder(self) -> str:
+        """
+        Retrieves the folder where the cache is persisted.
+        :return: Such folder.
+        :rtype: str
+        """
+        return self._folder
+
+    @property
+    def max_entries(self) -> int:
+        """
+        Retrieves the maximum number of entries.
+        :return: Such limit.
+        :rtype: int
+        """
+        return self._max_entries
+
+    @property
+    def max_age(self) -> int:
+        """
+        Retrieves the maximum age of the entries, in seconds.
+        :return: Such limit.
+        :rtype: int
+        """
+        return self._max_age
+
+    @property
+    def index_file(self) -> str:
+        """
+        Retrieves the file where the entries are persisted.
+        :return: Such file.
+        :rtype: str
+        """
+        return str(Path(self.folder) / "results.json")
+
+    @property
+    def lock_file(self) -> str:
+        """
+        Retrieves the file locked while the entries are read and written.
+        :return: Such file.
+        :rtype: str
+        """
+        return str(Path(self.folder) / "results.json.lock")
+
+    @classmethod
+    def content_hash(cls, flakeFolder: str) -> str:
+        """
+        Computes the hash of the generated files in given folder.
+        Git metadata, lock files and result links are not taken into account.
+        :param flakeFolder: The flake folder.
+        :type flakeFolder: str
+        :return: The sha256 of the files' names and contents.
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(flakeFolder):
+            dirs[:] = sorted(
+                [aux for aux in dirs if aux not in cls._ignored_entries]
+            )
+            for name in sorted(files):
+                if name in cls._ignored_entries or name.startswith("result-"):
+                    continue
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    continue
+                digest.update(os.path.relpath(path, flakeFolder).encode("utf-8"))
+                digest.update(b"\0")
+                with open(path, "rb") as file:
+                    digest.update(hashlib.sha256(file.read()).digest())
+        return digest.hexdigest()
+
+    def _load(self) -> Dict:
+        """
+        Loads the entries from disk, if not done already.
+        :return: The entries.
+        :rtype: Dict
+        """
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.index_file):
+                try:
+                    with open(self.index_file, "r", encoding="utf-8") as file:
+                        self._entries = json.load(file)
+                except (OSError, ValueError) as error:
+                    NixFlakeResultCache.logger().warning(
+                        f"Ignoring unreadable cache {self.index_file}: {error}"
+                    )
+        return self._entries
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict]:
+        """
+        Holds the cache locked, within this process and across processes, and reloads the entries,
+        so that changes are made on top of what other processes persisted.
+        :return: The entries.
+        :rtype: Iterator[Dict]
+        """
+        with self._lock:
+            lock_file = None
+            try:
+                os.makedirs(self.folder, exist_ok=True)
+                lock_file = open(self.lock_file, "a")
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            except OSError as error:
+                NixFlakeResultCache.logger().warning(
+                    f"Could not lock cache {self.index_file}: {error}"
+                )
+                if lock_file is not None:
+                    lock_file.close()
+                    lock_file = None
+            try:
+                self._entries = None
+                yield self._load()
+            finally:
+                if lock_file is not None:
+                    # closing the file releases the lock
+                    lock_file.close()
+
+    def _save(self):
+        """
+        Persists the entries, atomically. Callers hold the cache locked.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(self._entries, file)
+            os.replace(tmp_file, self.index_file)
+        except OSError as error:
+            NixFlakeResultCache.logger().warning(
+                f"Could not persist cache {self.index_file}: {error}"
+            )
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def _key(self, operation: str, contentHash: str) -> str:
+        """
+        Builds the key of an entry.
+        :param operation: The nix operation (build, run).
+        :type operation: str
+        :param contentHash: The hash of the generated files.
+        :type contentHash: str
+        :return: The key.
+        :rtype: str
+        """
+        return f"{operation}:{contentHash}"
+
+    @classmethod
+    def store_paths(cls, value: str) -> List[str]:
+        """
+        Retrieves the store paths mentioned in given result.
+        :param value: The result.
+        :type value: str
+        :return: The store paths.
+        :rtype: List[str]
+        """
+        return cls._store_path_pattern.findall(value or "")
+
+    def verify(self, value: str) -> bool:
+        """
+        Checks whether all store paths referenced by given result still exist.
+        :param value: The cached result.
+        :type value: str
+        :return: True in such case.
+        :rtype: bool
+        """
+        return all(
+            os.path.exists(path) for path in self.__class__.store_paths(value)
+        )
+
+    def get(self, operation: str, contentHash: str, verify: bool = True) -> str:
+        """
+        Retrieves the cached result for given operation and content.
+        :param operation: The nix operation (build, run).
+        :type operation: str
+        :param contentHash: The hash of the generated files.
+        :type contentHash: str
+        :param verify: Whether to check the store paths still exist.
+        :type verify: bool
+        :return: The cached result, or None if missing, expired or no longer valid.
+        :rtype: str
+        """
+        result = None
+        key = self._key(operation, contentHash)
+        with self._locked() as entries:
+            entry = entries.get(key, None)
+            if entry is not None:
+                now = time.time()
+                if now - entry["created"] > self.max_age or (
+                    verify and not self.verify(entry["value"])
+                ):
+                    del entries[key]
+                else:
+                    entry["accessed"] = now
+                    result = entry["value"]
+                self._save()
+        return result
+
+    def put(self, operation: str, contentHash: str, value: str):
+        """
+        Stores the result of given operation.
+        :param operation: The nix operation (build, run).
+        :type operation: str
+        :param contentHash: The hash of the generated files.
+        :type contentHash: str
+        :param value: The result.
+        :type value: str
+        """
+        now = time.time()
+        with self._locked() as entries:
+            entries[self._key(operation, contentHash)] = {
+                "value": value,
+                "created": now,
+                "accessed": now,
+            }
+            self._evict(now)
+            self._save()
+
+    def _evict(self, now: float):
+        """
+        Removes expired entries, and the least recently used ones beyond the limit.
+        :param now: The current time.
+        :type now: float
+        """
+        entries = self._load()
+        for key in [
+            key
+            for key, entry in entries.items()
+            if now - entry["created"] > self.max_age
+        ]:
+            del entries[key]
+        if len(entries) > self.max_entries:
+            for key in sorted(entries, key=lambda aux: entries[aux]["accessed"])[
+                : len(entries) - self.max_entries
+            ]:
+                del entries[key]
+
+    def evict(self):
+        """
+        Removes expired entries, and the least recently used ones beyond the limit.
+        """
+        with self._locked():
+            self._evict(time.time())
+            self._save()
+
+    def invalidate(self, operation: str, contentHash: str):
+        """
+        Removes the entry for given operation and content, if any.
+        :param operation: The nix operation (build, run).
+        :type operation: str
+        :param contentHash: The hash of the generated files.
+        :type contentHash: str
+        """
+        with self._locked() as entries:
+            if entries.pop(self._key(operation, contentHash), None) is not None:
+                self._save()
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._locked():
+            self._entries = {}
+            self._save()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,186 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_snapshot.py
+
+This file defines the NixFlakeSnapshot class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared import BaseObject
+from typing import Dict, List
+
+
+class NixFlakeSnapshot(BaseObject):
+    """
+    A frozen, picklable copy of what templates can see of a flake or an input.
+
+    Class name: NixFlakeSnapshot
+
+    Responsibilities:
+        - Capture the values of all public properties of an object.
+        - Expose them as attributes, so templates render it as they would render the object.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeInput
+        - pythoneda.shared.nix.flake.NixFlakeRenderer
+    """
+
+    _primitives = (str, int, float, bool, type(None))
+
+    # collaborators, rather than state templates could render
+    _ignored_properties = ("executor",)
+
+    _property_names_by_class: Dict[type, List[str]] = {}
+
+    def __init__(self, typeName: str, values: Dict):
+        """
+        Creates a new NixFlakeSnapshot instance.
+        :param typeName: The name of the class of the captured object.
+        :type typeName: str
+        :param values: The property values.
+        :type values: Dict
+        """
+        super().__init__()
+        self._type_name = typeName
+        self._values = values
+
+    @classmethod
+    def of(cls, target, memo: Dict = None):
+        """
+        Captures given object.
+        :param target: The object, usually a flake.
+        :type target: pythoneda.shared.nix.flake.NixFlake
+        :param memo: The snapshots already taken, by object id, so shared objects stay shared.
+        :type memo: Dict
+        :return: The snapshot.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeSnapshot
+        """
+        if memo is None:
+            memo = {}
+        result = memo.get(id(target), None)
+        if result is None:
+            values = {}
+            result = cls(target.__class__.__name__, values)
+            memo[id(target)] = result
+            for name in cls._property_names(target.__class__):
+                try:
+                    value = getattr(target, name)
+                except Exception as error:
+                    NixFlakeSnapshot.logger().debug(
+                        f"Skipping {target.__class__.__name__}.{name}: {error}"
+                    )
+                    continue
+                values[name] = cls._capture(value, memo)
+        return result
+
+    @classmethod
+    def _property_names(cls, targetClass: type) -> List[str]:
+        """
+        Retrieves the names of the public properties of given class.
+        :param targetClass: The class.
+        :type targetClass: type
+        :return: Such names.
+        :rtype: List[str]
+        """
+        result = cls._property_names_by_class.get(targetClass, None)
+        if result is None:
+            result = []
+            for klass in targetClass.__mro__:
+                for name, member in vars(klass).items():
+                    if (
+                        isinstance(member, property)
+                        and not name.startswith("_")
+                        and name not in cls._ignored_properties
+                        and name not in result
+                    ):
+                        result.append(name)
+            cls._property_names_by_class[targetClass] = result
+        return result
+
+    @classmethod
+    def _capture(cls, value, memo: Dict):
+        """
+        Converts given value into something picklable.
+        :param value: The value.
+        :type value: object
+        :param memo: The snapshots already taken.
+        :type memo: Dict
+        :return: The converted value.
+        :rtype: object
+        """
+        result = None
+        if isinstance(value, cls._primitives):
+            result = value
+        elif isinstance(value, (list, tuple, set)):
+            result = [cls._capture(aux, memo) for aux in value]
+        elif isinstance(value, dict):
+            result = {key: cls._capture(aux, memo) for key, aux in value.items()}
+        elif isinstance(value, BaseObject):
+            result = cls.of(value, memo)
+        else:
+            result = str(value)
+        return result
+
+    @property
+    def type_name(self) -> str:
+        """
+        Retrieves the name of the class of the captured object.
+        :return: Such name.
+        :rtype: str
+        """
+        return self._type_name
+
+    def __getattr__(self, name: str):
+        """
+        Retrieves a captured property.
+        :param name: The property name.
+        :type name: str
+        :return: Its value.
+        :rtype: object
+        """
+        if name.startswith("_") or name not in self._values:
+            raise AttributeError(
+                f"{self._type_name} snapshot has no attribute {name!r}"
+            )
+        return self._values[name]
+
+    def __getstate__(self) -> Dict:
+        """
+        Retrieves the state to pickle.
+        :return: Such state.
+        :rtype: Dict
+        """
+        return {"type_name": self._type_name, "values": self._values}
+
+    def __setstate__(self, state: Dict):
+        """
+        Restores a pickled state.
+        :param state: The state.
+        :type state: Dict
+        """
+        self._type_name = state["type_name"]
+        self._values = state["values"]
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,187 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_timing_histogram.py
+
+This file defines the NixFlakeTimingHistogram class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import bisect
+from pythoneda.shared import BaseObject
+from typing import Dict, List
+
+
+class NixFlakeTimingHistogram(BaseObject):
+    """
+    Aggregated durations of a phase of a flake operation.
+
+    Class name: NixFlakeTimingHistogram
+
+    Responsibilities:
+        - Count durations in fixed, roughly logarithmic buckets.
+        - Track count, total, min, max and failures.
+        - Estimate percentiles.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlakeTimings
+    """
+
+    BOUNDS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600]
+
+    def __init__(self):
+        """
+        Creates a new, empty NixFlakeTimingHistogram instance.
+        """
+        super().__init__()
+        self._buckets = [0] * (len(self.BOUNDS) + 1)
+        self._count = 0
+        self._failures = 0
+        self._total = 0.0
+        self._min = None
+        self._max = None
+
+    @property
+    def count(self) -> int:
+        """
+        Retrieves the number of recorded durations.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._count
+
+    @property
+    def failures(self) -> int:
+        """
+        Retrieves the number of recorded durations of failed phases.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._failures
+
+    @property
+    def total(self) -> float:
+        """
+        Retrieves the sum of all durations, in seconds.
+        :return: Such sum.
+        :rtype: float
+        """
+        return self._total
+
+    @property
+    def min(self) -> float:
+        """
+        Retrieves the shortest duration, in seconds.
+        :return: Such duration, or None if nothing was recorded.
+        :rtype: float
+        """
+        return self._min
+
+    @property
+    def max(self) -> float:
+        """
+        Retrieves the longest duration, in seconds.
+        :return: Such duration, or None if nothing was recorded.
+        :rtype: float
+        """
+        return self._max
+
+    @property
+    def mean(self) -> float:
+        """
+        Retrieves the average duration, in seconds.
+        :return: Such duration, or None if nothing was recorded.
+        :rtype: float
+        """
+        return self._total / self._count if self._count else None
+
+    @property
+    def buckets(self) -> List[int]:
+        """
+        Retrieves the number of durations up to each of BOUNDS, plus those beyond the last one.
+        :return: Such counts.
+        :rtype: List[int]
+        """
+        return list(self._buckets)
+
+    def record(self, seconds: float, failed: bool = False):
+        """
+        Records a duration.
+        :param seconds: The duration, in seconds.
+        :type seconds: float
+        :param failed: Whether the phase failed.
+        :type failed: bool
+        """
+        self._buckets[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self._count += 1
+        self._total += seconds
+        if failed:
+            self._failures += 1
+        if self._min is None or seconds < self._min:
+            self._min = seconds
+        if self._max is None or seconds > self._max:
+            self._max = seconds
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimates a percentile, as the upper bound of the bucket it falls in.
+        :param percent: The percentile, from 0 to 100.
+        :type percent: float
+        :return: The estimated duration, in seconds, or None if nothing was recorded.
+        :rtype: float
+        """
+        result = None
+        if self._count:
+            target = self._count * percent / 100
+            seen = 0
+            for index, count in enumerate(self._buckets):
+                seen += count
+                if seen >= target and count:
+                    result = (
+                        self.BOUNDS[index] if index < len(self.BOUNDS) else self._max
+                    )
+                    break
+            result = min(result, self._max)
+        return result
+
+    def to_dict(self) -> Dict:
+        """
+        Summarizes this histogram.
+        :return: The summary.
+        :rtype: Dict
+        """
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "buckets": dict(
+                zip([str(aux) for aux in self.BOUNDS] + ["+Inf"], self.buckets)
+            ),
+        }
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,216 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_timings.py
+
+This file defines the NixFlakeTimings class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from contextlib import contextmanager
+from .nix_flake_timing_histogram import NixFlakeTimingHistogram
+from pythoneda.shared import BaseObject
+import threading
+import time
+from typing import Callable, Dict, Iterator, List
+
+
+class NixFlakeTimings(BaseObject):
+    """
+    Records how long each phase of a flake operation takes.
+
+    Class name: NixFlakeTimings
+
+    Responsibilities:
+        - Time spans of code, by flake name and phase.
+        - Notify listeners of each finished span.
+        - Aggregate the durations in a histogram per flake name and phase.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeTimingHistogram
+    """
+
+    _singleton = None
+
+    def __init__(self):
+        """
+        Creates a new NixFlakeTimings instance.
+        """
+        super().__init__()
+        self._histograms: Dict[str, Dict[str, NixFlakeTimingHistogram]] = {}
+        self._listeners: List[Callable] = []
+        self._enabled = True
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeTimings
+        """
+        if cls._singleton is None:
+            cls._singleton = cls()
+        return cls._singleton
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Checks whether spans are being recorded.
+        :return: True in such case.
+        :rtype: bool
+        """
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        """
+        Turns recording on or off.
+        :param value: Whether to record spans.
+        :type value: bool
+        """
+        self._enabled = value
+
+    def add_listener(self, listener: Callable):
+        """
+        Registers a callback, invoked as listener(flakeName, phase, seconds, error) after each span.
+        :param listener: The callback.
+        :type listener: Callable
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable):
+        """
+        Unregisters a callback.
+        :param listener: The callback.
+        :type listener: Callable
+        """
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    @contextmanager
+    def span(self, flakeName: str, phase: str) -> Iterator[None]:
+        """
+        Times the enclosed code, in synchronous or asynchronous contexts alike.
+        :param flakeName: The name of the flake (or of whatever the phase works on).
+        :type flakeName: str
+        :param phase: The phase, e.g. "generate_files" or "nix build".
+        :type phase: str
+        """
+        if not self._enabled:
+            yield
+            return
+        error = None
+        start = time.perf_counter()
+        try:
+            yield
+        except GeneratorExit:
+            # the consumer of a generator stopped early
+            raise
+        except BaseException as exception:
+            error = exception
+            raise
+        finally:
+            self.record(flakeName, phase, time.perf_counter() - start, error)
+
+    def record(
+        self, flakeName: str, phase: str, seconds: float, error: BaseException = None
+    ):
+        """
+        Records the duration of a phase.
+        :param flakeName: The name of the flake.
+        :type flakeName: str
+        :param phase: The phase.
+        :type phase: str
+        :param seconds: The duration, in seconds.
+        :type seconds: float
+        :param error: The error the phase raised, if any.
+        :type error: BaseException
+        """
+        with self._lock:
+            phases = self._histograms.setdefault(flakeName, {})
+            histogram = phases.get(phase, None)
+            if histogram is None:
+                histogram = NixFlakeTimingHistogram()
+                phases[phase] = histogram
+            histogram.record(seconds, error is not None)
+        for listener in list(self._listeners):
+            try:
+                listener(flakeName, phase, seconds, error)
+            except Exception as exception:
+                NixFlakeTimings.logger().warning(
+                    f"Timing listener {listener} failed: {exception}"
+                )
+
+    def histogram(self, flakeName: str, phase: str) -> NixFlakeTimingHistogram:
+        """
+        Retrieves the histogram of given phase of given flake.
+        :param flakeName: The name of the flake.
+        :type flakeName: str
+        :param phase: The phase.
+        :type phase: str
+        :return: The histogram, or None if nothing was recorded.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeTimingHistogram
+        """
+        return self._histograms.get(flakeName, {}).get(phase, None)
+
+    def histograms(
+        self, flakeName: str = None
+    ) -> Dict[str, Dict[str, NixFlakeTimingHistogram]]:
+        """
+        Retrieves the histograms of all phases, by flake name.
+        :param flakeName: The flake to restrict the results to, if any.
+        :type flakeName: str
+        :return: The histograms, by flake name and phase.
+        :rtype: Dict[str, Dict[str, pythoneda.shared.nix.flake.NixFlakeTimingHistogram]]
+        """
+        with self._lock:
+            result = {
+                name: dict(phases)
+                for name, phases in self._histograms.items()
+                if flakeName is None or name == flakeName
+            }
+        return result
+
+    def summary(self, flakeName: str = None) -> Dict[str, Dict[str, Dict]]:
+        """
+        Summarizes the histograms, e.g. to log or export them as JSON.
+        :param flakeName: The flake to restrict the results to, if any.
+        :type flakeName: str
+        :return: The summaries, by flake name and phase.
+        :rtype: Dict[str, Dict[str, Dict]]
+        """
+        return {
+            name: {phase: histogram.to_dict() for phase, histogram in phases.items()}
+            for name, phases in self.histograms(flakeName).items()
+        }
+
+    def reset(self):
+        """
+        Discards all recorded durations.
+        """
+        with self._lock:
+            self._histograms = {}
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
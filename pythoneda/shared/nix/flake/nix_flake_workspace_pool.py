@@ -0,0 +1,242 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/nix_flake_workspace_pool.py
+
+This file defines the NixFlakeWorkspacePool class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from .nix_flake_command_executor import NixFlakeCommandExecutor
+from .nix_flake_git_add import NixFlakeGitAdd
+from .nix_flake_timings import NixFlakeTimings
+import os
+from pythoneda.shared import BaseObject
+import shutil
+import tempfile
+from typing import Dict
+
+
+class NixFlakeWorkspacePool(BaseObject):
+    """
+    Pool of long-lived, git-initialised folders where flakes are generated and evaluated.
+
+    Class name: NixFlakeWorkspacePool
+
+    Responsibilities:
+        - Provide one workspace per flake identity, reused across calls.
+        - Keep nix's evaluation cache and git's index warm between calls.
+        - Remove what nix left behind in a workspace before handing it out again.
+        - Serialize concurrent usages of the same workspace.
+        - Bound the number of workspaces, evicting the least recently used.
+
+    Collaborators:
+        - pythoneda.shared.nix.flake.NixFlake
+        - pythoneda.shared.nix.flake.NixFlakeCommandExecutor
+    """
+
+    _singleton = None
+
+    # files nix writes in the workspace, which must not leak into the next call
+    _leftovers = ("flake.lock", "result")
+
+    def __init__(self, maxWorkspaces: int = 16, folder: str = None):
+        """
+        Creates a new NixFlakeWorkspacePool instance.
+        :param maxWorkspaces: The maximum number of workspaces.
+        :type maxWorkspaces: int
+        :param folder: The parent folder of the workspaces.
+        :type folder: str
+        """
+        super().__init__()
+        self._max_workspaces = maxWorkspaces
+        self._folder = folder
+        self._workspaces: OrderedDict = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._in_use: Dict[str, int] = {}
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.NixFlakeWorkspacePool
+        """
+        if cls._singleton is None:
+            cls._singleton = cls()
+        return cls._singleton
+
+    @property
+    def max_workspaces(self) -> int:
+        """
+        Retrieves the maximum number of workspaces.
+        :return: Such limit.
+        :rtype: int
+        """
+        return self._max_workspaces
+
+    @property
+    def folder(self) -> str:
+        """
+        Retrieves the parent folder of the workspaces.
+        :return: Such folder, or None to use the system's temporary folder.
+        :rtype: str
+        """
+        return self._folder
+
+    def __len__(self) -> int:
+        """
+        Retrieves the number of workspaces in the pool.
+        :return: Such number.
+        :rtype: int
+        """
+        return len(self._workspaces)
+
+    @classmethod
+    def identity_of(cls, flake) -> str:
+        """
+        Retrieves the identity of given flake, used to pick its workspace.
+        :param flake: The flake.
+        :type flake: pythoneda.shared.nix.flake.NixFlake
+        :return: The identity.
+        :rtype: str
+        """
+        return f"{flake.__class__.__name__}:{flake.name}"
+
+    @asynccontextmanager
+    async def workspace(self, flake):
+        """
+        Provides the workspace of given flake, creating it if needed.
+        The workspace is locked for the duration of the context.
+        :param flake: The flake.
+        :type flake: pythoneda.shared.nix.flake.NixFlake
+        :return: The workspace folder.
+        :rtype: str
+        """
+        identity = self.__class__.identity_of(flake)
+        lock = self._locks.get(identity, None)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[identity] = lock
+        self._in_use[identity] = self._in_use.get(identity, 0) + 1
+        try:
+            async with lock:
+                folder = self._workspaces.get(identity, None)
+                if folder is None:
+                    prefix = f"{flake.name}-" if flake.name else None
+                    folder = tempfile.mkdtemp(prefix=prefix, dir=self.folder)
+                    with NixFlakeTimings.instance().span(flake.name, "git_init"):
+                        await flake.executor.git_init(folder)
+                    NixFlakeGitAdd.forget(folder)
+                    self._workspaces[identity] = folder
+                    NixFlakeWorkspacePool.logger().debug(
+                        f"Created workspace {folder} for {identity}"
+                    )
+                else:
+                    self.__class__.clean(folder)
+                self._workspaces.move_to_end(identity)
+                self._evict()
+                yield folder
+        finally:
+            self._in_use[identity] -= 1
+            if self._in_use[identity] == 0:
+                del self._in_use[identity]
+
+    @classmethod
+    def clean(cls, folder: str):
+        """
+        Removes the lock file and the result links of a previous call from given workspace.
+        :param folder: The workspace folder.
+        :type folder: str
+        """
+        for name in os.listdir(folder):
+            if name in cls._leftovers or name.startswith("result-"):
+                path = os.path.join(folder, name)
+                try:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.unlink(path)
+                except OSError as error:
+                    NixFlakeWorkspacePool.logger().warning(
+                        f"Could not remove {path}: {error}"
+                    )
+
+    def _evict(self):
+        """
+        Removes the least recently used idle workspaces beyond the limit.
+        """
+        for identity in list(self._workspaces.keys()):
+            if len(self._workspaces) <= self.max_workspaces:
+                break
+            if identity not in self._in_use:
+                self._discard(identity)
+
+    def _discard(self, identity: str):
+        """
+        Removes given workspace.
+        :param identity: The identity of the workspace.
+        :type identity: str
+        """
+        folder = self._workspaces.pop(identity)
+        self._locks.pop(identity, None)
+        shutil.rmtree(folder, ignore_errors=True)
+        NixFlakeGitAdd.forget(folder)
+        NixFlakeWorkspacePool.logger().debug(f"Discarded workspace {folder}")
+
+    def close(self):
+        """
+        Removes all idle workspaces.
+        """
+        for identity in [
+            aux for aux in self._workspaces.keys() if aux not in self._in_use
+        ]:
+            self._discard(identity)
+
+    @classmethod
+    @asynccontextmanager
+    async def temporary_workspace(cls, flake=None):
+        """
+        Provides a throwaway git-initialised folder, removed afterwards.
+        :param flake: The flake the folder is for, if any.
+        :type flake: pythoneda.shared.nix.flake.NixFlake
+        :return: The workspace folder.
+        :rtype: str
+        """
+        executor = NixFlakeCommandExecutor.instance()
+        if flake is not None:
+            executor = flake.executor
+        with tempfile.TemporaryDirectory() as folder:
+            with NixFlakeTimings.instance().span(
+                flake.name if flake is not None else None, "git_init"
+            ):
+                await executor.git_init(folder)
+            try:
+                yield folder
+            finally:
+                NixFlakeGitAdd.forget(folder)
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -21,9 +21,10 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 import datetime
 from .nix_flake import NixFlake
+from .nix_flake_input import NixFlakeInput
 from path import Path
 from pythoneda.shared import attribute
-from typing import List
+from typing import List, Tuple
 
 
 class PythonedaNixFlake(NixFlake):
@@ -112,7 +113,37 @@ class PythonedaNixFlake(NixFlake):
         :return: Such collection.
         :rtype: List
         """
-        return [aux for aux in self._inputs if aux.name not in ["nixos", "flake-utils"]]
+        return [aux for aux in self.inputs if aux.name not in ["nixos", "flake-utils"]]
+
+    def _set_attribute_from_json(self, varName, varValue):
+        """
+        Changes the value of an attribute of this instance.
+        :param varName: The name of the attribute.
+        :type varName: str
+        :param varValue: The value of the attribute.
+        :type varValue: int, bool, str, type
+        """
+        if varName != "package_inputs":
+            # package_inputs are derived from inputs
+            super()._set_attribute_from_json(varName, varValue)
+
+    def _get_attribute_to_json(self, varName) -> str:
+        """
+        Retrieves the value of an attribute of this instance, as Json.
+        :param varName: The name of the attribute.
+        :type varName: str
+        :return: The attribute value in json format.
+        :rtype: str
+        """
+        result = None
+        if varName == "package_inputs":
+            if self._dag_serialization:
+                result = NixFlakeInput.inputs_to_dag(self.package_inputs)
+            else:
+                result = [aux.to_dict() for aux in self.package_inputs]
+        else:
+            result = super()._get_attribute_to_json(varName)
+        return result
 
     @property
     @attribute
@@ -144,45 +175,60 @@ class PythonedaNixFlake(NixFlake):
         """
         return self._hexagonal_layer
 
-    def generate_files(self, flakeFolder: str):
+    async def generate_files(self, flakeFolder: str):
         """
         Generates the files.
         :param flakeFolder: The flake folder.
         :type flakeFolder: str
         """
-        self.generate_flake(flakeFolder)
-        self.generate_pyprojecttoml_template(flakeFolder)
+        await self.generate_flake(flakeFolder)
+        await self.generate_pyprojecttoml_template(flakeFolder)
 
-    def generate_pyprojecttoml_template(self, flakeFolder: str):
+    async def generate_pyprojecttoml_template(self, flakeFolder: str):
         """
         Generates the pyprojecttoml.template from a template. Yes, a template generates another template.
         :param flakeFolder: The flake folder.
         :type flakeFolder: str
         """
-        self.process_template(
+        await self.process_template(
             flakeFolder,
             "PyprojecttomlTemplate",
-            Path(self.templates_folder()) / self.template_subfolder,
+            Path(self.templates_folder) / self.template_subfolder,
             "root",
             "pyprojecttoml.template",
         )
 
-    def git_add_files(self, gitAdd):
+    def template_jobs(self) -> List[Tuple[str, str, str, str]]:
+        """
+        Retrieves the templates generate_files processes, so they can be rendered elsewhere.
+        :return: The (group name, template folder, root template, output file name) of each file.
+        :rtype: List[Tuple[str, str, str, str]]
+        """
+        return super().template_jobs() + [
+            (
+                "PyprojecttomlTemplate",
+                str(Path(self.templates_folder) / self.template_subfolder),
+                "root",
+                "pyprojecttoml.template",
+            )
+        ]
+
+    async def git_add_files(self, gitAdd):
         """
         Adds the generated files to git.
         :param gitAdd: The GitAdd instance.
-        :type gitAdd: pythoneda.shared.git.GitAdd
+        :type gitAdd: pythoneda.shared.nix.flake.NixFlakeGitAdd
         """
-        self.git_add_flake(gitAdd)
-        self.git_add_pyprojecttoml_template(gitAdd)
+        await self.git_add_flake(gitAdd)
+        await self.git_add_pyprojecttoml_template(gitAdd)
 
-    def git_add_pyprojecttoml_template(self, gitAdd):
+    async def git_add_pyprojecttoml_template(self, gitAdd):
         """
         Adds the generated pyprojecttoml.template file to git.
         :param gitAdd: The GitAdd instance.
-        :type gitAdd: pythoneda.shared.git.GitAdd
+        :type gitAdd: pythoneda.shared.nix.flake.NixFlakeGitAdd
         """
-        gitAdd.add("pyprojecttoml.template")
+        await gitAdd.add("pyprojecttoml.template")
 
 
 # vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
@@ -0,0 +1,178 @@
+# vim: set fileencoding=utf-8
+"""
+pythoneda/shared/nix/flake/string_template_group_cache.py
+
+This file defines the StringTemplateGroupCache class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import hashlib
+import io
+import os
+from pathlib import Path
+from pythoneda.shared import BaseObject
+from stringtemplate3 import StringTemplateGroup
+import threading
+from typing import Dict, Tuple
+
+
+class StringTemplateGroupCache(BaseObject):
+    """
+    Process-wide cache of parsed StringTemplate groups.
+
+    Class name: StringTemplateGroupCache
+
+    Responsibilities:
+        - Parse each .stg file only once per process, as long as it doesn't change.
+        - Detect changes in the .stg files, using their mtime and size, and their content hash as fallback.
+        - Allow explicit invalidation.
+        - Keep track of hits and misses.
+
+    Collaborators:
+        - stringtemplate3.StringTemplateGroup
+    """
+
+    _singleton = None
+
+    def __init__(self):
+        """
+        Creates a new StringTemplateGroupCache instance.
+        """
+        super().__init__()
+        self._entries: Dict[Tuple[str, str], Tuple] = {}
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+
+    @classmethod
+    def instance(cls):
+        """
+        Retrieves the process-wide instance.
+        :return: Such instance.
+        :rtype: pythoneda.shared.nix.flake.StringTemplateGroupCache
+        """
+        if cls._singleton is None:
+            cls._singleton = cls()
+        return cls._singleton
+
+    @property
+    def hits(self) -> int:
+        """
+        Retrieves the number of lookups served from the cache.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """
+        Retrieves the number of lookups that required parsing the group.
+        :return: Such number.
+        :rtype: int
+        """
+        return self._misses
+
+    def _key(self, templateFolder: str, groupName: str) -> Tuple[str, str]:
+        """
+        Builds the cache key for given group.
+        :param templateFolder: The folder with the templates.
+        :type templateFolder: str
+        :param groupName: The name of the stringtemplate group.
+        :type groupName: str
+        :return: The key.
+        :rtype: Tuple[str, str]
+        """
+        return (os.path.abspath(str(templateFolder)), groupName)
+
+    def get(self, templateFolder: str, groupName: str) -> StringTemplateGroup:
+        """
+        Retrieves the group for given template folder and name, parsing it only if needed.
+        :param templateFolder: The folder with the templates.
+        :type templateFolder: str
+        :param groupName: The name of the stringtemplate group.
+        :type groupName: str
+        :return: The group.
+        :rtype: stringtemplate3.StringTemplateGroup
+        """
+        result = None
+        key = self._key(templateFolder, groupName)
+        stg_file = Path(key[0]) / f"{groupName}.stg"
+        stat = os.stat(stg_file)
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if (
+                entry is not None
+                and entry[0] == stat.st_mtime_ns
+                and entry[1] == stat.st_size
+            ):
+                result = entry[3]
+            else:
+                with open(stg_file, "r", encoding="utf-8") as f:
+                    content = f.read()
+                digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                if entry is not None and entry[2] == digest:
+                    # touched, but not modified
+                    result = entry[3]
+                else:
+                    result = StringTemplateGroup(
+                        name=groupName, file=io.StringIO(content), rootDir=key[0]
+                    )
+                    StringTemplateGroupCache.logger().debug(f"Parsed {stg_file}")
+                self._entries[key] = (stat.st_mtime_ns, stat.st_size, digest, result)
+
+            if entry is not None and entry[3] is result:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        return result
+
+    def invalidate(self, templateFolder: str = None, groupName: str = None):
+        """
+        Discards cached groups. With no arguments, the whole cache is cleared.
+        :param templateFolder: The folder with the templates, or None to match any folder.
+        :type templateFolder: str
+        :param groupName: The name of the stringtemplate group, or None to match any group.
+        :type groupName: str
+        """
+        folder = None
+        if templateFolder is not None:
+            folder = os.path.abspath(str(templateFolder))
+        with self._lock:
+            for key in list(self._entries.keys()):
+                if (folder is None or key[0] == folder) and (
+                    groupName is None or key[1] == groupName
+                ):
+                    del self._entries[key]
+
+    def reset_stats(self):
+        """
+        Resets the hit and miss counters.
+        """
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,80 @@
+# vim: set fileencoding=utf-8
+"""
+tests/flake_fixtures.py
+
+This file defines the helpers the tests use to build flakes.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared.nix.flake import NixFlake, NixFlakeRenderer
+import pythoneda.shared.nix.flake.licenses  # registers the License subclasses
+from typing import List
+
+
+def flake(name: str, inputs: List = None, version: str = "1.0") -> NixFlake:
+    """
+    Builds a flake hosted on GitHub, using the pythoneda templates.
+    :param name: The name of the flake, and of its repository.
+    :type name: str
+    :param inputs: Its inputs, as flakes.
+    :type inputs: List[pythoneda.shared.nix.flake.NixFlake]
+    :param version: Its version.
+    :type version: str
+    :return: The flake.
+    :rtype: pythoneda.shared.nix.flake.NixFlake
+    """
+    return NixFlake(
+        name,
+        version,
+        f"github:o/{name}/{{version}}",
+        inputs or [],
+        "pythoneda",
+        f"The {name} flake",
+        f"https://github.com/o/{name}",
+        "GPL-3.0-or-later",
+        ["o"],
+        2024,
+        "o",
+    )
+
+
+def render(target, snapshot=None) -> str:
+    """
+    Renders the flake.nix file of given flake, in this process.
+    :param target: The flake.
+    :type target: pythoneda.shared.nix.flake.NixFlake
+    :param snapshot: A snapshot of the flake to render instead, if any.
+    :type snapshot: pythoneda.shared.nix.flake.NixFlakeSnapshot
+    :return: The rendered file.
+    :rtype: str
+    """
+    group_name, template_folder, root_template, _ = target.template_jobs()[0]
+    return NixFlakeRenderer.render_template(
+        target if snapshot is None else snapshot,
+        group_name,
+        template_folder,
+        root_template,
+    )
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,98 @@
+# vim: set fileencoding=utf-8
+"""
+tests/lock_fixtures.py
+
+This file defines the helpers the tests use to build flake.lock contents.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from pythoneda.shared.nix.flake import NixFlakeMetadata
+
+
+def github_node(
+    repo: str,
+    inputs: dict = None,
+    ref: str = None,
+    rev: str = None,
+    lastModified: int = 1,
+    owner: str = "o",
+) -> dict:
+    """
+    Builds a lock node for a GitHub input.
+    :param repo: The repository name.
+    :type repo: str
+    :param inputs: The inputs of the node, if any.
+    :type inputs: dict
+    :param ref: The ref in flake.nix, if any.
+    :type ref: str
+    :param rev: The locked revision, or None to use the repository name.
+    :type rev: str
+    :param lastModified: The timestamp of the locked revision.
+    :type lastModified: int
+    :param owner: The repository owner.
+    :type owner: str
+    :return: The node.
+    :rtype: dict
+    """
+    rev = rev or repo
+    result = {
+        "locked": {
+            "lastModified": lastModified,
+            "narHash": f"sha256-{rev}",
+            "owner": owner,
+            "repo": repo,
+            "rev": rev,
+            "type": "github",
+        },
+        "original": {"owner": owner, "repo": repo, "type": "github"},
+    }
+    if ref is not None:
+        result["original"]["ref"] = ref
+    if inputs is not None:
+        result["inputs"] = inputs
+    return result
+
+
+def lock(nodes: dict) -> dict:
+    """
+    Builds the contents of a flake.lock file.
+    :param nodes: The nodes, including "root".
+    :type nodes: dict
+    :return: The contents.
+    :rtype: dict
+    """
+    return {"nodes": nodes, "root": "root", "version": 7}
+
+
+def metadata(nodes: dict) -> NixFlakeMetadata:
+    """
+    Builds the metadata of a flake with given lock nodes.
+    :param nodes: The nodes, including "root".
+    :type nodes: dict
+    :return: The metadata.
+    :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+    return NixFlakeMetadata({"locks": lock(nodes)}, "/tmp/flake")
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,225 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_flake_nix_editor.py
+
+This file tests the FlakeNixEditor class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+from pythoneda.shared.nix.flake import FlakeNixEditFailed, FlakeNixEditor
+import tempfile
+import unittest
+
+FLAKE_NIX = r"""# flake.nix
+{
+  description = "A \"quoted\" flake";
+  inputs = rec {
+    flake-utils.url = "github:numtide/flake-utils/v1.0.0";
+    nixos.url = "github:NixOS/nixpkgs/23.11";
+    pythoneda-shared-banner = {
+      inputs.flake-utils.follows = "flake-utils";
+      inputs.nixos.follows = "nixos";
+      url = "github:pythoneda-shared-pythonlang-def/banner/0.0.47";
+    };
+    other = { url = "git+https://example.org/x.git?ref=v1&dir=y"; };
+  };
+  outputs = inputs:
+    with inputs;
+    flake-utils.lib.eachDefaultSystem (system:
+      let
+        org = "pythoneda-shared-pythonlang";
+        repo = "domain";
+        version = "0.0.30";
+        sha256 = "0000000000000000000000000000000000000000000000000000";
+        pkgs = import nixos { inherit system; };
+        shared = import "${pythoneda-shared-banner}/nix/shared.nix";
+        script = ''
+          echo "sha256 = ${version}" ''${x}
+        '';
+        sources.nixos = pkgs.fetchFromGitHub {
+          owner = "NixOS";
+          repo = "nixpkgs";
+          rev = version;
+          sha256 = "1111111111111111111111111111111111111111111111111111";
+        };
+      in rec {
+        packages.${system}.x = 1;
+        defaultPackage = packages.default;
+      });
+}
+"""
+
+
+class FlakeNixEditorTest(unittest.TestCase):
+    """
+    Tests FlakeNixEditor.
+    """
+
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._folder.name, "flake.nix")
+        self.write(FLAKE_NIX)
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def write(self, contents: str):
+        with open(self._path, "w", encoding="utf-8") as file:
+            file.write(contents)
+
+    def read(self) -> str:
+        with open(self._path, "r", encoding="utf-8") as file:
+            return file.read()
+
+    def test_render_without_edits_keeps_the_file(self):
+        editor = FlakeNixEditor(self._path)
+        self.assertEqual(editor.render(), FLAKE_NIX)
+        self.assertFalse(editor.save())
+        self.assertEqual(self.read(), FLAKE_NIX)
+
+    def test_tokenize(self):
+        text = (
+            "x = ''a ''${b} ${c}''; # y = \"comment\";\n"
+            'y = "d${ "e" }f"; /* "no" */ z.w == true;'
+        )
+        tokens = [
+            (kind, text[start:end])
+            for kind, start, end in FlakeNixEditor.tokenize(text)
+        ]
+        self.assertEqual(
+            tokens,
+            [
+                ("ident", "x"),
+                ("op", "="),
+                ("string", "''a ''${b} ${c}''"),
+                ("op", ";"),
+                ("ident", "y"),
+                ("op", "="),
+                ("string", '"d${ "e" }f"'),
+                ("op", ";"),
+                ("ident", "z"),
+                ("op", "."),
+                ("ident", "w"),
+                ("op", "=="),
+                ("ident", "true"),
+                ("op", ";"),
+            ],
+        )
+
+    def test_both_input_forms_resolve(self):
+        editor = FlakeNixEditor(self._path)
+        self.assertEqual(
+            editor.input_names,
+            ["flake-utils", "nixos", "pythoneda-shared-banner", "other"],
+        )
+        self.assertEqual(editor.url("nixos"), "github:NixOS/nixpkgs/23.11")
+        self.assertEqual(
+            editor.url("pythoneda-shared-banner"),
+            "github:pythoneda-shared-pythonlang-def/banner/0.0.47",
+        )
+        self.assertEqual(
+            editor.url("other"), "git+https://example.org/x.git?ref=v1&dir=y"
+        )
+        self.assertIsNone(editor.url("missing"))
+        self.assertEqual(editor.version(), "0.0.30")
+        self.assertEqual(editor.sha256(), "0" * 52)
+
+    def test_set_version(self):
+        editor = FlakeNixEditor(self._path)
+        self.assertEqual(editor.version("pythoneda-shared-banner"), "0.0.47")
+        self.assertEqual(editor.version("other"), "v1")
+        editor.set_version("pythoneda-shared-banner", "0.0.48")
+        editor.set_version("other", "v2")
+        self.assertEqual(editor.pending_edits, 2)
+        self.assertTrue(editor.save())
+        self.assertEqual(editor.version("pythoneda-shared-banner"), "0.0.48")
+        self.assertEqual(
+            editor.url("other"), "git+https://example.org/x.git?ref=v2&dir=y"
+        )
+
+    def test_several_edits_in_one_save(self):
+        editor = FlakeNixEditor(self._path)
+        editor.set_version(None, "0.0.31")
+        editor.set_sha256("2" * 52)
+        editor.set_version("nixos", "24.05")
+        editor.set_url("flake-utils", "github:numtide/flake-utils/v1.0.1")
+        self.assertTrue(editor.save())
+        self.assertEqual(editor.pending_edits, 0)
+        # the flake's sha256 is every one outside inputs, as update_sha256 always did
+        expected = (
+            FLAKE_NIX.replace('"0.0.30"', '"0.0.31"')
+            .replace("0" * 52, "2" * 52)
+            .replace("1" * 52, "2" * 52)
+            .replace("nixpkgs/23.11", "nixpkgs/24.05")
+            .replace("flake-utils/v1.0.0", "flake-utils/v1.0.1")
+        )
+        self.assertEqual(self.read(), expected)
+        self.assertEqual(FlakeNixEditor(self._path).render(), expected)
+
+    def test_missing_attribute(self):
+        editor = FlakeNixEditor(self._path)
+        with self.assertRaises(FlakeNixEditFailed) as context:
+            editor.set_url("missing", "github:o/missing/1.0")
+        self.assertEqual(
+            str(context.exception),
+            f"Cannot edit {self._path}: input missing has no url",
+        )
+        with self.assertRaises(FlakeNixEditFailed):
+            editor.set_version("missing", "1.0")
+        self.assertEqual(editor.pending_edits, 0)
+        self.assertFalse(editor.save())
+        self.assertEqual(self.read(), FLAKE_NIX)
+
+    def test_input_edits_only_hit_the_input(self):
+        editor = FlakeNixEditor(self._path)
+        self.assertIsNone(editor.sha256("nixos"))
+        with self.assertRaises(FlakeNixEditFailed):
+            editor.set_sha256("2" * 52, "nixos")
+        with self.assertRaises(FlakeNixEditFailed):
+            editor.set_sha256("2" * 52, "pythoneda-shared-banner")
+        self.assertEqual(editor.pending_edits, 0)
+
+    def test_escapes_follow_nix_rules(self):
+        self.write(
+            r"""{
+  inputs.a.url = "path:/x\ty\n\\z\$w\"v";
+  inputs.b.url = ''path:/x''\ty'''z''$w''\qv'';
+}
+"""
+        )
+        editor = FlakeNixEditor(self._path)
+        self.assertEqual(editor.url("a"), 'path:/x\ty\n\\z$w"v')
+        self.assertEqual(editor.url("b"), "path:/x\ty''z$wqv")
+
+        editor.set_url("a", 'path:/new\tline\n"${x}"')
+        editor.save()
+        self.assertIn(r'inputs.a.url = "path:/new\tline\n\"\${x}\"";', self.read())
+        self.assertEqual(editor.url("a"), 'path:/new\tline\n"${x}"')
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
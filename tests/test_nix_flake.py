@@ -0,0 +1,75 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake.py
+
+This file tests the NixFlake class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from flake_fixtures import flake
+from pythoneda.shared.nix.flake import NixFlake
+import unittest
+
+
+class NixFlakeTest(unittest.TestCase):
+    """
+    Tests NixFlake.
+    """
+
+    def test_inputs_follow_changes(self):
+        target = flake("demo", [flake("nixos"), flake("foo")])
+        before = target.inputs
+        self.assertEqual([aux.name for aux in before], ["nixos", "foo"])
+        with self.assertRaises(AttributeError):
+            before.append(flake("bar").to_input())
+
+        self.assertTrue(target.add_input(flake("bar").to_input()))
+        self.assertTrue(target.remove_input(target.get_input("nixos")))
+        self.assertEqual([aux.name for aux in target.inputs], ["foo", "bar"])
+        self.assertEqual([aux.name for aux in before], ["nixos", "foo"])
+        self.assertIs(target.inputs, target.inputs)
+
+    def test_dag_serialization_round_trips(self):
+        nixpkgs = flake("nixpkgs")
+        banner = flake("banner", [nixpkgs])
+        target = flake("app", [nixpkgs, banner, flake("domain", [nixpkgs, banner])])
+
+        data = target.to_dag_dict()
+        self.assertEqual(
+            [aux["name"] for aux in data["inputs"]["nodes"]],
+            ["nixpkgs", "banner", "domain"],
+        )
+        restored = NixFlake.from_dag_dict(data)
+        self.assertEqual(restored.to_dag_dict(), data)
+        self.assertEqual(restored.to_dict(), target.to_dict())
+        domain = restored.get_input("domain")
+        self.assertIs(domain.inputs[0], restored.get_input("nixpkgs"))
+        self.assertIs(domain.inputs[1], restored.get_input("banner"))
+        self.assertEqual([aux.name for aux in domain.follows], ["nixpkgs", "banner"])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
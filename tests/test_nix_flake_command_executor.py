@@ -0,0 +1,133 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_command_executor.py
+
+This file tests the streaming of commands through NixFlakeCommandExecutor and its subclasses.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from flake_fixtures import flake
+from pythoneda.shared.nix.flake import (
+    NixFlakeCommandExecutor,
+    NixFlakeRecordingCommandExecutor,
+    NixFlakeReplayCommandExecutor,
+)
+import sys
+import unittest
+
+SCRIPT = ["sh", "-c", "echo one; echo two >&2; echo three; exit 3"]
+
+
+async def collect(items, limit: int = None) -> list:
+    """
+    Consumes an asynchronous iterator, closing it after limit items, if given.
+    """
+    result = []
+    try:
+        async for item in items:
+            result.append(item)
+            if limit is not None and len(result) == limit:
+                break
+    finally:
+        await items.aclose()
+    return result
+
+
+class NixFlakeCommandExecutorTest(unittest.TestCase):
+    """
+    Tests the streaming of commands.
+    """
+
+    def test_stream(self):
+        items = asyncio.run(collect(NixFlakeCommandExecutor().stream(SCRIPT)))
+        self.assertEqual(items[-1], ("exit", 3))
+        self.assertEqual(
+            [aux for aux in items if aux[0] == "stdout"],
+            [("stdout", "one"), ("stdout", "three")],
+        )
+        self.assertEqual(
+            [aux for aux in items if aux[0] == "stderr"], [("stderr", "two")]
+        )
+
+    def test_long_lines_are_split(self):
+        script = [sys.executable, "-c", "print('x' * 3000000); print('end')"]
+        items = asyncio.run(collect(NixFlakeCommandExecutor().stream(script)))
+        lines = [line for source, line in items if source == "stdout"]
+        self.assertGreater(len(lines), 2)
+        self.assertEqual("".join(lines[:-1]), "x" * 3000000)
+        self.assertEqual(lines[-1], "end")
+
+    def test_closing_kills_the_command(self):
+        script = ["sh", "-c", "while true; do echo y; done"]
+        items = asyncio.run(
+            asyncio.wait_for(
+                collect(NixFlakeCommandExecutor().stream(script, maxQueuedLines=4), 10),
+                30,
+            )
+        )
+        self.assertEqual(items, [("stdout", "y")] * 10)
+
+    def test_recorded_streams_replay(self):
+        recorder = NixFlakeRecordingCommandExecutor()
+        recorded = asyncio.run(collect(recorder.stream(SCRIPT)))
+        (recording,) = recorder.recordings
+        self.assertEqual(recording["returncode"], 3)
+        self.assertEqual(recording["stdout"], "one\nthree")
+        self.assertEqual(recording["stderr"], "two")
+
+        replay = NixFlakeReplayCommandExecutor(recorder.recordings, latency=0)
+        replayed = asyncio.run(collect(replay.stream(SCRIPT)))
+        self.assertEqual(sorted(replayed), sorted(recorded))
+        self.assertEqual(replayed[-1], ("exit", 3))
+        self.assertEqual(asyncio.run(replay.execute(SCRIPT)), (3, "one\nthree", "two"))
+
+    def test_flake_streams_use_the_executor(self):
+        replay = NixFlakeReplayCommandExecutor(
+            [
+                {
+                    "args": ["command", "nix", "run", "."],
+                    "returncode": 2,
+                    "stdout": "a\nb\n",
+                    "stderr": "boom",
+                }
+            ],
+            latency=0,
+            strict=True,
+        )
+        target = flake("demo")
+        target.executor = replay
+        stream = target.run_stream(usePool=False)
+        self.assertEqual(
+            asyncio.run(collect(stream.__aiter__())),
+            [("stdout", "a"), ("stdout", "b"), ("stderr", "boom")],
+        )
+        self.assertEqual(stream.returncode, 2)
+        self.assertEqual(stream.retained_output, "a\nb")
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,98 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_follows_optimizer.py
+
+This file tests the NixFlakeFollowsOptimizer class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from lock_fixtures import github_node, metadata
+import unittest
+
+
+NESTED = {
+    "a": github_node("a", {"c": "c", "nixpkgs": "nixpkgs_2"}),
+    "c": github_node("c", {"nixpkgs": "nixpkgs_3"}),
+    "nixpkgs": github_node("nixpkgs"),
+    "nixpkgs_2": github_node("nixpkgs"),
+    "nixpkgs_3": github_node("nixpkgs"),
+    "root": {"inputs": {"a": "a", "nixpkgs": "nixpkgs"}},
+}
+
+
+class NixFlakeFollowsOptimizerTest(unittest.TestCase):
+    """
+    Tests NixFlakeFollowsOptimizer.
+    """
+
+    def declarations(self, optimization) -> list:
+        return [
+            (aux.input_name, aux.attribute_path, aux.follows)
+            for aux in optimization.declarations
+        ]
+
+    def test_existing_follows_are_not_overridden(self):
+        optimization = metadata(
+            {
+                "a": github_node("a", {"b": ["b"], "nixpkgs": "nixpkgs_2"}),
+                "b": github_node("b", {"nixpkgs": "nixpkgs_3"}),
+                "nixpkgs": github_node("nixpkgs"),
+                "nixpkgs_2": github_node("nixpkgs"),
+                "nixpkgs_3": github_node("nixpkgs"),
+                "root": {"inputs": {"a": "a", "b": "b", "nixpkgs": "nixpkgs"}},
+            }
+        ).optimize_follows()
+        self.assertEqual(
+            self.declarations(optimization),
+            [("a", "nixpkgs", "nixpkgs"), ("b", "nixpkgs", "nixpkgs")],
+        )
+
+    def test_max_depth(self):
+        self.assertEqual(
+            self.declarations(metadata(NESTED).optimize_follows(maxDepth=1)), []
+        )
+        self.assertEqual(
+            self.declarations(metadata(NESTED).optimize_follows(maxDepth=2)),
+            [("a", "nixpkgs", "nixpkgs")],
+        )
+        self.assertEqual(
+            self.declarations(metadata(NESTED).optimize_follows(maxDepth=3)),
+            [("a", "c.inputs.nixpkgs", "nixpkgs"), ("a", "nixpkgs", "nixpkgs")],
+        )
+
+    def test_fetched_after(self):
+        optimization = metadata(NESTED).optimize_follows(maxDepth=2)
+        self.assertEqual(optimization.fetched_before, 5)
+        self.assertEqual(optimization.fetched_after, 4)
+        self.assertEqual(optimization.removed_nodes, ["nixpkgs_2"])
+        optimization = metadata(NESTED).optimize_follows(maxDepth=3)
+        self.assertEqual(optimization.fetched_after, 3)
+        self.assertEqual(optimization.removed_nodes, ["nixpkgs_2", "nixpkgs_3"])
+        self.assertAlmostEqual(optimization.fetch_reduction, 0.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
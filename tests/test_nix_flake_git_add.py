@@ -0,0 +1,94 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_git_add.py
+
+This file tests the NixFlakeGitAdd class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+import os
+from pythoneda.shared.nix.flake import NixFlakeCommandExecutor, NixFlakeGitAdd
+import tempfile
+import unittest
+
+
+class RecordingGitExecutor(NixFlakeCommandExecutor):
+    """
+    Records the files added to git instead of running git.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.added = []
+
+    async def git_add(self, folder: str, file: str):
+        self.added.append((folder, file))
+
+
+class NixFlakeGitAddTest(unittest.TestCase):
+    """
+    Tests NixFlakeGitAdd.
+    """
+
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self._executor = RecordingGitExecutor()
+        self._git_add = NixFlakeGitAdd(self._folder.name, self._executor)
+
+    def tearDown(self):
+        NixFlakeGitAdd.forget(self._folder.name)
+        self._folder.cleanup()
+
+    def write(self, contents: str):
+        with open(os.path.join(self._folder.name, "flake.nix"), "w") as file:
+            file.write(contents)
+
+    def test_unchanged_files_are_added_once(self):
+        self.write("{ }\n")
+        asyncio.run(self._git_add.add("flake.nix"))
+        asyncio.run(self._git_add.add("flake.nix"))
+        self.assertEqual(self._executor.added, [(self._folder.name, "flake.nix")])
+
+        self.write("{ x = 1; }\n")
+        asyncio.run(self._git_add.add("flake.nix"))
+        self.assertEqual(len(self._executor.added), 2)
+
+    def test_forget(self):
+        self.write("{ }\n")
+        asyncio.run(self._git_add.add("flake.nix"))
+        NixFlakeGitAdd.forget(self._folder.name)
+        asyncio.run(self._git_add.add("flake.nix"))
+        self.assertEqual(len(self._executor.added), 2)
+
+    def test_missing_files_are_always_added(self):
+        asyncio.run(self._git_add.add("missing.nix"))
+        asyncio.run(self._git_add.add("missing.nix"))
+        self.assertEqual(len(self._executor.added), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
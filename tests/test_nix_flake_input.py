@@ -0,0 +1,106 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_input.py
+
+This file tests the NixFlakeInput class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from flake_fixtures import flake, render
+import json
+from lock_fixtures import github_node, metadata
+from pythoneda.shared.nix.flake import NixFlakeInput
+import unittest
+
+
+class NixFlakeInputTest(unittest.TestCase):
+    """
+    Tests NixFlakeInput.
+    """
+
+    def test_override_replaces_the_follows_of_the_same_input(self):
+        optimization = metadata(
+            {
+                "foo": github_node("foo", {"nixpkgs": "nixpkgs_2"}),
+                "nixos": github_node("nixpkgs"),
+                "nixpkgs": github_node("nixpkgs"),
+                "nixpkgs_2": github_node("nixpkgs"),
+                "root": {
+                    "inputs": {"nixos": "nixos", "nixpkgs": "nixpkgs", "foo": "foo"}
+                },
+            }
+        ).optimize_follows()
+        self.assertEqual(
+            [
+                (aux.input_name, aux.attribute_path, aux.follows)
+                for aux in optimization.declarations
+            ],
+            [("foo", "nixpkgs", "nixos")],
+        )
+        demo = flake(
+            "demo",
+            [flake("nixos"), flake("nixpkgs"), flake("foo", [flake("nixpkgs")])],
+        )
+        demo.apply_follows(optimization)
+
+        foo = demo.get_input("foo")
+        self.assertEqual(foo.follows, [])
+        content = render(demo)
+        self.assertEqual(content.count("inputs.nixpkgs.follows"), 1)
+        self.assertIn('inputs.nixpkgs.follows = "nixos";', content)
+
+    def test_inputs_named_as_the_flakes_are_followed(self):
+        demo = flake("demo", [flake("nixpkgs"), flake("foo", [flake("nixpkgs")])])
+        self.assertEqual(
+            [aux.name for aux in demo.get_input("foo").follows], ["nixpkgs"]
+        )
+        self.assertIn('inputs.nixpkgs.follows = "nixpkgs";', render(demo))
+
+    def test_dag_serialization_round_trips(self):
+        # each layer depends on both inputs of the next one: 2^20 paths, 40 inputs
+        layer = [NixFlakeInput("base", "1.0", "github:o/base/{version}")]
+        for depth in range(20):
+            layer = [
+                NixFlakeInput(
+                    f"{side}-{depth}", "1.0", f"github:o/{side}/{{version}}", layer
+                )
+                for side in ("left", "right")
+            ]
+        top = NixFlakeInput("top", "1.0", "github:o/top/{version}", layer)
+
+        data = top.to_dag_dict()
+        self.assertEqual(len(data["inputs"]["nodes"]), 41)
+        restored = NixFlakeInput.from_dag_dict(json.loads(json.dumps(data)))
+        self.assertEqual(restored.to_dag_dict(), data)
+
+        left, right = restored.inputs
+        self.assertEqual((left.name, right.name), ("left-19", "right-19"))
+        self.assertIs(left.inputs[0], right.inputs[0])
+        self.assertIs(left.inputs[1], right.inputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
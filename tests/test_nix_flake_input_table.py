@@ -0,0 +1,75 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_input_table.py
+
+This file tests the NixFlakeInputTable class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import gc
+from lock_fixtures import github_node, lock, metadata
+from pythoneda.shared.nix.flake import NixFlakeInputTable
+import unittest
+
+
+NODES = {
+    "a": github_node("a", {"local": "local", "nixpkgs": "nixpkgs"}),
+    "local": {"locked": {"path": "/tmp/local", "type": "path"}},
+    "nixpkgs": github_node("nixpkgs", ref="23.11"),
+    "root": {"inputs": {"a": "a", "local": "local", "nixpkgs": "nixpkgs"}},
+}
+
+
+class NixFlakeInputTableTest(unittest.TestCase):
+    """
+    Tests NixFlakeInputTable.
+    """
+
+    def test_only_github_nodes_are_inputs(self):
+        table = NixFlakeInputTable.from_lock(lock(NODES))
+        self.assertEqual(len(table), 2)
+        self.assertEqual(list(table.names()), ["a", "nixpkgs"])
+        self.assertEqual(table.root_names(), ["a", "nixpkgs"])
+        self.assertNotIn("local", table)
+        self.assertNotIn("root", table)
+        self.assertIsNone(table.input("local"))
+        self.assertEqual(table.input_names("a"), ["nixpkgs"])
+        index = table.index_of("nixpkgs")
+        self.assertEqual(table.version(index), "23.11")
+        self.assertEqual(table.url_template(index), "github:o/nixpkgs/{version}")
+
+    def test_metadata_does_not_keep_inputs_alive(self):
+        flake = metadata(NODES)
+        a = flake._to_input("a")
+        self.assertIs(flake._to_input("a"), a)
+        self.assertIs(a.inputs[0], flake._to_input("nixpkgs"))
+        del a
+        gc.collect()
+        self.assertEqual(len(flake.input_table()._materialized), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
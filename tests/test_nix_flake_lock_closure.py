@@ -0,0 +1,138 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_lock_closure.py
+
+This file tests the NixFlakeLockClosure class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from collections import deque
+from lock_fixtures import github_node, lock
+from pythoneda.shared.nix.flake import NixFlakeLockClosure, NixFlakeLockGraph
+import random
+import unittest
+
+DIAMOND = {
+    "a": github_node("a", {"b": "b", "c": "c"}),
+    "b": github_node("b", {"d": "d"}),
+    "c": github_node("c", {"d": "d"}),
+    "d": github_node("d", {"e": "e"}),
+    "e": github_node("e"),
+    "root": {"inputs": {"a": "a", "c": "c"}},
+}
+
+CYCLIC = {
+    "a": github_node("a", {"b": "b"}),
+    "b": github_node("b", {"c": "c"}),
+    "c": github_node("c", {"a": "a", "d": "d"}),
+    "d": github_node("d", {"d": "d"}),
+    "e": github_node("e", {"a": "a"}),
+    "root": {"inputs": {"a": "a", "e": "e"}},
+}
+
+
+def random_nodes(count: int, seed: int) -> dict:
+    """
+    Builds the nodes of a random lock graph, cycles included.
+    """
+    rng = random.Random(seed)
+    names = [f"n{index}" for index in range(count)]
+    result = {
+        name: github_node(
+            name, {target: target for target in rng.sample(names, rng.randint(0, 3))}
+        )
+        for name in names
+    }
+    result["root"] = {"inputs": {name: name for name in rng.sample(names, 3)}}
+    return result
+
+
+class NixFlakeLockClosureTest(unittest.TestCase):
+    """
+    Tests NixFlakeLockClosure.
+    """
+
+    def bfs(self, graph: NixFlakeLockGraph, start: int, neighbours) -> int:
+        """
+        Retrieves the nodes reachable from given one through at least one edge.
+        """
+        result = 0
+        pending = deque(neighbours(start))
+        while pending:
+            current = pending.popleft()
+            if not (result >> current) & 1:
+                result |= 1 << current
+                pending.extend(neighbours(current))
+        return result
+
+    def assert_matches_bfs(self, nodes: dict):
+        graph = NixFlakeLockGraph.from_lock(lock(nodes))
+        closure = NixFlakeLockClosure(graph)
+        for index in range(len(graph)):
+            descendants = self.bfs(graph, index, graph.successors)
+            ancestors = self.bfs(graph, index, graph.predecessors)
+            self.assertEqual(closure.descendants(index), descendants, graph.name(index))
+            self.assertEqual(closure.ancestors(index), ancestors, graph.name(index))
+            for target in range(len(graph)):
+                self.assertEqual(
+                    closure.reaches(index, target), bool((descendants >> target) & 1)
+                )
+                for path in closure.paths(index, target):
+                    self.assertEqual((path[0], path[-1]), (index, target))
+                    self.assertEqual(len(set(path)), len(path))
+                    for source, successor in zip(path, path[1:]):
+                        self.assertIn(successor, graph.successors(source))
+
+    def test_diamond(self):
+        self.assert_matches_bfs(DIAMOND)
+        graph = NixFlakeLockGraph.from_lock(lock(DIAMOND))
+        closure = NixFlakeLockClosure(graph)
+        a, d, e = (graph.index_of(name) for name in "ade")
+        self.assertEqual(
+            [[graph.name(aux) for aux in path] for path in closure.paths(a, e)],
+            [["a", "b", "d", "e"], ["a", "c", "d", "e"]],
+        )
+        self.assertEqual(
+            [graph.name(aux) for aux in closure.ids(closure.root_inputs_reaching(d))],
+            ["a", "c"],
+        )
+
+    def test_cycles(self):
+        self.assert_matches_bfs(CYCLIC)
+        graph = NixFlakeLockGraph.from_lock(lock(CYCLIC))
+        closure = NixFlakeLockClosure(graph)
+        a, d = graph.index_of("a"), graph.index_of("d")
+        self.assertTrue(closure.reaches(a, a))
+        self.assertTrue(closure.reaches(d, d))
+        self.assertFalse(closure.reaches(d, a))
+
+    def test_random_graphs(self):
+        for seed in range(5):
+            self.assert_matches_bfs(random_nodes(40, seed))
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,129 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_lock_graph.py
+
+This file tests the NixFlakeLockGraph class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from lock_fixtures import github_node, lock, metadata
+from pythoneda.shared.nix.flake import NixFlakeLockGraph
+import unittest
+
+
+NODES = {
+    "b": github_node("b", {"nixpkgs": "nixpkgs_3"}),
+    "dep": github_node(
+        "dep",
+        {"b": ["b"], "nixpkgs": ["b", "nixpkgs"], "utils": ["dep2", "utils"]},
+    ),
+    "nixpkgs": github_node("nixpkgs"),
+    "nixpkgs_2": github_node("nixpkgs"),
+    "nixpkgs_3": github_node("nixpkgs"),
+    "other": github_node("other", {"nixpkgs": ["nixpkgs"], "self": []}),
+    "root": {
+        "inputs": {
+            "b": "b",
+            "dep": "dep",
+            "nixpkgs": "nixpkgs_2",
+            "other": "other",
+        }
+    },
+}
+
+
+class NixFlakeLockGraphTest(unittest.TestCase):
+    """
+    Tests NixFlakeLockGraph.
+    """
+
+    def successors(self, graph: NixFlakeLockGraph, name: str) -> dict:
+        index = graph.index_of(name)
+        return {
+            key: (graph.name(target), follows)
+            for key, target, follows in zip(
+                graph.successor_keys(index),
+                graph.successors(index),
+                graph.successor_follows(index),
+            )
+        }
+
+    def test_root_inputs_link_to_their_nodes(self):
+        graph = NixFlakeLockGraph.from_lock(lock(NODES))
+        self.assertEqual(
+            self.successors(graph, "root"),
+            {
+                "b": ("b", 0),
+                "dep": ("dep", 0),
+                "nixpkgs": ("nixpkgs_2", 0),
+                "other": ("other", 0),
+            },
+        )
+
+    def test_follows_are_resolved_from_the_root(self):
+        graph = NixFlakeLockGraph.from_lock(lock(NODES))
+        self.assertEqual(
+            self.successors(graph, "dep"),
+            {"b": ("b", 1), "nixpkgs": ("nixpkgs_3", 1)},
+        )
+        self.assertEqual(self.successors(graph, "other"), {"nixpkgs": ("nixpkgs_2", 1)})
+
+    def test_unused_copies_are_not_reached(self):
+        graph = NixFlakeLockGraph.from_lock(lock(NODES))
+        self.assertEqual(graph.depth(graph.index_of("nixpkgs")), -1)
+        self.assertEqual(graph.depth(graph.index_of("nixpkgs_3")), 2)
+
+    def test_follows_chains(self):
+        graph = NixFlakeLockGraph.from_lock(
+            lock(
+                {
+                    "a": github_node("a", {"nixpkgs": ["b", "nixpkgs"]}),
+                    "b": github_node("b", {"nixpkgs": ["c", "nixpkgs"]}),
+                    "c": github_node("c", {"nixpkgs": "nixpkgs"}),
+                    "d": github_node("d", {"x": ["d", "x"]}),
+                    "nixpkgs": github_node("nixpkgs"),
+                    "root": {"inputs": {"a": "a", "b": "b", "c": "c", "d": "d"}},
+                }
+            )
+        )
+        self.assertEqual(self.successors(graph, "a"), {"nixpkgs": ("nixpkgs", 1)})
+        self.assertEqual(self.successors(graph, "d"), {})
+
+    def test_metadata_queries_use_resolved_follows(self):
+        flake = metadata(NODES)
+        self.assertEqual(
+            [aux.name for aux in flake.inputs()], ["b", "dep", "nixpkgs_2", "other"]
+        )
+        dep = flake.input_table().input("dep")
+        self.assertEqual([aux.name for aux in dep.inputs], ["b", "nixpkgs_3"])
+        nixpkgs_3 = flake.input_table().input("nixpkgs_3")
+        self.assertEqual(
+            [aux.name for aux in flake.inputs_pulling(nixpkgs_3)], ["b", "dep"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
@@ -0,0 +1,85 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_metadata_diff.py
+
+This file tests the NixFlakeMetadataDiff class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+from lock_fixtures import github_node, metadata
+import unittest
+
+
+def nixpkgs_update(nixpkgsRev: str, lastModified: int):
+    """
+    Builds the metadata of a flake depending on nixpkgs.
+    :param nixpkgsRev: The revision nixpkgs is locked to.
+    :type nixpkgsRev: str
+    :param lastModified: The timestamp of such revision.
+    :type lastModified: int
+    :return: The metadata.
+    :rtype: pythoneda.shared.nix.flake.NixFlakeMetadata
+    """
+    return metadata(
+        {
+            "nixpkgs": github_node(
+                "nixpkgs", ref="23.11", rev=nixpkgsRev, lastModified=lastModified
+            ),
+            "flake-utils": github_node("flake-utils", ref="v1.0.0", rev="abc"),
+            "root": {"inputs": {"flake-utils": "flake-utils", "nixpkgs": "nixpkgs"}},
+        }
+    )
+
+
+class NixFlakeMetadataDiffTest(unittest.TestCase):
+    """
+    Tests NixFlakeMetadataDiff.
+    """
+
+    def test_same_lock_is_empty(self):
+        diff = nixpkgs_update("aaa", 1).diff(nixpkgs_update("aaa", 1))
+        self.assertTrue(diff.is_empty)
+        self.assertEqual(diff.relocked, {})
+
+    def test_update_moving_only_the_locked_revision(self):
+        diff = nixpkgs_update("aaa", 1).diff(nixpkgs_update("bbb", 2))
+        self.assertFalse(diff.is_empty)
+        self.assertEqual([new.name for _, new in diff.changed], ["nixpkgs"])
+        self.assertEqual(
+            diff.relocked,
+            {
+                "nixpkgs": (
+                    {"rev": "aaa", "narHash": "sha256-aaa", "lastModified": 1},
+                    {"rev": "bbb", "narHash": "sha256-bbb", "lastModified": 2},
+                )
+            },
+        )
+        self.assertEqual(diff.added, [])
+        self.assertEqual(diff.removed, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
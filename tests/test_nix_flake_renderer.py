@@ -0,0 +1,120 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_renderer.py
+
+This file tests the NixFlakeRenderer class.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from flake_fixtures import flake, render
+import hashlib
+import os
+import pickle
+from pythoneda.shared.nix.flake import NixFlakeRenderer
+import tempfile
+import unittest
+
+
+def demo(name: str = "demo"):
+    """
+    Builds a flake with a diamond of inputs.
+    """
+    nixpkgs = flake("nixpkgs")
+    return flake(
+        name,
+        [
+            nixpkgs,
+            flake("banner", [nixpkgs]),
+            flake("domain", [nixpkgs, flake("banner", [nixpkgs])]),
+        ],
+    )
+
+
+class NixFlakeRendererTest(unittest.TestCase):
+    """
+    Tests NixFlakeRenderer.
+    """
+
+    def test_snapshots_render_like_flakes(self):
+        target = demo()
+        expected = render(target)
+        self.assertIn('inputs.nixpkgs.follows = "nixpkgs";', expected)
+        self.assertEqual(render(target, target.snapshot()), expected)
+        self.assertEqual(
+            render(target, pickle.loads(pickle.dumps(target.snapshot()))), expected
+        )
+
+    def test_render_many_matches_the_flakes(self):
+        flakes = [demo("one"), demo("two")]
+        renderer = NixFlakeRenderer(maxWorkers=2)
+        with tempfile.TemporaryDirectory() as folder:
+            folders = [os.path.join(folder, aux.name) for aux in flakes]
+            try:
+                digests = asyncio.run(renderer.render_many(flakes, folders))
+            finally:
+                renderer.close()
+            for target, output_folder, digest in zip(flakes, folders, digests):
+                with open(os.path.join(output_folder, "flake.nix"), "rb") as file:
+                    content = file.read()
+                self.assertEqual(content.decode("utf-8"), render(target))
+                self.assertEqual(
+                    digest, {"flake.nix": hashlib.sha256(content).hexdigest()}
+                )
+
+    def test_write_if_changed_skips_identical_content(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "flake.nix")
+            digest, changed = NixFlakeRenderer.write_if_changed(path, "{ }\n")
+            self.assertTrue(changed)
+            self.assertEqual(digest, hashlib.sha256(b"{ }\n").hexdigest())
+            os.utime(path, (0, 0))
+
+            self.assertEqual(
+                NixFlakeRenderer.write_if_changed(path, "{ }\n"), (digest, False)
+            )
+            self.assertEqual(os.stat(path).st_mtime, 0)
+
+            _, changed = NixFlakeRenderer.write_if_changed(path, "{ x = 1; }\n")
+            self.assertTrue(changed)
+            with open(path, "r", encoding="utf-8") as file:
+                self.assertEqual(file.read(), "{ x = 1; }\n")
+
+    def test_regenerate_files_reports_the_files_written(self):
+        target = demo()
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertEqual(
+                asyncio.run(target.regenerate_files(folder)), ["flake.nix"]
+            )
+            self.assertEqual(asyncio.run(target.regenerate_files(folder)), [])
+            target.add_input(flake("extra").to_input())
+            self.assertEqual(
+                asyncio.run(target.regenerate_files(folder)), ["flake.nix"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End:
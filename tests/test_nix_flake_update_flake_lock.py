@@ -0,0 +1,80 @@
+# vim: set fileencoding=utf-8
+"""
+tests/test_nix_flake_update_flake_lock.py
+
+This file tests NixFlake.update_flake_lock.
+
+Copyright (C) 2023-today rydnr's pythoneda-shared-nix-flake/shared
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import asyncio
+from pythoneda.shared.nix.flake import (
+    FlakeLockUpdateFailed,
+    NixFlake,
+    NixFlakeCommandExecutor,
+)
+import unittest
+
+
+class FailingExecutor(NixFlakeCommandExecutor):
+    """
+    Answers every command with an exit code and no output.
+    """
+
+    def __init__(self, returncode: int):
+        super().__init__()
+        self.returncode = returncode
+        self.commands = []
+
+    async def execute(self, args, cwd=None, env=None):
+        self.commands.append(args)
+        return self.returncode, "", ""
+
+
+class NixFlakeUpdateFlakeLockTest(unittest.TestCase):
+    """
+    Tests NixFlake.update_flake_lock.
+    """
+
+    def tearDown(self):
+        NixFlakeCommandExecutor.set_instance(None)
+
+    def test_a_silent_failure_raises(self):
+        NixFlakeCommandExecutor.set_instance(FailingExecutor(1))
+        with self.assertRaises(FlakeLockUpdateFailed) as context:
+            asyncio.run(NixFlake.update_flake_lock("/tmp/repo", "flake", ["nixos"]))
+        self.assertIn("exit code 1", str(context.exception))
+
+    def test_success(self):
+        executor = FailingExecutor(0)
+        NixFlakeCommandExecutor.set_instance(executor)
+        self.assertTrue(asyncio.run(NixFlake.update_flake_lock("/tmp/repo")))
+        self.assertEqual(
+            executor.commands, [["command", "nix", "flake", "update", "."]]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# vim: syntax=python ts=4 sw=4 sts=4 tw=79 sr et
+# Local Variables:
+# mode: python
+# python-indent-offset: 4
+# tab-width: 4
+# indent-tabs-mode: nil
+# fill-column: 79
+# End: